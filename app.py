@@ -1,7 +1,9 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, g, render_template, request, jsonify, session, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import json
@@ -11,8 +13,87 @@ import base64
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 
+import chart_cache
+import mer_analytics
+import mer_charts
+import mer_config
+import mer_engine
+import mer_metrics
+import mer_montecarlo
+import mer_optimizer
+import mer_profiling
+import mer_serializer
+import result_cache
+import session_store
+import static_assets
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by mer_serializer (orjson when installed, NumPy-aware)."""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        """Serialize an object to a JSON string."""
+        return mer_serializer.dumps(obj).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        """Deserialize a JSON string or bytes."""
+        return mer_serializer.loads(s)
+    
+    def response(self, *args, **kwargs) -> Response:
+        """Build a JSON response straight from the encoded bytes."""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(mer_serializer.dumps(obj), mimetype=self.mimetype)
+
+class StoredSession(CallbackDict, SessionMixin):
+    """Session data loaded from the server-side store."""
+    
+    def __init__(self, initial: Optional[Dict] = None, session_id: str = '', new: bool = False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.session_id = session_id
+        self.new = new
+        self.modified = False
+
+class StoredSessionInterface(SessionInterface):
+    """Keep session data in a session_store backend; the cookie only carries the session id."""
+    
+    def __init__(self, store: session_store.SessionStore):
+        self.store = store
+    
+    def open_session(self, app, request) -> StoredSession:
+        """Load the session named by the request cookie, or start a new one."""
+        session_id = request.cookies.get(self.get_cookie_name(app))
+        data = self.store.get(session_id) if session_store.valid_session_id(session_id) else None
+        if data is None:
+            return StoredSession(session_id=self.store.new_id(), new=True)
+        return StoredSession(data, session_id=session_id)
+    
+    def save_session(self, app, session: StoredSession, response):
+        """Store a modified session; the cookie is only (re)sent when the session changes."""
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.session_id)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not session.modified:
+            return
+        
+        self.store.set(session.session_id, dict(session))
+        response.set_cookie(
+            name, session.session_id, max_age=int(self.store.ttl), domain=domain, path=path,
+            httponly=self.get_cookie_httponly(app), secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
 app = Flask(__name__)
 app.secret_key = 'mer_calculator_secret_key_2024'
+app.json = FastJSONProvider(app)
+app.config['SESSION_COOKIE_NAME'] = session_store.SESSION_COOKIE
+app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+app.session_interface = StoredSessionInterface(session_store.create_store())
 
 class MERCalculator:
     """
@@ -24,231 +105,586 @@ class MERCalculator:
     
     def __init__(self):
         """Initialize the calculator with default configuration."""
-        # Default configuration
-        self.default_config = {
-            'variable_cost': 0.65,              # 65% variable cost
-            'revenue_start_number': 100000,     # €100,000 starting revenue
-            'mer_increment': 0.50,              # 50% MER increment
-            'revenue_increment': 20000,         # €20,000 revenue increment
-            'contribution_margin_goal': 176000  # €176,000 contribution margin goal
-        }
+        # Default configuration and user inputs
+        self.default_config = mer_config.DEFAULT_CONFIG.copy()
+        self.default_inputs = mer_config.DEFAULT_INPUTS.copy()
         
-        # Default user inputs
-        self.default_inputs = {
-            'target_revenue': 820000,           # €820,000 - Target revenue
-            'target_mer': 7.50                  # 750% MER (7.50 as decimal)
-        }
+        # Pre-built figures reused across requests (safe to render from several threads)
+        self.chart_renderer = mer_charts.ChartRenderer(
+            pool_size=int(os.environ.get('MER_CHART_POOL_SIZE', 4))
+        )
+        
+        # Rendered charts, keyed on their normalized inputs
+        self.chart_cache = chart_cache.ChartCache(
+            max_entries=int(os.environ.get('MER_CHART_CACHE_ENTRIES', 256)),
+            max_bytes=int(os.environ.get('MER_CHART_CACHE_BYTES', 64 * 1024 * 1024)),
+            cache_dir=os.environ.get('MER_CHART_CACHE_DIR') or None,
+            max_specs=int(os.environ.get('MER_CHART_CACHE_SPECS', 4096))
+        )
+        
+        # Processes for large Monte Carlo simulations (1 runs them inline)
+        self.simulation_workers = int(os.environ.get('MER_SIMULATION_WORKERS', 1))
+        
+        # Memoized /calculate results, keyed on the inputs (quantized when MER_RESULT_CACHE_DIGITS is set)
+        self.result_cache = result_cache.create_cache()
     
     def calculate_contribution_margin(self, revenue: float, mer: float, variable_cost: float) -> float:
         """Calculate contribution margin for given revenue and MER."""
-        gross_profit = revenue * (1 - variable_cost)
-        marketing_spend = revenue / mer
-        return gross_profit - marketing_spend
+        return float(mer_engine.contribution_margin(revenue, mer, variable_cost))
+    
+    def calculate_contribution_margin_array(self, revenue, mer, variable_cost) -> np.ndarray:
+        """Calculate contribution margins for arrays of revenue, MER and variable cost."""
+        return mer_engine.contribution_margin(revenue, mer, variable_cost)
     
     def generate_revenue_range_data(self, target_mer: float, target_revenue: float, 
                                    variable_cost: float, revenue_increment: float,
                                    points_before: int = 10, points_after: int = 10) -> Tuple[List[float], List[float]]:
         """Generate data points for revenue range analysis."""
-        start_revenue = target_revenue - (points_before * revenue_increment)
-        end_revenue = target_revenue + (points_after * revenue_increment)
-        
-        revenue_values = []
-        cm_values = []
-        
-        current_revenue = start_revenue
-        while current_revenue <= end_revenue:
-            revenue_values.append(current_revenue)
-            cm_values.append(self.calculate_contribution_margin(current_revenue, target_mer, variable_cost))
-            current_revenue += revenue_increment
-        
-        return revenue_values, cm_values
+        revenue_values, cm_values = mer_engine.revenue_range_data(
+            target_mer, target_revenue, variable_cost, revenue_increment,
+            points_before, points_after
+        )
+        return revenue_values.tolist(), cm_values.tolist()
     
     def create_chart(self, revenue_values: List[float], cm_values: List[float], 
                     target_mer: float, target_revenue: float, target_cm: float,
                     cm_goal: float, variable_cost: float) -> str:
         """Create a chart showing contribution margin vs revenue and return as base64 string."""
-        plt.figure(figsize=(12, 8))
-        plt.style.use('seaborn-v0_8-whitegrid')
-        
-        # Main line plot - Shows how CM changes with revenue
-        plt.plot(revenue_values, cm_values, 'b-', linewidth=3, label='Contribution Margin', marker='o', markersize=4)
-        
-        # Goal line - Horizontal line showing the CM goal
-        plt.axhline(y=cm_goal, color='orange', linestyle='--', 
-                   linewidth=3, label=f'CM Goal: €{cm_goal:,.0f}')
-        
-        # Highlight target point
-        plt.scatter([target_revenue], [target_cm], color='red', s=150, zorder=5, 
-                   label=f'Your Target: €{target_revenue:,.0f} → €{target_cm:,.0f}', marker='*')
-        
-        # Add text annotation for the target point
-        plt.annotate(f'€{target_cm:,.0f}', 
-                    xy=(target_revenue, target_cm), 
-                    xytext=(10, 10), 
-                    textcoords='offset points',
-                    bbox=dict(boxstyle='round,pad=0.3', facecolor='red', alpha=0.7),
-                    color='white', fontweight='bold')
-        
-        # Formatting
-        plt.xlabel('Revenue (€)', fontsize=12, fontweight='bold')
-        plt.ylabel('Contribution Margin (€)', fontsize=12, fontweight='bold')
-        plt.title(f'Contribution Margin vs Revenue\n(MER: {target_mer*100:.0f}%)', fontsize=14, fontweight='bold')
-        plt.grid(True, alpha=0.3)
-        
-        # Enhanced legend
-        plt.legend(loc='upper left', fontsize=11, frameon=True, fancybox=True, shadow=True)
-        
-        # Format axes
-        plt.gca().yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'€{x:,.0f}'))
-        plt.gca().xaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'€{x:,.0f}'))
-        
-        # Rotate x-axis labels for better readability
-        plt.xticks(rotation=45)
-        
-        # Add explanation text
-        plt.figtext(0.02, 0.02, 
-                   f"Formula: Revenue × {(1-variable_cost)*100:.0f}% - (Revenue ÷ {target_mer:.1f})",
-                   fontsize=10, style='italic', alpha=0.7)
-        
-        plt.tight_layout()
-        
-        # Convert plot to base64 string
-        img = io.BytesIO()
-        plt.savefig(img, format='png', dpi=300, bbox_inches='tight')
-        img.seek(0)
-        plot_url = base64.b64encode(img.getvalue()).decode()
-        plt.close()
-        
-        return plot_url
+        png_bytes = self.render_chart_image(revenue_values, cm_values, target_mer, target_revenue,
+                                            target_cm, cm_goal, variable_cost, quality='print')
+        with mer_metrics.stage('base64'):
+            return base64.b64encode(png_bytes).decode()
+    
+    def render_chart_image(self, revenue_values: List[float], cm_values: List[float], 
+                           target_mer: float, target_revenue: float, target_cm: float,
+                           cm_goal: float, variable_cost: float, quality: str = 'standard',
+                           image_format: str = 'png', compression: Optional[int] = None) -> bytes:
+        """Render the contribution margin vs revenue chart and return the image bytes."""
+        return self.chart_renderer.render(
+            revenue_values, cm_values, target_mer, target_revenue, target_cm,
+            cm_goal, variable_cost, quality=quality, image_format=image_format,
+            compression=compression
+        )
+    
+    def register_scenario_chart(self, target_mer: float, target_revenue: float, variable_cost: float,
+                                revenue_increment: float, cm_goal: float) -> str:
+        """Register a scenario chart for lazy rendering and return its content-addressed key."""
+        return self.chart_cache.register({
+            'kind': 'revenue_cm',
+            'renderer_version': mer_charts.RENDERER_VERSION,
+            'target_mer': target_mer,
+            'target_revenue': target_revenue,
+            'variable_cost': variable_cost,
+            'revenue_increment': revenue_increment,
+            'cm_goal': cm_goal
+        })
+    
+    def register_tornado_chart(self, params: Dict) -> str:
+        """Register a sensitivity tornado chart for lazy rendering and return its content-addressed key."""
+        spec = {'kind': 'tornado', 'renderer_version': mer_charts.RENDERER_VERSION,
+                'cm_goal': params['contribution_margin_goal']}
+        for name in mer_engine.SENSITIVITY_DRIVERS:
+            spec[name] = params[name]
+            spec[f'{name}_low'], spec[f'{name}_high'] = params['ranges'][name]
+        return self.chart_cache.register(spec)
+    
+    def chart_entry_key(self, spec: Dict, output: Dict) -> str:
+        """Return the cache key of a chart spec rendered with resolved output settings.
+        
+        The current renderer version replaces the spec's, so a spec registered before an upgrade
+        (e.g. read back from the disk tier) is not served a cached image drawn the old way.
+        """
+        return chart_cache.make_key(**dict(spec, renderer_version=mer_charts.RENDERER_VERSION), **output)
+    
+    def get_chart_image(self, spec: Dict, output: Dict) -> Tuple[str, bytes]:
+        """Return (entry key, image bytes) for a registered chart, rendering only on a cache miss."""
+        entry_key = self.chart_entry_key(spec, output)
+        
+        def render_tornado() -> bytes:
+            params = {name: spec[name] for name in mer_engine.SENSITIVITY_DRIVERS}
+            params['ranges'] = {
+                name: (spec[f'{name}_low'], spec[f'{name}_high']) for name in mer_engine.SENSITIVITY_DRIVERS
+            }
+            params.update(contribution_margin_goal=spec['cm_goal'], steps=2,
+                          two_way=['target_revenue', 'target_mer'])
+            sensitivity = self.run_sensitivity(params)
+            return self.chart_renderer.render_tornado(
+                sensitivity['tornado'], sensitivity['base']['contribution_margin'], spec['cm_goal'],
+                quality=output['quality'], image_format=output['format'],
+                compression=output['compression']
+            )
+        
+        def render() -> bytes:
+            revenue_values, cm_values = self.generate_revenue_range_data(
+                spec['target_mer'], spec['target_revenue'],
+                spec['variable_cost'], spec['revenue_increment']
+            )
+            target_cm = self.calculate_contribution_margin(
+                spec['target_revenue'], spec['target_mer'], spec['variable_cost']
+            )
+            return self.render_chart_image(
+                revenue_values, cm_values, spec['target_mer'], spec['target_revenue'],
+                target_cm, spec['cm_goal'], spec['variable_cost'],
+                quality=output['quality'], image_format=output['format'],
+                compression=output['compression']
+            )
+        
+        if spec.get('kind') == 'tornado':
+            return entry_key, self.chart_cache.get_or_render(entry_key, render_tornado)
+        return entry_key, self.chart_cache.get_or_render(entry_key, render)
+    
+    def generate_grid(self, variable_cost: float, contribution_margin_goal: float,
+                      revenue_start_number: float, revenue_increment: float,
+                      revenue_points: int = 50, mer_start: Optional[float] = None,
+                      mer_increment: float = 0.50, mer_points: int = 20,
+                      dtype: str = 'float32') -> Dict:
+        """Generate the revenue × MER contribution margin grid with its goal-met mask."""
+        return mer_engine.build_grid(
+            variable_cost, contribution_margin_goal,
+            revenue_start_number, revenue_increment, revenue_points,
+            mer_start if mer_start is not None else mer_increment, mer_increment, mer_points,
+            dtype=np.dtype(dtype)
+        )
+    
+    def generate_frontier(self, variable_cost: float, goals: List[float],
+                          revenue_start_number: float, revenue_increment: float,
+                          revenue_points: int = 50) -> Dict:
+        """Generate the lowest-MER / highest-spend curve for each goal over a revenue axis."""
+        return mer_engine.build_frontier(
+            variable_cost, goals, revenue_start_number, revenue_increment, revenue_points
+        )
+    
+    def run_sensitivity(self, params: Dict) -> Dict:
+        """Run the tornado, one-way and two-way sensitivity analysis in one batched computation."""
+        return mer_engine.build_sensitivity(params)
+    
+    def optimize_budget(self, params: Dict) -> Dict:
+        """Allocate a marketing budget across a portfolio of entities to maximize total CM."""
+        return mer_optimizer.optimize(params)
+    
+    def run_simulation(self, params: Dict) -> Dict:
+        """Run a Monte Carlo simulation of contribution margin under uncertain inputs."""
+        return mer_montecarlo.simulate(params, workers=self.simulation_workers)
+    
+    def calculate_scenario(self, config: Dict, user_inputs: Dict) -> Dict:
+        """Build the output-independent part of the /calculate response for validated inputs."""
+        # Contribution margin, goal check, break-even figures and formula components in one pass
+        with mer_metrics.stage('cm'):
+            analysis = mer_analytics.scenario_summary(
+                user_inputs['target_revenue'], 
+                user_inputs['target_mer'],
+                config['variable_cost'],
+                config['contribution_margin_goal']
+            )
+        contribution_margin = analysis['contribution_margin']
+        
+        return {
+            'success': True,
+            **analysis,
+            'chart_explanation': {
+                'blue_line': 'Shows how your contribution margin changes as revenue increases',
+                'orange_line': f'Your target contribution margin goal (€{config["contribution_margin_goal"]:,.0f})',
+                'red_star': f'Your specific revenue/CM combination (€{user_inputs["target_revenue"]:,.0f} → €{contribution_margin:,.0f})'
+            }
+        }
     
     def validate_inputs(self, config: Dict, user_inputs: Dict) -> List[str]:
         """Validate all inputs and return list of errors."""
-        errors = []
-        
-        # Validate config
-        if not config.get('variable_cost') or config['variable_cost'] < 0 or config['variable_cost'] >= 1:
-            errors.append('Variable Cost must be between 0 and 1 (e.g., 0.65 for 65%)')
-        
-        if not config.get('revenue_increment') or config['revenue_increment'] <= 0:
-            errors.append('Revenue Increment must be greater than 0')
-        
-        if not config.get('contribution_margin_goal') or config['contribution_margin_goal'] <= 0:
-            errors.append('Contribution Margin Goal must be greater than 0')
-        
-        # Validate user inputs
-        if not user_inputs.get('target_revenue') or user_inputs['target_revenue'] <= 0:
-            errors.append('Target Revenue must be greater than 0')
-        
-        if not user_inputs.get('target_mer') or user_inputs['target_mer'] <= 0:
-            errors.append('Target MER must be greater than 0')
-        
-        return errors
+        return mer_config.validate_profile(config, user_inputs, mer_config.CALCULATION_FIELDS)
 
 # Initialize calculator
 calculator = MERCalculator()
 
+# Opt-in per-request cProfile / tracemalloc profiles (off unless MER_PROFILE_TOKEN is set)
+profiler = mer_profiling.create_profiler()
+
+def profile_token() -> Optional[str]:
+    """The profiling token sent with the request, if any."""
+    return request.headers.get(mer_profiling.TOKEN_HEADER) or request.args.get(mer_profiling.TOKEN_PARAM)
+
+mer_metrics.register_cache('chart', calculator.chart_cache.stats)
+mer_metrics.register_cache('result', calculator.result_cache.stats)
+mer_metrics.register_cache('session', app.session_interface.store.stats)
+
+@app.before_request
+def start_request_timer():
+    """Start timing the request for /metrics and the Server-Timing header."""
+    g.request_timer, g.request_timer_token = mer_metrics.start_request('flask')
+    mode = profiler.requested_mode(
+        request.headers.get(mer_profiling.PROFILE_HEADER) or request.args.get(mer_profiling.PROFILE_PARAM),
+        profile_token()
+    )
+    if mode:
+        g.profile_run = profiler.start(mode, request.path)
+
+@app.after_request
+def add_server_timing(response):
+    """Record the route and status, and report the stage timings to the browser."""
+    timer = g.get('request_timer')
+    if timer is not None:
+        timer.route = request.url_rule.rule if request.url_rule else 'unmatched'
+        timer.status = response.status_code
+        response.headers['Server-Timing'] = timer.server_timing()
+    run = g.get('profile_run')
+    if run is not None:
+        response.headers[mer_profiling.ID_HEADER] = run.profile_id
+    return response
+
+@app.teardown_request
+def finish_request_timer(error=None):
+    """Record the finished request's latency and save its profile, if profiled."""
+    timer = g.pop('request_timer', None)
+    if timer is not None:
+        if error is not None:
+            timer.status = 500
+        run = g.pop('profile_run', None)
+        if run is not None:
+            run.stop(timer.status)
+        mer_metrics.finish_request(timer, g.pop('request_timer_token'))
+
+# The index template has no per-request context, so it is rendered and compressed once
+# (re-rendered per request only when template auto-reload is on, e.g. in debug mode)
+_index_asset = None
+
+def index_asset() -> static_assets.StaticAsset:
+    """Return the pre-encoded index page, rendering it on first use."""
+    global _index_asset
+    if _index_asset is None or app.jinja_env.auto_reload:
+        _index_asset = static_assets.StaticAsset(render_template('index.html').encode('utf-8'),
+                                                 'text/html; charset=utf-8')
+    return _index_asset
+
 @app.route('/')
 def index():
     """Main page route."""
-    # Initialize session with default values if not present
-    if 'config' not in session:
-        session['config'] = calculator.default_config.copy()
-    if 'user_inputs' not in session:
-        session['user_inputs'] = calculator.default_inputs.copy()
-    
-    return render_template('index.html')
+    # No session is created until the visitor calculates; /get_defaults falls back to the defaults
+    status, headers, body = index_asset().respond(request.headers.get('Accept-Encoding'),
+                                                  request.headers.get('If-None-Match'))
+    return Response(body, status=status, headers=headers)
 
 @app.route('/calculate', methods=['POST'])
 def calculate():
     """Calculate contribution margin and generate results."""
     try:
-        # Get data from request
+        with mer_metrics.stage('parse'):
+            # Get data from request
+            data = request.get_json()
+            
+            # Update session with new values
+            config = {
+                'variable_cost': float(data.get('variable_cost', 0.65)),
+                'revenue_increment': float(data.get('revenue_increment', 20000)),
+                'contribution_margin_goal': float(data.get('contribution_margin_goal', 176000))
+            }
+            
+            user_inputs = {
+                'target_revenue': float(data.get('target_revenue', 820000)),
+                'target_mer': float(data.get('target_mer', 7.50))
+            }
+        
+        with mer_metrics.stage('validate'):
+            # Validate inputs
+            errors = calculator.validate_inputs(config, user_inputs)
+            try:
+                # Interactive requests default to the fast preview tier
+                chart_output = mer_charts.resolve_output(
+                    data.get('chart_quality', 'preview'), data.get('chart_format', 'png'),
+                    data.get('chart_compression')
+                )
+            except ValueError as e:
+                errors.append(str(e))
+        if errors:
+            return jsonify({'success': False, 'errors': errors})
+        
+        # Quantized (when configured) so near-duplicate inputs, e.g. from sliders, share one cached result;
+        # the session below keeps the values as entered
+        quantized_config = calculator.result_cache.quantize(config)
+        quantized_inputs = calculator.result_cache.quantize(user_inputs)
+        with mer_metrics.stage('result_cache'):
+            result = calculator.result_cache.get_or_compute(
+                'calculate', dict(quantized_config, **quantized_inputs),
+                lambda: calculator.calculate_scenario(quantized_config, quantized_inputs)
+            )
+        
+        # Register chart; it is rendered only when the browser requests its URL
+        with mer_metrics.stage('chart_register'):
+            chart_key = calculator.register_scenario_chart(
+                quantized_inputs['target_mer'], quantized_inputs['target_revenue'],
+                quantized_config['variable_cost'], quantized_config['revenue_increment'],
+                quantized_config['contribution_margin_goal']
+            )
+        
+        # Update session
+        session['config'] = config
+        session['user_inputs'] = user_inputs
+        
+        # Chart URLs depend on the requested output, so they are added per request
+        result.update({
+            'chart_key': chart_key,
+            'chart_url': chart_url(chart_key, chart_output),
+            'chart_svg_url': f'/chart/{chart_key}.svg',
+            'chart_print_url': f'/chart/{chart_key}.png?quality=print'
+        })
+        
+        with mer_metrics.stage('json'):
+            return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'success': False, 'errors': [f'Calculation error: {str(e)}']})
+
+@app.route('/calculate/batch', methods=['POST'])
+def calculate_batch():
+    """Evaluate a batch of scenarios in one request."""
+    try:
+        # NDJSON in, NDJSON out: scenarios are evaluated chunk by chunk as they stream
+        if request.mimetype == 'application/x-ndjson':
+            results = mer_engine.iter_ndjson_results(request.stream)
+            return Response(stream_with_context(results), mimetype='application/x-ndjson')
+        
         data = request.get_json()
+        if isinstance(data, list):
+            scenarios, include_chart = data, False
+        else:
+            scenarios = data.get('scenarios', [])
+            include_chart = bool(data.get('include_chart', False))
+        
+        result = mer_engine.batch_result(scenarios)
+        
+        # Optional chart for the first valid scenario
+        if include_chart and result['valid_count']:
+            index = int(np.flatnonzero(~np.isnan(result['contribution_margin']))[0])
+            scenario = mer_engine.scenario_columns([scenarios[index]])
+            chart_key = calculator.register_scenario_chart(
+                float(scenario['target_mer'][0]), float(scenario['target_revenue'][0]),
+                float(scenario['variable_cost'][0]), float(scenario['revenue_increment'][0]),
+                float(scenario['contribution_margin_goal'][0])
+            )
+            result['chart_index'] = index
+            result['chart_key'] = chart_key
+            result['chart_url'] = chart_url(chart_key, mer_charts.resolve_output('preview'))
+        
+        # Very large batches are encoded and sent piece by piece
+        if mer_serializer.should_stream(result):
+            return Response(mer_serializer.iter_dumps(result), mimetype='application/json')
+        return jsonify(result)
         
-        # Update session with new values
-        config = {
-            'variable_cost': float(data.get('variable_cost', 0.65)),
-            'revenue_increment': float(data.get('revenue_increment', 20000)),
-            'contribution_margin_goal': float(data.get('contribution_margin_goal', 176000))
-        }
+    except Exception as e:
+        return jsonify({'success': False, 'errors': [f'Batch calculation error: {str(e)}']})
+
+@app.route('/api/grid', methods=['POST'])
+def grid():
+    """Calculate the full revenue × MER contribution margin grid."""
+    try:
+        data = request.get_json() or {}
         
-        user_inputs = {
-            'target_revenue': float(data.get('target_revenue', 820000)),
-            'target_mer': float(data.get('target_mer', 7.50))
-        }
+        params = mer_engine.grid_params(data, calculator.default_config)
+        errors = mer_engine.validate_grid_inputs(params)
+        if errors:
+            return jsonify({'success': False, 'errors': errors})
+        
+        grid_data = calculator.generate_grid(**params)
+        
+        # Binary download for large grids, columnar JSON otherwise
+        if data.get('format') == 'npz':
+            return Response(
+                mer_engine.grid_to_npz(grid_data),
+                mimetype='application/octet-stream',
+                headers={'Content-Disposition': 'attachment; filename=mer_grid.npz'}
+            )
         
-        # Validate inputs
-        errors = calculator.validate_inputs(config, user_inputs)
+        result = {'success': True}
+        result.update(mer_engine.encode_grid(grid_data))
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'success': False, 'errors': [f'Grid calculation error: {str(e)}']})
+
+@app.route('/api/frontier', methods=['POST'])
+def frontier():
+    """Solve the goal frontier (minimum MER / maximum spend) over a revenue sweep."""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        params = mer_engine.frontier_params(data, calculator.default_config)
+        errors = mer_engine.validate_frontier_inputs(params)
         if errors:
             return jsonify({'success': False, 'errors': errors})
         
-        # Calculate contribution margin
-        contribution_margin = calculator.calculate_contribution_margin(
-            user_inputs['target_revenue'], 
-            user_inputs['target_mer'],
-            config['variable_cost']
-        )
+        result = {'success': True}
+        result.update(mer_engine.encode_frontier(calculator.generate_frontier(**params)))
+        if mer_serializer.should_stream(result):
+            return Response(mer_serializer.iter_dumps(result), mimetype='application/json')
+        return jsonify(result)
         
-        # Check if goal is met
-        meets_goal = contribution_margin >= config['contribution_margin_goal']
+    except Exception as e:
+        return jsonify({'success': False, 'errors': [f'Frontier calculation error: {str(e)}']})
+
+@app.route('/api/sensitivity', methods=['POST'])
+def sensitivity():
+    """Sensitivity of contribution margin to each driver, with tornado chart and two-way table."""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        defaults = dict(calculator.default_config, **calculator.default_inputs)
+        params = mer_engine.sensitivity_params(data, defaults)
+        errors = mer_engine.validate_sensitivity_inputs(params)
+        try:
+            chart_output = mer_charts.resolve_output(
+                data.get('chart_quality', 'preview'), data.get('chart_format', 'png'),
+                data.get('chart_compression')
+            )
+        except ValueError as e:
+            errors.append(str(e))
+        if errors:
+            return jsonify({'success': False, 'errors': errors})
         
-        # Generate chart data
-        revenue_values, cm_values = calculator.generate_revenue_range_data(
-            user_inputs['target_mer'], 
-            user_inputs['target_revenue'],
-            config['variable_cost'],
-            config['revenue_increment']
-        )
+        result = {'success': True}
+        result.update(calculator.run_sensitivity(params))
+        
+        # Tornado chart goes through the chart cache like the main chart
+        chart_key = calculator.register_tornado_chart(params)
+        result.update({
+            'chart_key': chart_key,
+            'chart_url': chart_url(chart_key, chart_output),
+            'chart_svg_url': f'/chart/{chart_key}.svg',
+            'chart_print_url': f'/chart/{chart_key}.png?quality=print'
+        })
+        return jsonify(result)
         
-        # Create chart
-        chart_base64 = calculator.create_chart(
-            revenue_values, cm_values, user_inputs['target_mer'], 
-            user_inputs['target_revenue'], contribution_margin,
-            config['contribution_margin_goal'], config['variable_cost']
-        )
+    except Exception as e:
+        return jsonify({'success': False, 'errors': [f'Sensitivity analysis error: {str(e)}']})
+
+@app.route('/api/optimize', methods=['POST'])
+def optimize():
+    """Allocate a marketing budget across brands / channels to maximize total contribution margin."""
+    try:
+        data = request.get_json(silent=True) or {}
         
-        # Calculate additional analysis
-        coefficient = (1 - config['variable_cost']) - (1 / user_inputs['target_mer'])
-        min_revenue = config['contribution_margin_goal'] / coefficient if coefficient > 0 else 0
+        params = mer_optimizer.optimizer_params(data)
+        errors = mer_optimizer.validate_optimizer_inputs(params)
+        if errors:
+            return jsonify({'success': False, 'errors': errors})
         
-        # Calculate formula components
-        gross_profit = user_inputs['target_revenue'] * (1 - config['variable_cost'])
-        marketing_spend = user_inputs['target_revenue'] / user_inputs['target_mer']
+        result = {'success': True}
+        result.update(calculator.optimize_budget(params))
+        if mer_serializer.should_stream(result):
+            return Response(mer_serializer.iter_dumps(result), mimetype='application/json')
+        return jsonify(result)
         
-        # Update session
-        session['config'] = config
-        session['user_inputs'] = user_inputs
+    except Exception as e:
+        return jsonify({'success': False, 'errors': [f'Optimization error: {str(e)}']})
+
+@app.route('/api/simulate', methods=['POST'])
+def simulate():
+    """Monte Carlo simulation of contribution margin under uncertain inputs."""
+    try:
+        data = request.get_json(silent=True) or {}
         
-        # Prepare response
-        result = {
-            'success': True,
-            'contribution_margin': contribution_margin,
-            'meets_goal': meets_goal,
-            'difference': contribution_margin - config['contribution_margin_goal'],
-            'min_revenue': min_revenue,
-            'revenue_difference': user_inputs['target_revenue'] - min_revenue,
-            'gross_profit': gross_profit,
-            'marketing_spend': marketing_spend,
-            'chart': chart_base64,
-            'chart_explanation': {
-                'blue_line': 'Shows how your contribution margin changes as revenue increases',
-                'orange_line': f'Your target contribution margin goal (€{config["contribution_margin_goal"]:,.0f})',
-                'red_star': f'Your specific revenue/CM combination (€{user_inputs["target_revenue"]:,.0f} → €{contribution_margin:,.0f})'
-            }
-        }
+        defaults = dict(calculator.default_config, **calculator.default_inputs)
+        params = mer_montecarlo.simulation_params(data, defaults)
+        errors = mer_montecarlo.validate_simulation_inputs(params)
+        if errors:
+            return jsonify({'success': False, 'errors': errors})
         
+        result = {'success': True}
+        result.update(calculator.run_simulation(params))
         return jsonify(result)
         
     except Exception as e:
-        return jsonify({'success': False, 'errors': [f'Calculation error: {str(e)}']})
+        return jsonify({'success': False, 'errors': [f'Simulation error: {str(e)}']})
+
+@app.route('/calculate/stream', methods=['POST'])
+def calculate_stream():
+    """Stream a long revenue range as NDJSON or CSV with constant memory."""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        params = mer_engine.stream_params(data, calculator.default_config)
+        errors = mer_engine.validate_stream_inputs(params)
+        stream_format = data.get('format', 'ndjson')
+        if stream_format not in mer_engine.STREAM_FORMATS:
+            errors.append(f"Unknown stream format '{stream_format}' (choose from {', '.join(mer_engine.STREAM_FORMATS)})")
+        if errors:
+            return jsonify({'success': False, 'errors': errors})
+        
+        # Points are computed and encoded chunk by chunk as the client reads them
+        return Response(mer_engine.iter_range_stream(params, stream_format),
+                        content_type=mer_engine.STREAM_FORMATS[stream_format])
+        
+    except Exception as e:
+        return jsonify({'success': False, 'errors': [f'Stream calculation error: {str(e)}']})
 
 @app.route('/reset', methods=['POST'])
 def reset():
     """Reset configuration to defaults."""
-    session['config'] = calculator.default_config.copy()
-    session['user_inputs'] = calculator.default_inputs.copy()
+    session.clear()
     return jsonify({'success': True, 'message': 'Configuration reset to defaults'})
 
+def chart_url(chart_key: str, output: Dict) -> str:
+    """Return the image endpoint URL for a registered chart and output settings."""
+    url = f'/chart/{chart_key}.{output["format"]}?quality={output["quality"]}'
+    if output['compression'] is not None:
+        url += f'&compression={output["compression"]}'
+    return url
+
+@app.route('/chart/<key>.<image_format>')
+def chart_image(key, image_format):
+    """Serve a registered chart as raw image bytes, rendering it on first request."""
+    if not all(c in '0123456789abcdef' for c in key):
+        return Response(status=404)
+    
+    spec = calculator.chart_cache.lookup(key)
+    if spec is None:
+        return Response(status=404)
+    
+    try:
+        output = mer_charts.resolve_output(
+            request.args.get('quality', 'standard'), image_format,
+            request.args.get('compression', type=int)
+        )
+    except ValueError as e:
+        return Response(str(e), status=400, mimetype='text/plain')
+    
+    # Charts are content-addressed, so the entry key doubles as a strong ETag
+    etag = f'"{calculator.chart_entry_key(spec, output)}"'
+    headers = {
+        'ETag': etag,
+        'Cache-Control': 'public, max-age=31536000, immutable'
+    }
+    if etag in request.headers.get('If-None-Match', ''):
+        return Response(status=304, headers=headers)
+    
+    _, image_bytes = calculator.get_chart_image(spec, output)
+    return Response(image_bytes, mimetype=mer_charts.IMAGE_FORMATS[image_format], headers=headers)
+
+@app.route('/api/chart_cache')
+def chart_cache_stats():
+    """Get chart cache hit/miss counters and usage."""
+    return jsonify(calculator.chart_cache.stats())
+
+@app.route('/api/result_cache')
+def result_cache_stats():
+    """Get scenario result cache hit/miss counters and usage."""
+    return jsonify(calculator.result_cache.stats())
+
+@app.route('/api/sessions')
+def session_stats():
+    """Get session store size and eviction counters."""
+    return jsonify(app.session_interface.store.stats())
+
+@app.route('/metrics')
+def metrics():
+    """Get request latency, stage timing, cache and chart metrics in Prometheus format."""
+    return Response(mer_metrics.render(), content_type=mer_metrics.CONTENT_TYPE)
+
+@app.route('/admin/profiles')
+@app.route('/admin/profiles/<profile_id>')
+@app.route('/admin/profiles/<profile_id>/report')
+def profiles(profile_id: Optional[str] = None):
+    """List, download or summarize stored request profiles (profiling token required)."""
+    status, headers, body = profiler.respond(request.path, profile_token())
+    return Response(body, status=status, headers=headers)
+
 @app.route('/get_defaults')
 def get_defaults():
     """Get default configuration values."""
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Contribution Margin Calculator - Asyncio Server
+Serves the same routes as simple_app.py from a single asyncio event loop,
+using only the standard library.
+
+One loop handles thousands of concurrent keep-alive connections. Cheap
+routes run inline; CPU-heavy grid, frontier, simulation, optimization and
+batch computations are offloaded to a process pool so the event loop never
+stalls.
+"""
+
+import argparse
+import asyncio
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import mer_engine
+import mer_metrics
+import mer_profiling
+import mer_serializer
+import session_store
+import simple_app
+
+# Largest request head (request line + headers) accepted, in bytes
+MAX_HEADER_BYTES = 64 * 1024
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 256 * 1024 * 1024
+
+JSON_HEADERS = {
+    'Content-Type': 'application/json; charset=utf-8',
+    'Cache-Control': 'no-cache',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type'
+}
+
+
+# =============================================================================
+# PROCESS POOL JOBS (top-level so they can be pickled)
+# =============================================================================
+
+def grid_job(post_data: bytes) -> Tuple[bytes, bool]:
+    """Compute and encode a grid response; returns (body, is_npz)."""
+    result = simple_app.grid_result(post_data)
+    if isinstance(result, bytes):
+        return result, True
+    return mer_serializer.dumps(result), False
+
+
+def batch_job(post_data: bytes) -> bytes:
+    """Evaluate and encode a JSON batch response."""
+    return mer_serializer.dumps(simple_app.batch_result(post_data))
+
+
+def frontier_job(post_data: bytes) -> bytes:
+    """Solve and encode a goal frontier response."""
+    return mer_serializer.dumps(simple_app.frontier_result(post_data))
+
+
+def simulate_job(post_data: bytes) -> bytes:
+    """Run and encode a Monte Carlo simulation response."""
+    return mer_serializer.dumps(simple_app.simulate_result(post_data))
+
+
+def optimize_job(post_data: bytes) -> bytes:
+    """Solve and encode a budget allocation response."""
+    return mer_serializer.dumps(simple_app.optimize_result(post_data))
+
+
+def ndjson_batch_job(post_data: bytes) -> bytes:
+    """Evaluate an NDJSON batch and return the NDJSON result lines."""
+    return b''.join(mer_engine.iter_ndjson_results(post_data.splitlines()))
+
+
+# =============================================================================
+# HTTP PROTOCOL
+# =============================================================================
+
+class HTTPRequest:
+    """A parsed HTTP request."""
+
+    def __init__(self, method: str, path: str, version: str, headers: Dict[str, str], body: bytes,
+                 query: str = ''):
+        self.method = method
+        self.path = path
+        self.version = version
+        self.headers = headers
+        self.body = body
+        self.query = query
+
+    def profile_params(self) -> Tuple[Optional[str], Optional[str]]:
+        """The requested profile mode and profiling token, from the headers or query."""
+        _, params = mer_profiling.split_profile_params('?' + self.query)
+        return (self.headers.get(mer_profiling.PROFILE_HEADER.lower()) or params.get(mer_profiling.PROFILE_PARAM),
+                self.headers.get(mer_profiling.TOKEN_HEADER.lower()) or params.get(mer_profiling.TOKEN_PARAM))
+
+    @property
+    def keep_alive(self) -> bool:
+        """Whether the client wants the connection kept open after this request."""
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.1':
+            return connection != 'close'
+        return connection == 'keep-alive'
+
+
+class BadRequest(Exception):
+    """Raised when a request cannot be parsed."""
+
+
+async def read_request(reader: asyncio.StreamReader,
+                       writer: asyncio.StreamWriter) -> Optional[HTTPRequest]:
+    """Read one request from the stream, or return None when the client closed it."""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise BadRequest('Incomplete request head')
+    except asyncio.LimitOverrunError:
+        raise BadRequest('Request head too large')
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, path, version = lines[0].split(' ', 2)
+    except ValueError:
+        raise BadRequest('Malformed request line')
+
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        content_length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise BadRequest('Invalid Content-Length')
+    if content_length < 0 or content_length > MAX_BODY_BYTES:
+        raise BadRequest('Request body too large')
+    if content_length and headers.get('expect', '').lower() == '100-continue':
+        writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+    body = await reader.readexactly(content_length) if content_length else b''
+
+    path, _, query = path.partition('?')
+    return HTTPRequest(method.upper(), path, version, headers, body, query)
+
+
+def encode_response(status: int, headers: Dict[str, str], body: Union[bytes, Iterator[bytes]],
+                    keep_alive: bool, include_body: bool = True) -> bytes:
+    """Encode a full HTTP/1.1 response, or only its head when the body is a chunk iterator."""
+    phrase = HTTPStatus(status).phrase
+    lines = [f'HTTP/1.1 {status} {phrase}']
+    for name, value in headers.items():
+        lines.append(f'{name}: {value}')
+    streamed = not isinstance(body, bytes)
+    if streamed:
+        lines.append('Transfer-Encoding: chunked')
+    elif status != 304:
+        lines.append(f'Content-Length: {len(body)}')
+    lines.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+    head = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+    return head + body if include_body and not streamed else head
+
+
+# =============================================================================
+# SERVER
+# =============================================================================
+
+class AsyncMERServer:
+    """Asyncio HTTP server exposing the simple_app routes."""
+
+    def __init__(self, host: str = '0.0.0.0', port: int = 8000, workers: Optional[int] = None,
+                 keepalive_timeout: float = 15, backlog: int = 1024):
+        """Initialize the server; the process pool is created on start."""
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.keepalive_timeout = keepalive_timeout
+        self.backlog = backlog
+
+        self.executor = None
+        self.server = None
+        self.connections = set()
+        self.idle_connections = set()
+
+    async def start(self):
+        """Start listening and create the process pool for CPU-heavy routes."""
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port,
+            limit=MAX_HEADER_BYTES, backlog=self.backlog
+        )
+
+    async def stop(self, drain_timeout: float = 30):
+        """Stop accepting connections, let in-flight requests finish, then close the pool."""
+        self.server.close()
+
+        # Idle keep-alive connections have nothing in flight and can be closed right away
+        for task in list(self.idle_connections):
+            task.cancel()
+        if self.connections:
+            await asyncio.wait(self.connections, timeout=drain_timeout)
+        self.executor.shutdown(wait=True)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one connection until it closes or idles out."""
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while not self.server_closing:
+                self.idle_connections.add(task)
+                try:
+                    request = await asyncio.wait_for(read_request(reader, writer), self.keepalive_timeout)
+                except (asyncio.TimeoutError, ConnectionError):
+                    break
+                except BadRequest as e:
+                    writer.write(encode_response(400, {'Content-Type': 'text/plain'},
+                                                 str(e).encode('utf-8'), keep_alive=False))
+                    break
+                finally:
+                    self.idle_connections.discard(task)
+                if request is None:
+                    break
+
+                keep_alive = request.keep_alive and not self.server_closing
+                status, headers, body = await self.timed_dispatch(request)
+                writer.write(encode_response(status, headers, body, keep_alive,
+                                             include_body=request.method != 'HEAD'))
+                if not isinstance(body, bytes) and request.method != 'HEAD':
+                    await self.write_chunks(writer, body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    @property
+    def server_closing(self) -> bool:
+        """Whether stop() has been called."""
+        return self.server is None or not self.server.is_serving()
+
+    async def write_chunks(self, writer: asyncio.StreamWriter, chunks: Iterator[bytes]):
+        """Write generated chunks with chunked transfer encoding, waiting for the client to keep up."""
+        loop = asyncio.get_running_loop()
+        while True:
+            # Each chunk is computed in a worker thread so the event loop keeps serving other clients
+            piece = await loop.run_in_executor(None, next, chunks, None)
+            if piece is None:
+                break
+            if piece:
+                writer.write(b'%x\r\n%s\r\n' % (len(piece), piece))
+                await writer.drain()
+        writer.write(b'0\r\n\r\n')
+
+    async def timed_dispatch(self, request: HTTPRequest) -> Tuple[int, Dict[str, str], Union[bytes, Iterator[bytes]]]:
+        """Dispatch a request, recording its metrics and adding a Server-Timing header.
+
+        Also profiles the request when asked to (see mer_profiling). A CPU
+        profile covers the event loop thread, so it includes any requests the
+        loop served meanwhile but not work offloaded to the process pool.
+        """
+        with mer_metrics.track('async') as timer:
+            mode = simple_app.profiler.requested_mode(*request.profile_params())
+            run = simple_app.profiler.start(mode, request.path) if mode else None
+            try:
+                status, headers, body = await self.dispatch(request)
+                timer.status = status
+            finally:
+                if run is not None:
+                    run.stop(timer.status)
+            if request.path.startswith(mer_profiling.ADMIN_PATH + '/'):
+                timer.route = mer_profiling.ADMIN_PATH + '/<id>'
+            elif status != 404:
+                timer.route = request.path
+            headers = dict(headers, **{'Server-Timing': timer.server_timing()})
+            if run is not None:
+                headers[mer_profiling.ID_HEADER] = run.profile_id
+        return status, headers, body
+
+    async def dispatch(self, request: HTTPRequest) -> Tuple[int, Dict[str, str], Union[bytes, Iterator[bytes]]]:
+        """Route a request and return (status, headers, body)."""
+        if request.method in ('GET', 'HEAD'):
+            if request.path in ('/', '/index.html'):
+                return simple_app.INDEX_ASSET.respond(request.headers.get('accept-encoding'),
+                                                      request.headers.get('if-none-match'))
+            if request.path == '/api/defaults':
+                session_id = session_store.parse_cookie(request.headers.get('cookie'))
+                session = simple_app.sessions.get(session_id) if session_id else None
+                if session:
+                    return 200, JSON_HEADERS, mer_serializer.dumps(simple_app.defaults_result(session))
+                return simple_app.DEFAULTS_ASSET.respond(request.headers.get('accept-encoding'),
+                                                         request.headers.get('if-none-match'))
+            if request.path == '/api/sessions':
+                return 200, JSON_HEADERS, mer_serializer.dumps(simple_app.sessions.stats())
+            if request.path == '/api/result_cache':
+                return 200, JSON_HEADERS, mer_serializer.dumps(simple_app.calculator.result_cache.stats())
+            if request.path == mer_profiling.ADMIN_PATH or request.path.startswith(mer_profiling.ADMIN_PATH + '/'):
+                return simple_app.profiler.respond(request.path, request.profile_params()[1])
+            if request.path == '/metrics':
+                return 200, {'Content-Type': mer_metrics.CONTENT_TYPE, 'Cache-Control': 'no-cache'}, mer_metrics.render()
+
+        elif request.method == 'POST':
+            if request.path == '/api/calculate':
+                session_id, session, new = simple_app.sessions.open(request.headers.get('cookie'))
+                result = simple_app.calculate_result(request.body, session)
+                headers = dict(JSON_HEADERS, **simple_app.sessions.save(session_id, session, new))
+                with mer_metrics.stage('json'):
+                    body = mer_serializer.dumps(result)
+                return 200, headers, body
+            if request.path == '/api/reset':
+                session_id, session, new = simple_app.sessions.open(request.headers.get('cookie'))
+                headers = dict(JSON_HEADERS, **simple_app.sessions.save(session_id, {}, new))
+                return 200, headers, mer_serializer.dumps(simple_app.reset_result())
+            if request.path == '/api/calculate/batch':
+                return await self.offload_batch(request)
+            if request.path == '/api/grid':
+                return await self.offload_grid(request)
+            if request.path == '/api/frontier':
+                return await self.offload_frontier(request)
+            if request.path == '/api/sensitivity':
+                return 200, JSON_HEADERS, mer_serializer.dumps(simple_app.sensitivity_result(request.body))
+            if request.path == '/api/optimize':
+                return await self.offload_optimization(request)
+            if request.path == '/api/simulate':
+                return await self.offload_simulation(request)
+            if request.path == '/api/calculate/stream':
+                result = simple_app.range_stream_result(request.body)
+                if isinstance(result, dict):
+                    return 200, JSON_HEADERS, mer_serializer.dumps(result)
+                content_type, chunks = result
+                return 200, dict(JSON_HEADERS, **{'Content-Type': content_type}), chunks
+
+        return 404, {'Content-Type': 'text/plain'}, b'Not Found'
+
+    async def offload_batch(self, request: HTTPRequest) -> Tuple[int, Dict[str, str], bytes]:
+        """Run a batch evaluation in the process pool."""
+        loop = asyncio.get_running_loop()
+        if request.headers.get('content-type', '').startswith('application/x-ndjson'):
+            body = await loop.run_in_executor(self.executor, ndjson_batch_job, request.body)
+            headers = dict(JSON_HEADERS, **{'Content-Type': 'application/x-ndjson; charset=utf-8'})
+            return 200, headers, body
+
+        body = await loop.run_in_executor(self.executor, batch_job, request.body)
+        return 200, JSON_HEADERS, body
+
+    async def offload_frontier(self, request: HTTPRequest) -> Tuple[int, Dict[str, str], bytes]:
+        """Solve a goal frontier in the process pool."""
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(self.executor, frontier_job, request.body)
+        return 200, JSON_HEADERS, body
+
+    async def offload_simulation(self, request: HTTPRequest) -> Tuple[int, Dict[str, str], bytes]:
+        """Run a Monte Carlo simulation in the process pool."""
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(self.executor, simulate_job, request.body)
+        return 200, JSON_HEADERS, body
+
+    async def offload_optimization(self, request: HTTPRequest) -> Tuple[int, Dict[str, str], bytes]:
+        """Solve a budget allocation in the process pool."""
+        loop = asyncio.get_running_loop()
+        body = await loop.run_in_executor(self.executor, optimize_job, request.body)
+        return 200, JSON_HEADERS, body
+
+    async def offload_grid(self, request: HTTPRequest) -> Tuple[int, Dict[str, str], bytes]:
+        """Run a grid computation in the process pool."""
+        loop = asyncio.get_running_loop()
+        body, is_npz = await loop.run_in_executor(self.executor, grid_job, request.body)
+        if is_npz:
+            return 200, {
+                'Content-Type': 'application/octet-stream',
+                'Content-Disposition': 'attachment; filename=mer_grid.npz',
+                'Access-Control-Allow-Origin': '*'
+            }, body
+        return 200, JSON_HEADERS, body
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command-line options for the asyncio server."""
+    parser = argparse.ArgumentParser(description='MER Contribution Margin Calculator asyncio server')
+    parser.add_argument('--host', default='0.0.0.0', help='Bind address (default: 0.0.0.0)')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on (default: 8000)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processes for grid, frontier, simulation, optimization and batch computations (default: CPU count)')
+    parser.add_argument('--backlog', type=int, default=1024, help='Listen backlog size (default: 1024)')
+    parser.add_argument('--keepalive-timeout', type=float, default=15,
+                        help='Seconds an idle keep-alive connection stays open (default: 15)')
+    parser.add_argument('--log-level', default=None,
+                        help='Logging level (default: MER_LOG_LEVEL or INFO)')
+    return parser.parse_args(argv)
+
+
+async def serve(args: argparse.Namespace):
+    """Run the server until SIGINT or SIGTERM, then shut down gracefully."""
+    server = AsyncMERServer(args.host, args.port, args.workers, args.keepalive_timeout, args.backlog)
+    await server.start()
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop_event.set)
+
+    print(f"🧮 MER Calculator Async Server Starting...")
+    print(f"🌐 Server running at: http://localhost:{args.port}")
+    print(f"⚙️  Event loop + process pool ({args.workers or 'CPU count'} workers) for grid/frontier/simulation/optimize/batch routes")
+    print(f"🛑 Press Ctrl+C to stop the server")
+    print("="*60)
+
+    await stop_event.wait()
+    print("\n⏳ Draining in-flight requests...")
+    await server.stop()
+    print("\n👋 Server stopped. Thank you for using MER Calculator!")
+
+
+def main(argv=None):
+    """Run the MER Calculator asyncio web server."""
+    args = parse_args(argv)
+    mer_metrics.configure_logging(args.log_level)
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Calculator - Benchmark Suite
+Reproducible performance measurements, written as JSON so runs from
+different commits can be compared.
+
+Benchmark groups:
+- engine: scalar vs vectorized contribution margin throughput
+- range:  generate_revenue_range_data at growing range sizes
+- charts: chart render latency per quality tier (dpi) and image format
+- http:   requests per second and p50/p99 latency of each web server under
+          concurrent keep-alive load from a local load generator
+
+Usage:
+    python benchmark.py                                  # every group
+    python benchmark.py --only engine range --quick      # a fast subset
+    python benchmark.py --output new.json --compare old.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+import mer_charts
+import mer_engine
+import simple_app
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BENCHMARK_GROUPS = ('engine', 'range', 'charts', 'http')
+
+# Relative change in a benchmark's primary metric that --compare reports as a regression
+REGRESSION_THRESHOLD = 0.10
+
+# How each server is started, and its single-calculation and defaults routes
+SERVERS = {
+    'simple': {
+        'command': lambda port: [sys.executable, 'simple_app.py', '--host', '127.0.0.1', '--port', str(port)],
+        'calculate': '/api/calculate',
+        'defaults': '/api/defaults'
+    },
+    'async': {
+        'command': lambda port: [sys.executable, 'async_app.py', '--host', '127.0.0.1', '--port', str(port)],
+        'calculate': '/api/calculate',
+        'defaults': '/api/defaults'
+    },
+    'flask': {
+        'command': lambda port: [
+            sys.executable, '-c',
+            'import app; from werkzeug.serving import make_server; '
+            f"make_server('127.0.0.1', {port}, app.app, threaded=True).serve_forever()"
+        ],
+        'calculate': '/calculate',
+        'defaults': '/get_defaults'
+    }
+}
+
+
+# =============================================================================
+# MEASUREMENT
+# =============================================================================
+
+def measure(func: Callable[[], object], repeat: int = 5, min_time: float = 0.2) -> Dict:
+    """Time a function like timeit: calibrate the loop count, then report per-call times."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time / repeat or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_time / (repeat * 10) else 2
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        timings.append((time.perf_counter() - started) / loops)
+    return {
+        'best_s': min(timings),
+        'median_s': statistics.median(timings),
+        'loops': loops,
+        'repeat': repeat
+    }
+
+
+def record(group: str, name: str, params: Dict, metrics: Dict, primary: str, higher_is_better: bool) -> Dict:
+    """Build one benchmark result."""
+    return {
+        'group': group,
+        'name': name,
+        'params': params,
+        'metrics': metrics,
+        'primary': primary,
+        'higher_is_better': higher_is_better
+    }
+
+
+# =============================================================================
+# BENCHMARKS
+# =============================================================================
+
+def bench_engine(quick: bool) -> List[Dict]:
+    """Contribution margin throughput: one Python call per value vs one NumPy call per array."""
+    calculator = simple_app.calculator
+    results = []
+    for size in ((10_000, 100_000) if quick else (10_000, 100_000, 1_000_000)):
+        rng = np.random.default_rng(0)
+        revenue = rng.uniform(100_000, 2_000_000, size)
+        mer = rng.uniform(2, 12, size)
+        revenue_list, mer_list = revenue.tolist(), mer.tolist()
+
+        def scalar():
+            for r, m in zip(revenue_list, mer_list):
+                calculator.calculate_contribution_margin(r, m, 0.65)
+
+        def vectorized():
+            mer_engine.contribution_margin(revenue, mer, 0.65)
+
+        for name, func in (('cm_scalar', scalar), ('cm_vectorized', vectorized)):
+            timing = measure(func, repeat=3 if quick else 5)
+            timing['values_per_s'] = size / timing['best_s']
+            results.append(record('engine', name, {'values': size}, timing, 'values_per_s', True))
+    return results
+
+
+def bench_range(quick: bool) -> List[Dict]:
+    """generate_revenue_range_data latency at growing range sizes."""
+    calculator = simple_app.calculator
+    results = []
+    for points in ((10, 1_000, 100_000) if quick else (10, 100, 1_000, 10_000, 100_000, 1_000_000)):
+        timing = measure(lambda: calculator.generate_revenue_range_data(
+            7.5, 820000, 0.65, 20000, points_before=points, points_after=points
+        ), repeat=3 if quick else 5)
+        timing['points_per_s'] = (2 * points + 1) / timing['best_s']
+        results.append(record('range', 'revenue_range_data', {'points': 2 * points + 1},
+                              timing, 'best_s', False))
+    return results
+
+
+def bench_charts(quick: bool) -> List[Dict]:
+    """Chart render latency for each quality tier (dpi) and image format."""
+    calculator = simple_app.calculator
+    renderer = mer_charts.ChartRenderer(pool_size=1)
+    revenue_values, cm_values = calculator.generate_revenue_range_data(7.5, 820000, 0.65, 20000)
+    target_cm = calculator.calculate_contribution_margin(820000, 7.5, 0.65)
+
+    results = []
+    qualities = ('preview', 'standard') if quick else tuple(mer_charts.QUALITY_TIERS)
+    for quality in qualities:
+        for image_format in mer_charts.IMAGE_FORMATS:
+            params = {'quality': quality, 'dpi': mer_charts.QUALITY_TIERS[quality]['dpi'], 'format': image_format}
+            render = lambda: renderer.render(revenue_values, cm_values, 7.5, 820000, target_cm,
+                                             176000, 0.65, quality, image_format)
+            try:
+                image = render()
+            except Exception as e:
+                print(f"   ⚠️  {quality}/{image_format} skipped: {e}")
+                continue
+            timing = measure(render, repeat=3, min_time=0.5 if quick else 1.0)
+            timing['bytes'] = len(image)
+            results.append(record('charts', 'render_chart', params, timing, 'best_s', False))
+    return results
+
+
+def free_port() -> int:
+    """An unused local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(name: str, port: int, timeout: float = 30) -> subprocess.Popen:
+    """Start a server in a subprocess and wait until it accepts connections."""
+    process = subprocess.Popen(SERVERS[name]['command'](port), cwd=REPO_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{name} server exited with code {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'{name} server did not start within {timeout:.0f}s')
+
+
+def stop_server(process: subprocess.Popen):
+    """Stop a server subprocess."""
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_load(port: int, method: str, path: str, body: Optional[Callable[[int], bytes]],
+             clients: int, duration: float) -> Dict:
+    """Drive a server with keep-alive clients for `duration` seconds and summarize latency."""
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+    deadline = time.perf_counter() + duration
+
+    def client(index: int):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        sequence = index
+        while time.perf_counter() < deadline:
+            payload = body(sequence) if body else None
+            headers = {'Content-Type': 'application/json'} if payload else {}
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=payload, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors[index] += 1
+                if response.will_close:
+                    connection.close()
+            except (OSError, http.client.HTTPException):
+                errors[index] += 1
+                connection.close()
+                continue
+            latencies[index].append(time.perf_counter() - started)
+            sequence += clients
+        connection.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples = np.concatenate([np.asarray(values) for values in latencies]) if any(latencies) else np.zeros(0)
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99]) if samples.size else (np.nan, np.nan, np.nan)
+    return {
+        'requests': int(samples.size),
+        'errors': sum(errors),
+        'seconds': elapsed,
+        'requests_per_s': samples.size / elapsed,
+        'p50_ms': float(p50) * 1000,
+        'p90_ms': float(p90) * 1000,
+        'p99_ms': float(p99) * 1000,
+        'max_ms': float(samples.max()) * 1000 if samples.size else float('nan')
+    }
+
+
+def calculate_body(sequence: int) -> bytes:
+    """A calculation request; inputs vary so most requests miss the result cache."""
+    return json.dumps({
+        'target_revenue': 500000 + (sequence % 100000) * 10,
+        'target_mer': 7.5,
+        'variable_cost': 0.65,
+        'contribution_margin_goal': 176000,
+        'revenue_increment': 20000
+    }).encode('utf-8')
+
+
+def bench_http(quick: bool, servers: List[str], clients: int, duration: float) -> List[Dict]:
+    """End-to-end throughput and latency of each server under concurrent load."""
+    results = []
+    duration = min(duration, 3.0) if quick else duration
+    for name in servers:
+        if name == 'flask':
+            try:
+                import flask  # noqa: F401
+            except ImportError:
+                print("   ⚠️  flask skipped: Flask is not installed")
+                continue
+        port = free_port()
+        try:
+            process = start_server(name, port)
+        except RuntimeError as e:
+            print(f"   ⚠️  {name} skipped: {e}")
+            continue
+        try:
+            routes = (('calculate', 'POST', SERVERS[name]['calculate'], calculate_body),
+                      ('defaults', 'GET', SERVERS[name]['defaults'], None))
+            for route, method, path, body in routes:
+                # Warm up imports, pools and caches before measuring
+                run_load(port, method, path, body, clients, 0.5)
+                metrics = run_load(port, method, path, body, clients, duration)
+                print(f"   {name:>6} {route:<9} {metrics['requests_per_s']:>9,.0f} req/s   "
+                      f"p50 {metrics['p50_ms']:.2f} ms   p99 {metrics['p99_ms']:.2f} ms   "
+                      f"errors {metrics['errors']}")
+                results.append(record('http', f'{name}_{route}',
+                                      {'server': name, 'path': path, 'clients': clients, 'duration_s': duration},
+                                      metrics, 'requests_per_s', True))
+        finally:
+            stop_server(process)
+    return results
+
+
+# =============================================================================
+# REPORTING
+# =============================================================================
+
+def environment_info() -> Dict:
+    """Where and on what the benchmarks ran."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def benchmark_id(result: Dict) -> str:
+    """Identity of a benchmark across runs: its name and parameters."""
+    return f"{result['name']}{json.dumps(result['params'], sort_keys=True)}"
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float = REGRESSION_THRESHOLD) -> int:
+    """Print the change in each primary metric against a baseline run; returns the regression count."""
+    previous = {benchmark_id(result): result for result in baseline['benchmarks']}
+    regressions = 0
+    print(f"\n📊 Compared with {baseline['environment'].get('commit') or 'baseline'}:")
+    for result in results:
+        old = previous.get(benchmark_id(result))
+        if old is None:
+            continue
+        metric = result['primary']
+        before, after = old['metrics'][metric], result['metrics'][metric]
+        if not before:
+            continue
+        change = (after - before) / before
+        worse = -change if result['higher_is_better'] else change
+        marker = '❌' if worse > threshold else ('✅' if worse < -threshold else '  ')
+        regressions += worse > threshold
+        print(f"   {marker} {benchmark_id(result):<70} {metric} {before:.4g} → {after:.4g} ({change:+.1%})")
+    return regressions
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description='Benchmark the MER calculator engine, charts and servers.')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARK_GROUPS, help='Benchmark groups to run (default: all)')
+    parser.add_argument('--quick', action='store_true', help='Smaller sizes and shorter runs')
+    parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS),
+                        help='Servers for the http group (default: all)')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent HTTP clients (default: 16)')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of load per route (default: 10)')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON results file')
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help=f'Relative slowdown reported as a regression (default: {REGRESSION_THRESHOLD})')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """Run the selected benchmarks and write the results."""
+    args = parse_args(argv)
+    groups = args.only or BENCHMARK_GROUPS
+
+    print("🧮 MER Calculator Benchmarks")
+    print("=" * 50)
+    results = []
+    for group in groups:
+        print(f"⏱️  {group}...")
+        if group == 'http':
+            results += bench_http(args.quick, args.servers, args.clients, args.duration)
+            continue
+        runner = {'engine': bench_engine, 'range': bench_range, 'charts': bench_charts}[group]
+        for result in runner(args.quick):
+            print(f"   {benchmark_id(result):<70} {result['primary']} {result['metrics'][result['primary']]:.4g}")
+            results.append(result)
+
+    report = {'environment': environment_info(), 'benchmarks': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 {len(results)} results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {regressions} regression(s) beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
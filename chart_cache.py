@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Calculator - Chart Cache
+Content-addressed LRU cache for rendered chart images.
+
+Charts are keyed on a hash of their normalized inputs, so a repeated
+scenario returns its cached image without touching matplotlib. Entries are
+evicted by count and by total byte size, and can optionally be persisted
+to a local directory that survives restarts.
+
+Chart specs (the inputs needed to render a chart) can be registered under
+their content address ahead of time, so an image endpoint can render the
+chart lazily the first time its URL is requested. Concurrent requests for a
+chart that is not cached yet share one render. Registered specs live in
+process memory; with a cache directory they are also written next to the
+charts, which is what lets another worker process serve a chart URL issued
+by this one. The disk tier keeps at most `max_specs` spec files, oldest
+first out.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+
+def _normalize(value):
+    """Normalize a key component so equal inputs always hash the same way."""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return format(float(value), '.10g')
+    return str(value)
+
+
+class _Render:
+    """A render in progress that concurrent requests for the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.data = None
+
+
+def make_key(**params) -> str:
+    """Return the content address (SHA-256 hex digest) of a set of chart inputs."""
+    normalized = {name: _normalize(value) for name, value in params.items()}
+    payload = json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ChartCache:
+    """Thread-safe LRU cache of rendered chart bytes with an optional disk tier."""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024,
+                 cache_dir: Optional[str] = None, max_disk_bytes: int = 512 * 1024 * 1024,
+                 max_specs: int = 4096):
+        """Initialize the cache with entry-count and byte budgets."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_specs = max_specs
+
+        self._entries = OrderedDict()
+        self._specs = OrderedDict()
+        self._rendering = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._disk_bytes = 0
+        self._disk_specs = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            for entry in os.scandir(cache_dir):
+                if entry.name.endswith('.chart'):
+                    self._disk_bytes += entry.stat().st_size
+                elif entry.name.endswith('.spec.json'):
+                    self._disk_specs += 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return cached bytes for a key, or None on a miss."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, data)
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Store rendered bytes under a key, evicting least recently used entries."""
+        with self._lock:
+            self._store(key, data)
+        self._write_disk(key, data)
+
+    def get_or_render(self, key: str, render: Callable[[], bytes]) -> bytes:
+        """Return cached bytes for a key, rendering and caching them on a miss.
+        
+        Only one caller renders a given key at a time; the others wait for its bytes.
+        If that render fails, a waiting caller renders the chart itself.
+        """
+        while True:
+            data = self.get(key)
+            if data is not None:
+                return data
+
+            with self._lock:
+                # Stored by a render that finished since the lookup above
+                data = self._entries.get(key)
+                if data is not None:
+                    return data
+                pending = self._rendering.get(key)
+                leader = pending is None
+                if leader:
+                    pending = self._rendering[key] = _Render()
+
+            if not leader:
+                pending.done.wait()
+                if pending.data is not None:
+                    return pending.data
+                continue
+
+            try:
+                pending.data = render()
+                self.put(key, pending.data)
+                return pending.data
+            finally:
+                with self._lock:
+                    del self._rendering[key]
+                pending.done.set()
+
+    def register(self, spec: Dict) -> str:
+        """Register the inputs of a chart and return its content address."""
+        key = make_key(**spec)
+        with self._lock:
+            self._specs[key] = dict(spec)
+            self._specs.move_to_end(key)
+            while len(self._specs) > self.max_specs:
+                self._specs.popitem(last=False)
+
+        if self.cache_dir:
+            self._write_spec(key, spec)
+        return key
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """Return the registered chart spec for a content address, or None if unknown."""
+        with self._lock:
+            spec = self._specs.get(key)
+        if spec is not None or not self.cache_dir:
+            return spec
+
+        # Specs registered by another worker sharing the disk tier
+        try:
+            with open(os.path.join(self.cache_dir, f'{os.path.basename(key)}.spec.json'), 'r') as f:
+                spec = json.load(f)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._specs[key] = spec
+        return spec
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and current cache usage."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'disk_bytes': self._disk_bytes if self.cache_dir else None,
+                'disk_specs': self._disk_specs if self.cache_dir else None,
+                'registered_specs': len(self._specs)
+            }
+
+    def clear(self):
+        """Drop every in-memory entry (the disk tier is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _store(self, key: str, data: bytes):
+        """Insert an entry and evict until both budgets are met. Caller holds the lock."""
+        if len(data) > self.max_bytes:
+            return
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+
+        self._entries[key] = data
+        self._bytes += len(data)
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def _disk_path(self, key: str) -> str:
+        """Return the disk tier path for a key."""
+        return os.path.join(self.cache_dir, f'{os.path.basename(key)}.chart')
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        """Read an entry from the disk tier, if enabled and present."""
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        """Atomically write an entry to the disk tier, pruning the oldest files when over budget."""
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        if os.path.exists(path) or not self._write_file(path, data):
+            return
+
+        with self._lock:
+            self._disk_bytes += len(data)
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._prune_disk()
+
+    def _write_file(self, path: str, data: bytes) -> bool:
+        """Write a file atomically through a temp file plus rename, removing the temp file on failure."""
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        except OSError:
+            return False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+            return True
+        except OSError:
+            return False
+        finally:
+            # Already renamed away on success
+            if os.path.exists(temp_path):
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+
+    def _write_spec(self, key: str, spec: Dict):
+        """Persist a spec for other workers, pruning the oldest spec files beyond `max_specs`."""
+        spec_path = os.path.join(self.cache_dir, f'{key}.spec.json')
+        if os.path.exists(spec_path):
+            # Re-registered specs are recently used; keep them out of the next prune
+            try:
+                os.utime(spec_path)
+            except OSError:
+                pass
+            return
+        if not self._write_file(spec_path, json.dumps(spec).encode('utf-8')):
+            return
+
+        with self._lock:
+            self._disk_specs += 1
+            over_budget = self._disk_specs > self.max_specs
+        if over_budget:
+            self._prune_specs()
+
+    def _prune_specs(self):
+        """Delete the oldest spec files until the disk tier is back under `max_specs`."""
+        files = sorted((entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.spec.json')),
+                       key=lambda entry: entry.stat().st_mtime)
+        count = len(files)
+        for entry in files:
+            if count <= self.max_specs * 0.9:
+                break
+            try:
+                os.remove(entry.path)
+                count -= 1
+            except OSError:
+                continue
+        with self._lock:
+            self._disk_specs = count
+
+    def _prune_disk(self):
+        """Delete the oldest disk entries until the disk tier is back under budget."""
+        files = sorted((entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.chart')),
+                       key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in files)
+        for entry in files:
+            if total <= self.max_disk_bytes * 0.9:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                continue
+        with self._lock:
+            self._disk_bytes = total
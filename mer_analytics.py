@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Calculator - Closed-Form Analytics
+Exact answers to contribution margin questions without scanning sampled ranges.
+
+Contribution margin is linear in revenue:
+
+    CM = Revenue × ((1 - Variable Cost) - 1 / MER) = Revenue × coefficient
+
+so break-even points and range extrema have closed forms. Every function
+broadcasts over NumPy arrays, answering any number of scenarios in O(1)
+each. Where a question has no answer (e.g. the goal is unreachable because
+each euro of revenue loses money), the `unreachable` value is returned.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+
+def _as_float(value) -> np.ndarray:
+    """Convert a scalar, list or array to a float64 array."""
+    return np.asarray(value, dtype=np.float64)
+
+
+def _contribution_margin(revenue, mer, variable_cost) -> np.ndarray:
+    """CM with the same operation order as mer_engine, so endpoint values match sampled ones exactly."""
+    revenue = _as_float(revenue)
+    return revenue * (1 - _as_float(variable_cost)) - revenue / _as_float(mer)
+
+
+def cm_coefficient(mer, variable_cost) -> np.ndarray:
+    """Contribution margin earned per euro of revenue: (1 - Variable Cost) - 1 / MER."""
+    return (1 - _as_float(variable_cost)) - 1 / _as_float(mer)
+
+
+def break_even_revenue(goal, mer, variable_cost, unreachable: float = np.nan) -> np.ndarray:
+    """Minimum revenue whose contribution margin reaches a (positive) goal."""
+    coefficient = cm_coefficient(mer, variable_cost)
+    positive = coefficient > 0
+    return np.where(positive, _as_float(goal) / np.where(positive, coefficient, 1), unreachable)
+
+
+def break_even_mer(revenue, goal, variable_cost, unreachable: float = np.nan) -> np.ndarray:
+    """Minimum MER at which a revenue reaches a (positive) contribution margin goal.
+
+    CM >= goal  ⇔  Revenue ÷ MER <= Revenue × (1 - Variable Cost) - goal,
+    which has a solution only when gross profit exceeds the goal.
+    """
+    revenue = _as_float(revenue)
+    headroom = revenue * (1 - _as_float(variable_cost)) - _as_float(goal)
+    positive = headroom > 0
+    return np.where(positive, revenue / np.where(positive, headroom, 1), unreachable)
+
+
+def max_variable_cost(revenue, mer, goal, unreachable: float = np.nan) -> np.ndarray:
+    """Highest variable cost at which a revenue and MER still reach the goal.
+
+    CM >= goal  ⇔  Variable Cost <= 1 - 1 / MER - goal ÷ Revenue.
+    """
+    revenue = _as_float(revenue)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        limit = 1 - 1 / _as_float(mer) - _as_float(goal) / revenue
+    return np.where((revenue > 0) & (limit >= 0), limit, unreachable)
+
+
+def range_extrema(first_revenue, last_revenue, mer, variable_cost) -> Dict[str, np.ndarray]:
+    """Min/max revenue and contribution margin over a revenue range.
+
+    CM is linear in revenue, so its extrema are at the range endpoints.
+    """
+    first_revenue = _as_float(first_revenue)
+    last_revenue = _as_float(last_revenue)
+    first_cm = _contribution_margin(first_revenue, mer, variable_cost)
+    last_cm = _contribution_margin(last_revenue, mer, variable_cost)
+    return {
+        'min_revenue': np.minimum(first_revenue, last_revenue),
+        'max_revenue': np.maximum(first_revenue, last_revenue),
+        'min_cm': np.minimum(first_cm, last_cm),
+        'max_cm': np.maximum(first_cm, last_cm)
+    }
+
+
+def analyze(revenue, mer, variable_cost, goal, unreachable: float = np.nan) -> Dict[str, np.ndarray]:
+    """Every per-scenario figure shown by the calculators, computed in one vectorized pass."""
+    revenue = _as_float(revenue)
+    mer = _as_float(mer)
+    variable_cost = _as_float(variable_cost)
+    goal = _as_float(goal)
+
+    gross_profit = revenue * (1 - variable_cost)
+    marketing_spend = revenue / mer
+    contribution_margin = gross_profit - marketing_spend
+    min_revenue = break_even_revenue(goal, mer, variable_cost, unreachable)
+
+    return {
+        'contribution_margin': contribution_margin,
+        'meets_goal': contribution_margin >= goal,
+        'difference': contribution_margin - goal,
+        'min_revenue': min_revenue,
+        'revenue_difference': revenue - min_revenue,
+        'min_mer': break_even_mer(revenue, goal, variable_cost, unreachable),
+        'max_variable_cost': max_variable_cost(revenue, mer, goal, unreachable),
+        'gross_profit': gross_profit,
+        'marketing_spend': marketing_spend
+    }
+
+
+def scenario_summary(revenue: float, mer: float, variable_cost: float, goal: float) -> Dict:
+    """analyze() for one scenario as JSON-ready Python values.
+
+    Keeps the web API conventions: an unreachable goal gives a min_revenue of 0,
+    and a min_mer / max_variable_cost of None.
+    """
+    summary = {}
+    for name, value in analyze(revenue, mer, variable_cost, goal).items():
+        value = value.item()
+        summary[name] = None if isinstance(value, float) and np.isnan(value) else value
+
+    if summary['min_revenue'] is None:
+        summary['min_revenue'] = 0.0
+        summary['revenue_difference'] = float(revenue)
+    return summary
+
+
+def goal_frontier(revenue_values, goals, variable_cost, unreachable: float = np.nan) -> Dict[str, np.ndarray]:
+    """Iso-goal curves over a revenue axis, one row per goal level.
+
+    For each (goal, revenue) pair the frontier is the lowest MER, or equivalently
+    the highest marketing spend, that still reaches the goal:
+
+        max spend = Revenue × (1 - Variable Cost) - goal,  min MER = Revenue ÷ max spend
+
+    Revenue below goal ÷ (1 - Variable Cost) cannot reach the goal at any MER.
+    """
+    revenue = _as_float(revenue_values).reshape(1, -1)
+    goals = _as_float(goals).reshape(-1, 1)
+    variable_cost = _as_float(variable_cost)
+
+    max_spend = revenue * (1 - variable_cost) - goals
+    reachable = max_spend > 0
+    return {
+        'min_mer': break_even_mer(revenue, goals, variable_cost, unreachable),
+        'max_marketing_spend': np.where(reachable, max_spend, unreachable),
+        'reachable': reachable,
+        'min_revenue': goals[:, 0] / (1 - variable_cost)
+    }
+
+
+def cm_partials(revenue, mer, variable_cost) -> Dict[str, np.ndarray]:
+    """Partial derivatives of contribution margin with respect to each input.
+
+        ∂CM/∂Revenue = (1 - Variable Cost) - 1 / MER
+        ∂CM/∂MER = Revenue ÷ MER²
+        ∂CM/∂Variable Cost = -Revenue
+    """
+    revenue, mer, variable_cost = np.broadcast_arrays(_as_float(revenue), _as_float(mer), _as_float(variable_cost))
+    return {
+        'revenue': cm_coefficient(mer, variable_cost),
+        'mer': revenue / (mer * mer),
+        'variable_cost': -revenue
+    }
+
+
+def cm_elasticities(revenue, mer, variable_cost) -> Dict[str, np.ndarray]:
+    """Percentage change in contribution margin per 1% change in each input (NaN where CM is 0)."""
+    values = {'revenue': _as_float(revenue), 'mer': _as_float(mer), 'variable_cost': _as_float(variable_cost)}
+    cm = _contribution_margin(revenue, mer, variable_cost)
+    nonzero = cm != 0
+    safe_cm = np.where(nonzero, cm, 1)
+    return {
+        name: np.where(nonzero, partial * values[name] / safe_cm, np.nan)
+        for name, partial in cm_partials(revenue, mer, variable_cost).items()
+    }
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Calculator - Chart Rendering
+Thread-safe matplotlib rendering through the object-oriented Figure/Agg API.
+
+Figures are built once (style, labels, formatters, layout) and kept in a
+pool. Each render only updates the data-dependent artists of a pooled
+figure and redraws it. The chart style is applied to each figure explicitly
+rather than through rcParams, so no pyplot or rc global state is touched and
+several threads can build and render figures at the same time.
+"""
+
+import io
+import queue
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from matplotlib import font_manager, style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+
+import mer_metrics
+
+# Part of every chart's content address: bump it whenever a change to CHART_STYLE,
+# QUALITY_TIERS, the compression settings or the figure code changes how charts look,
+# so browsers, CDNs and the chart cache stop serving images drawn the old way
+RENDERER_VERSION = 1
+
+CHART_STYLE = 'seaborn-v0_8-whitegrid'
+
+# The style's settings, applied per figure by _apply_style (style.context() would change the
+# process-wide rcParams while other threads build or draw figures)
+_STYLE = style.library[CHART_STYLE]
+# Only installed families, so text lookups do not log a warning for each missing one
+_INSTALLED_FONTS = {font.name for font in font_manager.fontManager.ttflist}
+_FONT = [name for name in _STYLE['font.sans-serif'] if name == 'sans-serif' or name in _INSTALLED_FONTS]
+_TEXT_COLOR = _STYLE['text.color']
+
+# Output quality tiers: a fast preview for the interactive UI, print for exports
+QUALITY_TIERS = {
+    'preview': {'dpi': 72, 'figsize': (10, 6.5), 'tight_bbox': False},
+    'standard': {'dpi': 150, 'figsize': (12, 8), 'tight_bbox': False},
+    'print': {'dpi': 300, 'figsize': (12, 8), 'tight_bbox': True}
+}
+
+# Seconds a render waits for an idle pooled figure before re-checking whether it may build one
+POOL_WAIT_SECONDS = 1.0
+
+# Supported output formats and their MIME types
+IMAGE_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg'
+}
+
+# Default and allowed compression settings: zlib level for PNG, quality for lossy formats
+COMPRESSION_DEFAULTS = {'png': 6, 'webp': 80, 'jpeg': 85}
+COMPRESSION_RANGES = {'png': (0, 9), 'webp': (1, 100), 'jpeg': (1, 95)}
+
+
+def _format_euro(value, position) -> str:
+    """Format an axis tick as a whole-euro amount."""
+    return f'€{value:,.0f}'
+
+
+def _apply_style(figure: Figure, ax):
+    """Apply CHART_STYLE to a figure and its axes without touching the global rcParams.
+    
+    Tick and grid settings go through tick_params, so ticks created later
+    (e.g. after autoscaling) keep the style too. Tick label fonts cannot be set
+    that way before matplotlib 3.8, so _style_tick_labels sets them per update.
+    """
+    figure.set_facecolor(_STYLE['figure.facecolor'])
+    ax.set_facecolor(_STYLE['axes.facecolor'])
+    ax.set_axisbelow(_STYLE['axes.axisbelow'])
+    for spine in ax.spines.values():
+        spine.set_edgecolor(_STYLE['axes.edgecolor'])
+        spine.set_linewidth(_STYLE['axes.linewidth'])
+
+    for axis in ('x', 'y'):
+        ax.tick_params(axis=axis, which='both', direction=_STYLE[f'{axis}tick.direction'],
+                       colors=_STYLE[f'{axis}tick.color'],
+                       grid_color=_STYLE['grid.color'], grid_linestyle=_STYLE['grid.linestyle'],
+                       grid_solid_capstyle=_STYLE['lines.solid_capstyle'])
+        ax.tick_params(axis=axis, which='major', length=_STYLE[f'{axis}tick.major.size'])
+        ax.tick_params(axis=axis, which='minor', length=_STYLE[f'{axis}tick.minor.size'])
+    ax.grid(_STYLE['axes.grid'])
+
+    for label in (ax.xaxis.label, ax.yaxis.label):
+        label.set_color(_STYLE['axes.labelcolor'])
+        label.set_fontfamily(_FONT)
+    ax.title.set_color(_TEXT_COLOR)
+    ax.title.set_fontfamily(_FONT)
+
+
+def _style_tick_labels(ax):
+    """Set the style's font on the current tick labels (creating the ticks for the current view)."""
+    for label in ax.get_xticklabels(which='both') + ax.get_yticklabels(which='both'):
+        label.set_fontfamily(_FONT)
+
+
+def resolve_output(quality: str = 'standard', image_format: str = 'png',
+                   compression: Optional[int] = None) -> Dict:
+    """Validate output options and return the full output settings for a render."""
+    if quality not in QUALITY_TIERS:
+        raise ValueError(f"Unknown chart quality '{quality}' (choose from {', '.join(QUALITY_TIERS)})")
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unknown chart format '{image_format}' (choose from {', '.join(IMAGE_FORMATS)})")
+
+    if image_format in COMPRESSION_DEFAULTS:
+        low, high = COMPRESSION_RANGES[image_format]
+        if compression is None:
+            compression = COMPRESSION_DEFAULTS[image_format]
+        elif not low <= int(compression) <= high:
+            raise ValueError(f'Compression for {image_format} must be between {low} and {high}')
+        compression = int(compression)
+    else:
+        compression = None
+
+    return {'quality': quality, 'format': image_format, 'compression': compression}
+
+
+def _save_kwargs(output: Dict) -> Dict:
+    """Return savefig keyword arguments for resolved output settings."""
+    tier = QUALITY_TIERS[output['quality']]
+    kwargs = {'format': output['format'], 'dpi': tier['dpi']}
+    if tier['tight_bbox']:
+        kwargs['bbox_inches'] = 'tight'
+
+    if output['format'] == 'png':
+        kwargs['pil_kwargs'] = {'compress_level': output['compression']}
+    elif output['format'] == 'jpeg':
+        kwargs['pil_kwargs'] = {'quality': output['compression'], 'optimize': True}
+    elif output['format'] == 'webp':
+        kwargs['pil_kwargs'] = {'quality': output['compression']}
+    return kwargs
+
+
+class ContributionMarginFigure:
+    """A pre-built contribution margin vs revenue figure whose artists are updated per render."""
+
+    def __init__(self, figsize: Tuple[float, float] = (12, 8)):
+        """Build the figure, its artists and layout once."""
+        self.figure = Figure(figsize=figsize)
+        FigureCanvasAgg(self.figure)
+        ax = self.figure.add_subplot()
+        self.ax = ax
+        _apply_style(self.figure, ax)
+
+        # Main line plot - Shows how CM changes with revenue
+        # Placeholder data sized like real euro amounts so the one-off layout leaves room for tick labels
+        self.cm_line, = ax.plot([0, 10_000_000], [0, 10_000_000], 'b-', linewidth=3,
+                                label='Contribution Margin', marker='o', markersize=4,
+                                solid_capstyle=_STYLE['lines.solid_capstyle'])
+
+        # Goal line - Horizontal line showing the CM goal
+        self.goal_line = ax.axhline(y=0, color='orange', linestyle='--', linewidth=3, label='CM Goal')
+
+        # Highlight target point
+        self.target_point = ax.scatter([0], [0], color='red', s=150, zorder=5,
+                                       label='Your Target', marker='*')
+
+        # Text annotation for the target point
+        self.target_annotation = ax.annotate('', xy=(0, 0), xytext=(10, 10),
+                                             textcoords='offset points',
+                                             bbox=dict(boxstyle='round,pad=0.3', facecolor='red', alpha=0.7),
+                                             color='white', fontweight='bold', fontfamily=_FONT)
+
+        # Formatting
+        ax.set_xlabel('Revenue (€)', fontsize=12, fontweight='bold')
+        ax.set_ylabel('Contribution Margin (€)', fontsize=12, fontweight='bold')
+        self.title = ax.set_title('Contribution Margin vs Revenue', fontsize=14, fontweight='bold')
+        ax.grid(True, alpha=0.3)
+
+        # Enhanced legend
+        self.legend = ax.legend(loc='upper left', prop={'family': _FONT, 'size': 11}, labelcolor=_TEXT_COLOR,
+                                frameon=True, fancybox=True, shadow=True)
+
+        # Format axes
+        ax.yaxis.set_major_formatter(FuncFormatter(_format_euro))
+        ax.xaxis.set_major_formatter(FuncFormatter(_format_euro))
+        ax.tick_params(axis='x', labelrotation=45)
+
+        # Explanation text
+        self.formula_text = self.figure.text(0.02, 0.02, '', fontsize=10, style='italic', alpha=0.7,
+                                             color=_TEXT_COLOR, fontfamily=_FONT)
+
+        _style_tick_labels(ax)
+        self.figure.tight_layout()
+
+    def update(self, revenue_values: List[float], cm_values: List[float],
+               target_mer: float, target_revenue: float, target_cm: float,
+               cm_goal: float, variable_cost: float):
+        """Point the pre-built artists at a new scenario."""
+        self.cm_line.set_data(revenue_values, cm_values)
+        self.goal_line.set_ydata([cm_goal, cm_goal])
+        self.target_point.set_offsets([[target_revenue, target_cm]])
+        self.target_annotation.xy = (target_revenue, target_cm)
+        self.target_annotation.set_text(f'€{target_cm:,.0f}')
+
+        legend_texts = self.legend.get_texts()
+        legend_texts[1].set_text(f'CM Goal: €{cm_goal:,.0f}')
+        legend_texts[2].set_text(f'Your Target: €{target_revenue:,.0f} → €{target_cm:,.0f}')
+
+        self.title.set_text(f'Contribution Margin vs Revenue\n(MER: {target_mer*100:.0f}%)')
+        self.formula_text.set_text(
+            f"Formula: Revenue × {(1-variable_cost)*100:.0f}% - (Revenue ÷ {target_mer:.1f})"
+        )
+
+        self.ax.relim()
+        self.ax.autoscale_view()
+        _style_tick_labels(self.ax)
+
+    def save(self, output: Dict) -> bytes:
+        """Draw the figure and return the encoded image bytes."""
+        img = io.BytesIO()
+        self.figure.savefig(img, **_save_kwargs(output))
+        return img.getvalue()
+
+
+class TornadoFigure:
+    """A pre-built tornado chart: how far each driver's range moves contribution margin."""
+
+    def __init__(self, figsize: Tuple[float, float] = (12, 8), bars: int = 3):
+        """Build the figure, its bars and layout once."""
+        self.figure = Figure(figsize=figsize)
+        FigureCanvasAgg(self.figure)
+        ax = self.figure.add_subplot()
+        self.ax = ax
+        _apply_style(self.figure, ax)
+
+        positions = list(range(bars))
+        self.low_bars = ax.barh(positions, [1] * bars, height=0.6, color='#e74c3c', alpha=0.85,
+                                label='Driver at low end')
+        self.high_bars = ax.barh(positions, [1] * bars, height=0.6, color='#27ae60', alpha=0.85,
+                                 label='Driver at high end')
+        self.base_line = ax.axvline(x=0, color='black', linewidth=2, label='Base CM',
+                                    solid_capstyle=_STYLE['lines.solid_capstyle'])
+        self.goal_line = ax.axvline(x=0, color='orange', linestyle='--', linewidth=3, label='CM Goal')
+        self.value_labels = [
+            (ax.text(0, position, '', va='center', ha='right', fontsize=10, color=_TEXT_COLOR, fontfamily=_FONT),
+             ax.text(0, position, '', va='center', ha='left', fontsize=10, color=_TEXT_COLOR, fontfamily=_FONT))
+            for position in positions
+        ]
+
+        # Formatting
+        ax.set_yticks(positions)
+        ax.invert_yaxis()
+        ax.set_xlabel('Contribution Margin (€)', fontsize=12, fontweight='bold')
+        self.title = ax.set_title('Sensitivity of Contribution Margin', fontsize=14, fontweight='bold')
+        ax.grid(True, axis='x', alpha=0.3)
+        self.legend = ax.legend(loc='lower right', prop={'family': _FONT, 'size': 11}, labelcolor=_TEXT_COLOR,
+                                frameon=True, fancybox=True, shadow=True)
+        ax.xaxis.set_major_formatter(FuncFormatter(_format_euro))
+
+        _style_tick_labels(ax)
+        self.figure.tight_layout()
+        # Leave room for driver labels such as "Target Revenue\n€738,000 – €902,000"
+        self.figure.subplots_adjust(left=0.2)
+
+    def update(self, tornado: List[Dict], base_cm: float, cm_goal: float):
+        """Point the pre-built bars at a new set of tornado results (largest swing first)."""
+        for position, bar in enumerate(tornado):
+            for rect, cm in ((self.low_bars[position], bar['cm_low']), (self.high_bars[position], bar['cm_high'])):
+                rect.set_x(min(base_cm, cm))
+                rect.set_width(abs(cm - base_cm))
+            for text, cm in zip(self.value_labels[position], sorted((bar['cm_low'], bar['cm_high']))):
+                text.set_position((cm, position))
+                text.set_text(f' €{cm:,.0f} ')
+
+        self.ax.set_yticklabels([
+            f"{bar['label']}\n{_format_driver(bar['driver'], bar['low'])} – {_format_driver(bar['driver'], bar['high'])}"
+            for bar in tornado
+        ])
+        self.base_line.set_xdata([base_cm, base_cm])
+        self.goal_line.set_xdata([cm_goal, cm_goal])
+
+        legend_texts = self.legend.get_texts()
+        legend_texts[0].set_text(f'Base CM: €{base_cm:,.0f}')
+        legend_texts[1].set_text(f'CM Goal: €{cm_goal:,.0f}')
+
+        values = [base_cm, cm_goal] + [cm for bar in tornado for cm in (bar['cm_low'], bar['cm_high'])]
+        pad = (max(values) - min(values)) * 0.15 or abs(base_cm) * 0.1 or 1.0
+        self.ax.set_xlim(min(values) - pad, max(values) + pad)
+        _style_tick_labels(self.ax)
+
+    def save(self, output: Dict) -> bytes:
+        """Draw the figure and return the encoded image bytes."""
+        img = io.BytesIO()
+        self.figure.savefig(img, **_save_kwargs(output))
+        return img.getvalue()
+
+
+def _format_driver(driver: str, value: float) -> str:
+    """Format a driver value the way the calculator displays it."""
+    if driver == 'target_revenue':
+        return f'€{value:,.0f}'
+    if driver == 'variable_cost':
+        return f'{value*100:.1f}%'
+    return f'{value:.2f}'
+
+
+class ChartRenderer:
+    """Bounded pools of pre-built figures (one pool per figure type and size) shared by concurrent renders."""
+
+    def __init__(self, pool_size: int = 4):
+        """Initialize empty pools; figures are built on first use up to pool_size per size."""
+        self.pool_size = pool_size
+        self._idle = {}
+        self._created = {}
+        self._lock = threading.Lock()
+
+    def render(self, revenue_values: List[float], cm_values: List[float],
+               target_mer: float, target_revenue: float, target_cm: float,
+               cm_goal: float, variable_cost: float, quality: str = 'standard',
+               image_format: str = 'png', compression: Optional[int] = None) -> bytes:
+        """Render a contribution margin chart with a pooled figure and return the image bytes."""
+        output = resolve_output(quality, image_format, compression)
+        figsize = QUALITY_TIERS[quality]['figsize']
+
+        pool = (ContributionMarginFigure, figsize)
+        chart = self._acquire(pool)
+        try:
+            with mer_metrics.stage('chart_update'):
+                chart.update(revenue_values, cm_values, target_mer, target_revenue,
+                             target_cm, cm_goal, variable_cost)
+            return self._save(chart, output)
+        finally:
+            self._idle[pool].put(chart)
+
+    def render_tornado(self, tornado: List[Dict], base_cm: float, cm_goal: float,
+                       quality: str = 'standard', image_format: str = 'png',
+                       compression: Optional[int] = None) -> bytes:
+        """Render a sensitivity tornado chart with a pooled figure and return the image bytes."""
+        output = resolve_output(quality, image_format, compression)
+        pool = (TornadoFigure, QUALITY_TIERS[quality]['figsize'])
+
+        chart = self._acquire(pool)
+        try:
+            with mer_metrics.stage('chart_update'):
+                chart.update(tornado, base_cm, cm_goal)
+            return self._save(chart, output)
+        finally:
+            self._idle[pool].put(chart)
+
+    def _save(self, chart, output: Dict) -> bytes:
+        """Draw and encode a figure (one savefig call, so one stage) and count the bytes."""
+        with mer_metrics.stage('chart_render'):
+            image = chart.save(output)
+        mer_metrics.record_chart(output['format'], len(image))
+        return image
+
+    def _acquire(self, pool: Tuple[type, Tuple[float, float]]):
+        """Take an idle figure from a (figure class, size) pool, building one while the pool is below size."""
+        with self._lock:
+            idle = self._idle.setdefault(pool, queue.LifoQueue())
+        try:
+            return idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        while True:
+            with self._lock:
+                build = self._created.get(pool, 0) < self.pool_size
+                if build:
+                    self._created[pool] = self._created.get(pool, 0) + 1
+            if build:
+                figure_class, figsize = pool
+                try:
+                    return figure_class(figsize)
+                except Exception:
+                    # Give the slot back so a later acquire can build the figure
+                    with self._lock:
+                        self._created[pool] -= 1
+                    raise
+            try:
+                # Re-check periodically: a failed build frees a slot without returning a figure
+                return idle.get(timeout=POOL_WAIT_SECONDS)
+            except queue.Empty:
+                continue
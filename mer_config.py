@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Calculator - Configuration Profiles
+Named calculator configurations stored in one JSON file.
+
+The file is parsed once and cached against its modification time, so every
+caller shares one read until the file actually changes on disk. Profiles are
+merged with the defaults only when first requested. Saves go to a temporary
+file in the same directory and are renamed over the original, so a crash
+never leaves a half-written configuration behind.
+
+Validation rules are declared once in CONFIG_SCHEMA and compiled into plain
+check functions at import time; the terminal calculator and the web apps
+validate against the same rules.
+"""
+
+import copy
+import json
+import numbers
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Default configuration
+DEFAULT_CONFIG = {
+    'variable_cost': 0.65,              # 65% variable cost
+    'revenue_start_number': 100000,     # €100,000 starting revenue
+    'mer_increment': 0.50,              # 50% MER increment
+    'revenue_increment': 20000,         # €20,000 revenue increment
+    'contribution_margin_goal': 176000  # €176,000 contribution margin goal
+}
+
+# Default user inputs
+DEFAULT_INPUTS = {
+    'target_revenue': 820000,           # €820,000 - Target revenue
+    'target_mer': 7.50                  # 750% MER (7.50 as decimal)
+}
+
+DEFAULT_PROFILE = 'default'
+
+# section -> field -> (exclusive lower bound, exclusive upper bound or None, error message)
+CONFIG_SCHEMA = {
+    'config': {
+        'variable_cost': (0, 1, 'Variable Cost must be between 0 and 1 (e.g., 0.65 for 65%)'),
+        'revenue_start_number': (0, None, 'Revenue Start Number must be greater than 0'),
+        'mer_increment': (0, None, 'MER Increment must be greater than 0'),
+        'revenue_increment': (0, None, 'Revenue Increment must be greater than 0'),
+        'contribution_margin_goal': (0, None, 'Contribution Margin Goal must be greater than 0')
+    },
+    'user_inputs': {
+        'target_revenue': (0, None, 'Target Revenue must be greater than 0'),
+        'target_mer': (0, None, 'Target MER must be greater than 0')
+    }
+}
+
+# Fields a single calculation needs (the web forms do not set the range settings)
+CALCULATION_FIELDS = ('variable_cost', 'revenue_increment', 'contribution_margin_goal',
+                      'target_revenue', 'target_mer')
+
+
+# =============================================================================
+# VALIDATION
+# =============================================================================
+
+def _range_check(low: float, high: Optional[float]) -> Callable[[object], bool]:
+    """Build a check for a number strictly between `low` and `high`."""
+    def check(value) -> bool:
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            return False
+        return low < value and (high is None or value < high)
+    return check
+
+
+def compile_schema(schema: Dict) -> List[Tuple[str, str, Callable[[object], bool], str]]:
+    """Compile a schema into (section, field, check, message) rules."""
+    return [
+        (section, field, _range_check(low, high), message)
+        for section, fields in schema.items()
+        for field, (low, high, message) in fields.items()
+    ]
+
+
+_RULES = compile_schema(CONFIG_SCHEMA)
+
+
+def validate_profile(config: Dict, user_inputs: Dict, fields: Optional[Iterable[str]] = None) -> List[str]:
+    """Validate configuration and user inputs and return list of errors.
+
+    `fields` limits the check to those fields; by default every field is required.
+    """
+    sections = {'config': config, 'user_inputs': user_inputs}
+    selected = None if fields is None else set(fields)
+    return [
+        message for section, field, check, message in _RULES
+        if (selected is None or field in selected) and not check(sections[section].get(field))
+    ]
+
+
+# =============================================================================
+# PROFILE STORE
+# =============================================================================
+
+def _profiles(document: Dict) -> Dict[str, Dict]:
+    """Profiles in a parsed file; a file from before profiles existed is the default profile."""
+    if 'profiles' in document:
+        return document['profiles']
+    if 'config' in document or 'user_inputs' in document:
+        return {DEFAULT_PROFILE: document}
+    return {}
+
+
+class ConfigStore:
+    """Named configuration profiles in one JSON file, cached on its modification time."""
+
+    def __init__(self, path: str = 'mer_calculator_config.json'):
+        """Create a store for `path`; nothing is read until a profile is requested."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._document = {}
+        self._loaded = {}
+        self.reads = 0
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        """(mtime, size) of the file, or None if it does not exist."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _current(self) -> Dict:
+        """The parsed file, re-read only when it changed on disk (call with the lock held)."""
+        signature = self._file_signature()
+        if signature != self._signature:
+            document = {}
+            if signature is not None:
+                with open(self.path, 'r') as f:
+                    document = json.load(f)
+                self.reads += 1
+            self._signature = signature
+            self._document = document
+            self._loaded = {}
+        return self._document
+
+    def exists(self) -> bool:
+        """Whether the configuration file exists."""
+        return os.path.exists(self.path)
+
+    def profile_names(self) -> List[str]:
+        """Names of the saved profiles."""
+        with self._lock:
+            return sorted(_profiles(self._current()))
+
+    def active_profile(self) -> str:
+        """Name of the profile that was saved or selected last."""
+        with self._lock:
+            return self._current().get('active_profile', DEFAULT_PROFILE)
+
+    def load(self, name: Optional[str] = None) -> Dict:
+        """A profile's config, user_inputs and saved_date, with defaults for missing values.
+
+        Raises ValueError if a named profile does not exist; a missing file or
+        default profile gives the defaults. Callers get their own copy.
+        """
+        with self._lock:
+            document = self._current()
+            name = name or document.get('active_profile', DEFAULT_PROFILE)
+            if name not in self._loaded:
+                profiles = _profiles(document)
+                if name not in profiles and name != DEFAULT_PROFILE:
+                    raise ValueError(f"Profile '{name}' not found")
+                stored = profiles.get(name, {})
+                self._loaded[name] = {
+                    'name': name,
+                    'config': dict(DEFAULT_CONFIG, **stored.get('config', {})),
+                    'user_inputs': dict(DEFAULT_INPUTS, **stored.get('user_inputs', {})),
+                    'saved_date': stored.get('saved_date')
+                }
+            return copy.deepcopy(self._loaded[name])
+
+    def _write(self, document: Dict):
+        """Write the file atomically: temporary file in the same directory, then rename."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, temporary = tempfile.mkstemp(prefix='.mer_config_', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(descriptor, 'w') as f:
+                json.dump(document, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self.path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            raise
+        self._signature = self._file_signature()
+        self._document = document
+        self._loaded = {}
+
+    def save(self, config: Dict, user_inputs: Dict, name: Optional[str] = None) -> str:
+        """Save a profile (the active one by default), make it active and return its name."""
+        with self._lock:
+            document = self._current()
+            name = name or document.get('active_profile', DEFAULT_PROFILE)
+            profiles = dict(_profiles(document))
+            profiles[name] = {
+                'config': dict(config),
+                'user_inputs': dict(user_inputs),
+                'saved_date': datetime.now().isoformat()
+            }
+            # The active profile is also kept at the top level, where older versions read it
+            self._write(dict(profiles[name], active_profile=name, profiles=profiles))
+            return name
+
+    def delete(self, name: str):
+        """Delete a saved profile."""
+        with self._lock:
+            document = self._current()
+            profiles = dict(_profiles(document))
+            if name not in profiles:
+                raise ValueError(f"Profile '{name}' not found")
+            del profiles[name]
+            active = document.get('active_profile', DEFAULT_PROFILE)
+            if active == name:
+                active = DEFAULT_PROFILE
+            self._write(dict(profiles.get(active, {}), active_profile=active, profiles=profiles))
+
+
+# One store per file, shared by every caller in the process
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path: str = 'mer_calculator_config.json') -> ConfigStore:
+    """The shared ConfigStore for a configuration file."""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ConfigStore(path)
+        return _stores[key]
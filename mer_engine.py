@@ -0,0 +1,712 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Contribution Margin Engine
+Vectorized NumPy core shared by app.py, simple_app.py and CMCalculator.
+
+All functions accept scalars, lists or NumPy arrays and broadcast them,
+so a single call evaluates any number of revenue / MER / variable cost
+combinations.
+"""
+
+import base64
+import io
+
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import mer_analytics
+import mer_serializer
+
+
+def contribution_margin(revenue, mer, variable_cost) -> np.ndarray:
+    """Calculate contribution margin for broadcastable revenue, MER and variable cost arrays."""
+    revenue = np.asarray(revenue, dtype=np.float64)
+    mer = np.asarray(mer, dtype=np.float64)
+    variable_cost = np.asarray(variable_cost, dtype=np.float64)
+
+    # CM = Revenue × (1 - Variable Cost) - (Revenue ÷ MER)
+    return revenue * (1 - variable_cost) - revenue / mer
+
+
+def revenue_range(target_revenue: float, revenue_increment: float,
+                  points_before: int = 10, points_after: int = 10) -> np.ndarray:
+    """Return evenly spaced revenue points around the target revenue."""
+    steps = np.arange(-points_before, points_after + 1, dtype=np.float64)
+    return target_revenue + steps * revenue_increment
+
+
+def revenue_range_data(target_mer, target_revenue: float, variable_cost,
+                       revenue_increment: float, points_before: int = 10,
+                       points_after: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """Generate revenue and contribution margin arrays for revenue range analysis."""
+    revenue_values = revenue_range(target_revenue, revenue_increment, points_before, points_after)
+    cm_values = contribution_margin(revenue_values, target_mer, variable_cost)
+    return revenue_values, cm_values
+
+
+# =============================================================================
+# REVENUE × MER GRID
+# =============================================================================
+
+# Upper bound on grid size so a single request cannot exhaust server memory
+MAX_GRID_CELLS = 10_000_000
+
+# Contribution margin matrix precisions a request may ask for
+GRID_DTYPES = ('float32', 'float64')
+
+
+def axis_values(start: float, increment: float, points: int) -> np.ndarray:
+    """Return `points` evenly spaced values beginning at `start`."""
+    return start + np.arange(points, dtype=np.float64) * increment
+
+
+def contribution_margin_grid(revenue_values, mer_values, variable_cost,
+                             dtype=np.float64) -> np.ndarray:
+    """Build the 2-D contribution margin matrix (rows = revenue, columns = MER)."""
+    revenue_values = np.asarray(revenue_values, dtype=np.float64)
+    mer_values = np.asarray(mer_values, dtype=np.float64)
+
+    # CM is linear in revenue, so each cell is revenue × per-MER coefficient
+    coefficient = (1 - variable_cost) - 1 / mer_values
+    return np.multiply.outer(revenue_values.astype(dtype), coefficient.astype(dtype))
+
+
+def build_grid(variable_cost: float, contribution_margin_goal: float,
+               revenue_start_number: float, revenue_increment: float, revenue_points: int,
+               mer_start: float, mer_increment: float, mer_points: int,
+               dtype=np.float32) -> Dict:
+    """Build the revenue × MER contribution margin grid and its goal-met mask."""
+    revenue_values = axis_values(revenue_start_number, revenue_increment, revenue_points)
+    mer_values = axis_values(mer_start, mer_increment, mer_points)
+    cm = contribution_margin_grid(revenue_values, mer_values, variable_cost, dtype=dtype)
+
+    return {
+        'revenue_values': revenue_values,
+        'mer_values': mer_values,
+        'cm': cm,
+        'meets_goal': cm >= contribution_margin_goal
+    }
+
+
+def grid_params(data: Dict, defaults: Dict) -> Dict:
+    """Read grid parameters from a request payload, falling back to configuration defaults."""
+    mer_increment = float(data.get('mer_increment', defaults['mer_increment']))
+    return {
+        'variable_cost': float(data.get('variable_cost', defaults['variable_cost'])),
+        'contribution_margin_goal': float(data.get('contribution_margin_goal', defaults['contribution_margin_goal'])),
+        'revenue_start_number': float(data.get('revenue_start_number', defaults['revenue_start_number'])),
+        'revenue_increment': float(data.get('revenue_increment', defaults['revenue_increment'])),
+        'revenue_points': int(data.get('revenue_points', 50)),
+        'mer_start': float(data.get('mer_start', mer_increment)),
+        'mer_increment': mer_increment,
+        'mer_points': int(data.get('mer_points', 20)),
+        'dtype': str(data.get('dtype', 'float32'))
+    }
+
+
+def validate_grid_inputs(params: Dict) -> List[str]:
+    """Validate grid axis parameters and return list of errors."""
+    errors = []
+
+    if not params.get('variable_cost') or params['variable_cost'] < 0 or params['variable_cost'] >= 1:
+        errors.append('Variable Cost must be between 0 and 1 (e.g., 0.65 for 65%)')
+
+    if not params.get('revenue_start_number') or params['revenue_start_number'] <= 0:
+        errors.append('Revenue Start Number must be greater than 0')
+
+    if not params.get('revenue_increment') or params['revenue_increment'] <= 0:
+        errors.append('Revenue Increment must be greater than 0')
+
+    if not params.get('mer_start') or params['mer_start'] <= 0:
+        errors.append('MER Start must be greater than 0')
+
+    if not params.get('mer_increment') or params['mer_increment'] <= 0:
+        errors.append('MER Increment must be greater than 0')
+
+    if not params.get('contribution_margin_goal') or params['contribution_margin_goal'] <= 0:
+        errors.append('Contribution Margin Goal must be greater than 0')
+
+    revenue_points = params.get('revenue_points') or 0
+    mer_points = params.get('mer_points') or 0
+    if revenue_points < 1 or mer_points < 1:
+        errors.append('Revenue Points and MER Points must be at least 1')
+    elif revenue_points * mer_points > MAX_GRID_CELLS:
+        errors.append(f'Grid is limited to {MAX_GRID_CELLS:,} cells')
+
+    if params.get('dtype', 'float32') not in GRID_DTYPES:
+        errors.append(f"dtype must be one of: {', '.join(GRID_DTYPES)}")
+
+    return errors
+
+
+def encode_array(values: np.ndarray) -> str:
+    """Encode an array as base64 of its little-endian bytes."""
+    values = np.ascontiguousarray(values)
+    if values.dtype.byteorder == '>':
+        values = values.byteswap().view(values.dtype.newbyteorder('<'))
+    return base64.b64encode(values.tobytes()).decode('ascii')
+
+
+def encode_grid(grid: Dict) -> Dict:
+    """Encode a grid as columnar JSON: small axes as lists, the matrix as packed binary."""
+    cm = grid['cm']
+    meets_goal = grid['meets_goal']
+    return {
+        'shape': list(cm.shape),
+        'revenue_values': grid['revenue_values'].tolist(),
+        'mer_values': grid['mer_values'].tolist(),
+        'cm_dtype': cm.dtype.newbyteorder('<').str,
+        'cm': encode_array(cm),
+        'meets_goal': encode_array(np.packbits(meets_goal, axis=None)),
+        'meets_goal_encoding': 'packbits-row-major',
+        'cells_meeting_goal': int(np.count_nonzero(meets_goal))
+    }
+
+
+def grid_to_npz(grid: Dict) -> bytes:
+    """Serialize a grid to an uncompressed NumPy .npz archive."""
+    buffer = io.BytesIO()
+    np.savez(buffer, revenue_values=grid['revenue_values'], mer_values=grid['mer_values'],
+             cm=grid['cm'], meets_goal=grid['meets_goal'])
+    return buffer.getvalue()
+
+
+# =============================================================================
+# BATCH SCENARIO EVALUATION
+# =============================================================================
+
+# Scenario fields accepted by /calculate, with the defaults used for missing values
+SCENARIO_DEFAULTS = {
+    'target_revenue': 820000,
+    'target_mer': 7.50,
+    'variable_cost': 0.65,
+    'revenue_increment': 20000,
+    'contribution_margin_goal': 176000
+}
+
+# Scenarios evaluated per chunk when streaming NDJSON batches
+BATCH_CHUNK_SIZE = 10_000
+
+# Row-wise validation rules, mirroring MERCalculator.validate_inputs
+_SCENARIO_RULES = (
+    ('variable_cost', lambda v: (v > 0) & (v < 1),
+     'Variable Cost must be between 0 and 1 (e.g., 0.65 for 65%)'),
+    ('revenue_increment', lambda v: v > 0, 'Revenue Increment must be greater than 0'),
+    ('contribution_margin_goal', lambda v: v > 0, 'Contribution Margin Goal must be greater than 0'),
+    ('target_revenue', lambda v: v > 0, 'Target Revenue must be greater than 0'),
+    ('target_mer', lambda v: v > 0, 'Target MER must be greater than 0'),
+)
+
+
+def _to_float(value) -> float:
+    """Convert a scenario value to float, mapping unparseable values to NaN."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def scenario_columns(scenarios: List[Dict]) -> Dict[str, np.ndarray]:
+    """Convert a list of scenario dicts into one float array per field."""
+    count = len(scenarios)
+    return {
+        field: np.fromiter((_to_float(s.get(field, default)) for s in scenarios),
+                           dtype=np.float64, count=count)
+        for field, default in SCENARIO_DEFAULTS.items()
+    }
+
+
+def validate_scenarios(columns: Dict[str, np.ndarray]) -> Tuple[np.ndarray, Dict[int, List[str]]]:
+    """Vectorized validate_inputs: return the valid-row mask and errors for invalid rows."""
+    failures = [(~check(columns[field]), message) for field, check, message in _SCENARIO_RULES]
+
+    valid = np.ones(len(columns['target_revenue']), dtype=bool)
+    for failed, _ in failures:
+        valid &= ~failed
+
+    errors = {}
+    for index in np.flatnonzero(~valid).tolist():
+        errors[index] = [message for failed, message in failures if failed[index]]
+
+    return valid, errors
+
+
+def evaluate_scenarios(columns: Dict[str, np.ndarray], valid: np.ndarray) -> Dict[str, np.ndarray]:
+    """Evaluate every valid scenario at once; invalid rows are NaN / False."""
+    revenue = columns['target_revenue']
+    mer = np.where(valid, columns['target_mer'], np.nan)
+    variable_cost = columns['variable_cost']
+    goal = columns['contribution_margin_goal']
+
+    cm = contribution_margin(revenue, mer, variable_cost)
+    min_revenue = mer_analytics.break_even_revenue(goal, mer, variable_cost, unreachable=0.0)
+    min_revenue[~valid] = np.nan
+
+    return {
+        'contribution_margin': cm,
+        'meets_goal': valid & (cm >= goal),
+        'difference': cm - goal,
+        'min_revenue': min_revenue
+    }
+
+
+def batch_result(scenarios: List[Dict]) -> Dict:
+    """Evaluate a batch of scenarios and return result columns (NaN for invalid rows).
+
+    Entries that are not JSON objects are invalid rows with their own error,
+    rather than failing the whole batch.
+    """
+    objects = [isinstance(scenario, dict) for scenario in scenarios]
+    columns = scenario_columns([scenario if is_object else {} for scenario, is_object in zip(scenarios, objects)])
+    valid, errors = validate_scenarios(columns)
+    for index, is_object in enumerate(objects):
+        if not is_object:
+            valid[index] = False
+            errors[index] = ['Scenario must be a JSON object']
+    results = evaluate_scenarios(columns, valid)
+
+    return {
+        'success': True,
+        'count': len(scenarios),
+        'valid_count': int(np.count_nonzero(valid)),
+        'errors': {str(index): errors[index] for index in sorted(errors)},
+        'contribution_margin': results['contribution_margin'],
+        'meets_goal': results['meets_goal'],
+        'min_revenue': results['min_revenue'],
+        'difference': results['difference']
+    }
+
+
+def _parse_ndjson_line(line) -> Optional[Dict]:
+    """Parse one NDJSON scenario line, returning None when it is not a JSON object."""
+    try:
+        scenario = mer_serializer.loads(line)
+    except ValueError:
+        return None
+    return scenario if isinstance(scenario, dict) else None
+
+
+def _encode_ndjson_chunk(start: int, scenarios: List[Optional[Dict]]) -> bytes:
+    """Evaluate one chunk of parsed NDJSON scenarios and encode the result lines."""
+    parsed = [scenario if scenario is not None else {} for scenario in scenarios]
+    columns = scenario_columns(parsed)
+    valid, errors = validate_scenarios(columns)
+    results = evaluate_scenarios(columns, valid)
+
+    cm = results['contribution_margin'].tolist()
+    meets_goal = results['meets_goal'].tolist()
+    min_revenue = results['min_revenue'].tolist()
+    difference = results['difference'].tolist()
+
+    lines = []
+    for offset, scenario in enumerate(scenarios):
+        if scenario is None:
+            row = {'index': start + offset, 'errors': ['Invalid JSON scenario']}
+        elif not valid[offset]:
+            row = {'index': start + offset, 'errors': errors[offset]}
+        else:
+            row = {
+                'index': start + offset,
+                'contribution_margin': cm[offset],
+                'meets_goal': meets_goal[offset],
+                'min_revenue': min_revenue[offset],
+                'difference': difference[offset]
+            }
+        lines.append(mer_serializer.dumps(row))
+    return b'\n'.join(lines) + b'\n'
+
+
+def iter_ndjson_results(lines: Iterable, chunk_size: int = BATCH_CHUNK_SIZE) -> Iterator[bytes]:
+    """Stream NDJSON scenarios in, yielding encoded NDJSON results one chunk at a time."""
+    chunk = []
+    start = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        chunk.append(_parse_ndjson_line(line))
+        if len(chunk) >= chunk_size:
+            yield _encode_ndjson_chunk(start, chunk)
+            start += len(chunk)
+            chunk = []
+
+    if chunk:
+        yield _encode_ndjson_chunk(start, chunk)
+
+
+# =============================================================================
+# GOAL FRONTIER
+# =============================================================================
+
+# Upper bound on goal levels (contour lines) per frontier request
+MAX_FRONTIER_GOALS = 100
+
+
+def frontier_params(data: Dict, defaults: Dict) -> Dict:
+    """Read frontier parameters from a request payload, falling back to defaults."""
+    goals = data.get('goals', data.get('contribution_margin_goal', defaults['contribution_margin_goal']))
+    if not isinstance(goals, list):
+        goals = [goals]
+    return {
+        'variable_cost': float(data.get('variable_cost', defaults['variable_cost'])),
+        'goals': [float(goal) for goal in goals],
+        'revenue_start_number': float(data.get('revenue_start_number', defaults['revenue_start_number'])),
+        'revenue_increment': float(data.get('revenue_increment', defaults['revenue_increment'])),
+        'revenue_points': int(data.get('revenue_points', 50))
+    }
+
+
+def validate_frontier_inputs(params: Dict) -> List[str]:
+    """Validate frontier parameters and return list of errors."""
+    errors = []
+
+    if not params.get('variable_cost') or params['variable_cost'] < 0 or params['variable_cost'] >= 1:
+        errors.append('Variable Cost must be between 0 and 1 (e.g., 0.65 for 65%)')
+
+    if not params.get('revenue_start_number') or params['revenue_start_number'] <= 0:
+        errors.append('Revenue Start Number must be greater than 0')
+
+    if not params.get('revenue_increment') or params['revenue_increment'] <= 0:
+        errors.append('Revenue Increment must be greater than 0')
+
+    goals = params.get('goals') or []
+    if not goals:
+        errors.append('At least one Contribution Margin Goal is required')
+    elif len(goals) > MAX_FRONTIER_GOALS:
+        errors.append(f'Frontiers are limited to {MAX_FRONTIER_GOALS} goal levels')
+    elif any(goal <= 0 for goal in goals):
+        errors.append('Contribution Margin Goal must be greater than 0')
+
+    revenue_points = params.get('revenue_points') or 0
+    if revenue_points < 1:
+        errors.append('Revenue Points must be at least 1')
+    elif revenue_points * max(len(goals), 1) > MAX_GRID_CELLS:
+        errors.append(f'Frontier is limited to {MAX_GRID_CELLS:,} points across all goals')
+
+    return errors
+
+
+def build_frontier(variable_cost: float, goals: List[float], revenue_start_number: float,
+                   revenue_increment: float, revenue_points: int) -> Dict:
+    """Solve the goal frontier for every goal over a revenue axis in one vectorized pass."""
+    revenue_values = axis_values(revenue_start_number, revenue_increment, revenue_points)
+    frontier = mer_analytics.goal_frontier(revenue_values, goals, variable_cost)
+    frontier['revenue_values'] = revenue_values
+    frontier['goals'] = np.asarray(goals, dtype=np.float64)
+    return frontier
+
+
+def encode_frontier(frontier: Dict) -> Dict:
+    """Encode a frontier as one curve per goal; unreachable points are null."""
+    return {
+        'revenue_values': frontier['revenue_values'],
+        'curves': [
+            {
+                'goal': float(goal),
+                'min_revenue': float(frontier['min_revenue'][row]),
+                'min_mer': frontier['min_mer'][row],
+                'max_marketing_spend': frontier['max_marketing_spend'][row]
+            }
+            for row, goal in enumerate(frontier['goals'])
+        ]
+    }
+
+
+# =============================================================================
+# SENSITIVITY ANALYSIS
+# =============================================================================
+
+SENSITIVITY_DRIVERS = ('target_revenue', 'target_mer', 'variable_cost')
+
+DRIVER_LABELS = {
+    'target_revenue': 'Target Revenue',
+    'target_mer': 'Target MER',
+    'variable_cost': 'Variable Cost'
+}
+
+# Default perturbation of each driver: ±10% of its base value
+DEFAULT_SWING = 0.10
+
+# Upper bound on points per sensitivity axis (the two-way table is steps × steps)
+MAX_SENSITIVITY_STEPS = 201
+
+
+def _driver_range(base: float, swing, upper: Optional[float] = None) -> Tuple[float, float]:
+    """Return (low, high) for a driver from a relative swing or an explicit [low, high] pair.
+
+    A relative swing is capped at `upper`; explicit pairs are used as given.
+    """
+    if isinstance(swing, (list, tuple)):
+        low, high = swing
+        return float(low), float(high)
+    swing = float(swing)
+    high = base * (1 + swing)
+    return base * (1 - swing), min(high, upper) if upper is not None else high
+
+
+def sensitivity_params(data: Dict, defaults: Dict) -> Dict:
+    """Read sensitivity parameters from a request payload, falling back to defaults."""
+    params = {name: float(data.get(name, defaults[name])) for name in SENSITIVITY_DRIVERS}
+    ranges = data.get('ranges') or {}
+    params['ranges'] = {
+        name: _driver_range(params[name], ranges.get(name, DEFAULT_SWING),
+                            upper=1.0 if name == 'variable_cost' else None)
+        for name in SENSITIVITY_DRIVERS
+    }
+    params['contribution_margin_goal'] = float(data.get('contribution_margin_goal', defaults['contribution_margin_goal']))
+    params['steps'] = int(data.get('steps', 11))
+    params['two_way'] = list(data.get('two_way', ['target_revenue', 'target_mer']))
+    return params
+
+
+def validate_sensitivity_inputs(params: Dict) -> List[str]:
+    """Validate sensitivity parameters and return list of errors."""
+    errors = []
+
+    if not 0 <= params['variable_cost'] < 1:
+        errors.append('Variable Cost must be between 0 and 1 (e.g., 0.65 for 65%)')
+    if params['target_revenue'] <= 0:
+        errors.append('Target Revenue must be greater than 0')
+    if params['target_mer'] <= 0:
+        errors.append('Target MER must be greater than 0')
+    if params['contribution_margin_goal'] <= 0:
+        errors.append('Contribution Margin Goal must be greater than 0')
+
+    low, high = params['ranges']['variable_cost']
+    if not 0 <= low <= high <= 1:
+        errors.append('Variable Cost range must lie between 0 and 1')
+    low, high = params['ranges']['target_mer']
+    if not 0 < low <= high:
+        errors.append('Target MER range must be positive, with low <= high')
+    low, high = params['ranges']['target_revenue']
+    if not 0 <= low <= high:
+        errors.append('Target Revenue range cannot be negative, with low <= high')
+
+    if not 2 <= params['steps'] <= MAX_SENSITIVITY_STEPS:
+        errors.append(f'Steps must be between 2 and {MAX_SENSITIVITY_STEPS}')
+
+    two_way = params['two_way']
+    if len(two_way) != 2 or two_way[0] == two_way[1] or not set(two_way) <= set(SENSITIVITY_DRIVERS):
+        errors.append(f"Two-way table needs two different drivers from: {', '.join(SENSITIVITY_DRIVERS)}")
+
+    return errors
+
+
+def build_sensitivity(params: Dict) -> Dict:
+    """Evaluate the tornado, one-way sweeps and two-way table in one batched computation.
+
+    Every perturbed case is laid out as one row of three input columns, so all
+    contribution margins come from a single contribution_margin() call.
+    """
+    base = {name: params[name] for name in SENSITIVITY_DRIVERS}
+    ranges = params['ranges']
+    steps = params['steps']
+    row_driver, column_driver = params['two_way']
+
+    sweep_values = {name: np.linspace(*ranges[name], steps) for name in SENSITIVITY_DRIVERS}
+    row_grid, column_grid = np.meshgrid(sweep_values[row_driver], sweep_values[column_driver], indexing='ij')
+
+    # Segments of cases: base, tornado low/high ends, one-way sweeps, two-way table
+    segments = [('base', {})]
+    segments += [(f'tornado:{name}', {name: np.array(ranges[name])}) for name in SENSITIVITY_DRIVERS]
+    segments += [(f'sweep:{name}', {name: sweep_values[name]}) for name in SENSITIVITY_DRIVERS]
+    segments.append(('two_way', {row_driver: row_grid.ravel(), column_driver: column_grid.ravel()}))
+
+    columns = {name: [] for name in SENSITIVITY_DRIVERS}
+    sizes = []
+    for _, overrides in segments:
+        size = len(next(iter(overrides.values()))) if overrides else 1
+        sizes.append(size)
+        for name in SENSITIVITY_DRIVERS:
+            columns[name].append(overrides[name] if name in overrides else np.full(size, base[name]))
+
+    cm = contribution_margin(*(np.concatenate(columns[name]) for name in SENSITIVITY_DRIVERS))
+    results = dict(zip((label for label, _ in segments), np.split(cm, np.cumsum(sizes)[:-1])))
+
+    base_cm = float(results['base'][0])
+    partials = mer_analytics.cm_partials(base['target_revenue'], base['target_mer'], base['variable_cost'])
+    elasticities = mer_analytics.cm_elasticities(base['target_revenue'], base['target_mer'], base['variable_cost'])
+    analytic_names = {'target_revenue': 'revenue', 'target_mer': 'mer', 'variable_cost': 'variable_cost'}
+
+    tornado = []
+    for name in SENSITIVITY_DRIVERS:
+        cm_low, cm_high = results[f'tornado:{name}']
+        tornado.append({
+            'driver': name,
+            'label': DRIVER_LABELS[name],
+            'low': ranges[name][0],
+            'high': ranges[name][1],
+            'cm_low': float(cm_low),
+            'cm_high': float(cm_high),
+            'swing': float(abs(cm_high - cm_low))
+        })
+    tornado.sort(key=lambda bar: bar['swing'], reverse=True)
+
+    table = results['two_way'].reshape(steps, steps)
+    goal = params['contribution_margin_goal']
+    return {
+        'base': dict(base, contribution_margin=base_cm, meets_goal=base_cm >= goal),
+        'contribution_margin_goal': goal,
+        'partials': {name: float(partials[analytic_names[name]]) for name in SENSITIVITY_DRIVERS},
+        'elasticities': {name: float(elasticities[analytic_names[name]]) for name in SENSITIVITY_DRIVERS},
+        'tornado': tornado,
+        'sweeps': {
+            name: {'values': sweep_values[name], 'contribution_margin': results[f'sweep:{name}']}
+            for name in SENSITIVITY_DRIVERS
+        },
+        'two_way': {
+            'rows': row_driver,
+            'columns': column_driver,
+            'row_values': sweep_values[row_driver],
+            'column_values': sweep_values[column_driver],
+            'contribution_margin': table,
+            'meets_goal': table >= goal
+        }
+    }
+
+
+# =============================================================================
+# STREAMING REVENUE RANGES
+# =============================================================================
+
+# Points computed and encoded per chunk; memory use is bounded by this, not the range length
+STREAM_CHUNK_SIZE = 10_000
+
+# Upper bound on streamed range length (memory stays constant; this bounds request time)
+MAX_STREAM_POINTS = 100_000_000
+
+# Supported stream formats and their MIME types
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8'
+}
+
+
+def stream_params(data: Dict, defaults: Dict) -> Dict:
+    """Read revenue range stream parameters from a request payload, falling back to defaults."""
+    return {
+        'target_mer': float(data.get('target_mer', SCENARIO_DEFAULTS['target_mer'])),
+        'target_revenue': float(data.get('target_revenue', SCENARIO_DEFAULTS['target_revenue'])),
+        'variable_cost': float(data.get('variable_cost', defaults['variable_cost'])),
+        'revenue_increment': float(data.get('revenue_increment', defaults['revenue_increment'])),
+        'points_before': int(data.get('points_before', 10)),
+        'points_after': int(data.get('points_after', 10))
+    }
+
+
+def validate_stream_inputs(params: Dict) -> List[str]:
+    """Validate revenue range stream parameters and return list of errors."""
+    errors = []
+
+    if not params.get('variable_cost') or params['variable_cost'] < 0 or params['variable_cost'] >= 1:
+        errors.append('Variable Cost must be between 0 and 1 (e.g., 0.65 for 65%)')
+
+    if not params.get('revenue_increment') or params['revenue_increment'] <= 0:
+        errors.append('Revenue Increment must be greater than 0')
+
+    if not params.get('target_revenue') or params['target_revenue'] <= 0:
+        errors.append('Target Revenue must be greater than 0')
+
+    if not params.get('target_mer') or params['target_mer'] <= 0:
+        errors.append('Target MER must be greater than 0')
+
+    points_before = params.get('points_before', 0)
+    points_after = params.get('points_after', 0)
+    if points_before < 0 or points_after < 0:
+        errors.append('Points Before and Points After cannot be negative')
+    elif points_before + points_after + 1 > MAX_STREAM_POINTS:
+        errors.append(f'Revenue ranges are limited to {MAX_STREAM_POINTS:,} points')
+
+    return errors
+
+
+def iter_revenue_range(target_mer: float, target_revenue: float, variable_cost: float,
+                       revenue_increment: float, points_before: int = 10, points_after: int = 10,
+                       chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Yield (revenue, contribution margin) array chunks without materializing the whole range."""
+    stop = points_after + 1
+    for start in range(-points_before, stop, chunk_size):
+        steps = np.arange(start, min(start + chunk_size, stop), dtype=np.float64)
+        revenue_values = target_revenue + steps * revenue_increment
+        yield revenue_values, contribution_margin(revenue_values, target_mer, variable_cost)
+
+
+def _encode_rows(prefix: bytes, separator: bytes, suffix: bytes,
+                 first: np.ndarray, second: np.ndarray) -> bytes:
+    """Encode two columns row by row as prefix + first + separator + second + suffix.
+
+    Each column is encoded in one serializer call and the pieces are interleaved
+    with slice assignment, avoiding a per-point Python format call.
+    """
+    count = len(first)
+    pieces = [prefix] * (5 * count)
+    pieces[1::5] = mer_serializer.dumps(first)[1:-1].split(b',')
+    pieces[2::5] = [separator] * count
+    pieces[3::5] = mer_serializer.dumps(second)[1:-1].split(b',')
+    pieces[4::5] = [suffix] * count
+    return b''.join(pieces)
+
+
+def _csv_fields(values: np.ndarray) -> List[bytes]:
+    """Encode one column as CSV fields; NaN and None become empty fields."""
+    if values.dtype.kind in 'fiub':
+        fields = mer_serializer.dumps(np.ascontiguousarray(values))[1:-1].split(b',')
+        if values.dtype.kind == 'f':
+            fields = [b'' if field == b'null' else field for field in fields]
+        return fields
+
+    texts = ['' if value is None or value != value else str(value) for value in values.tolist()]
+    joined = '\x1f'.join(texts)
+    if not any(char in joined for char in ',"\r\n'):
+        return joined.encode('utf-8').split(b'\x1f')
+    return [
+        ('"' + text.replace('"', '""') + '"' if any(char in text for char in ',"\r\n') else text).encode('utf-8')
+        for text in texts
+    ]
+
+
+def encode_csv_rows(columns: List[np.ndarray]) -> bytes:
+    """Encode equal-length columns as CSV rows (no header).
+
+    Numeric and boolean columns are encoded in one serializer call each and
+    interleaved with slice assignment, several times faster than pandas.to_csv.
+    """
+    count = len(columns[0]) if columns else 0
+    width = 2 * len(columns)
+    pieces = [b','] * (width * count)
+    for position, values in enumerate(columns):
+        pieces[2 * position::width] = _csv_fields(values)
+    pieces[width - 1::width] = [b'\n'] * count
+    return b''.join(pieces)
+
+
+def iter_range_ndjson(chunks: Iterable[Tuple[np.ndarray, np.ndarray]], summary: Dict) -> Iterator[bytes]:
+    """Encode range chunks as NDJSON points, ending with a summary line."""
+    for revenue_values, cm_values in chunks:
+        if len(revenue_values):
+            yield _encode_rows(b'{"revenue":', b',"contribution_margin":', b'}\n', revenue_values, cm_values)
+    yield mer_serializer.dumps({'summary': summary}) + b'\n'
+
+
+def iter_range_csv(chunks: Iterable[Tuple[np.ndarray, np.ndarray]]) -> Iterator[bytes]:
+    """Encode range chunks as CSV rows under a header line."""
+    yield b'revenue,contribution_margin\n'
+    for revenue_values, cm_values in chunks:
+        if len(revenue_values):
+            yield _encode_rows(b'', b',', b'\n', revenue_values, cm_values)
+
+
+def iter_range_stream(params: Dict, stream_format: str = 'ndjson',
+                      chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Stream an encoded revenue range for validated parameters in the requested format."""
+    chunks = iter_revenue_range(**params, chunk_size=chunk_size)
+    if stream_format == 'csv':
+        return iter_range_csv(chunks)
+
+    # The summary is known before the first point is computed: CM is linear in revenue
+    first_revenue = params['target_revenue'] - params['points_before'] * params['revenue_increment']
+    last_revenue = params['target_revenue'] + params['points_after'] * params['revenue_increment']
+    extrema = mer_analytics.range_extrema(first_revenue, last_revenue,
+                                          params['target_mer'], params['variable_cost'])
+    summary = {'count': params['points_before'] + params['points_after'] + 1}
+    summary.update({name: float(value) for name, value in extrema.items()})
+    return iter_range_ndjson(chunks, summary)
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Calculator - Request Metrics
+Per-stage request timing, a Server-Timing header and Prometheus metrics.
+
+Hot paths wrap their stages (parsing, validation, CM math, range
+generation, chart rendering, JSON encoding, ...) in `stage(name)`. Each stage
+costs two perf_counter() calls and a histogram update. The durations go to
+a process-wide histogram, and to the current request's timer when one is
+active (tracked with a context variable, so it works for threads and asyncio
+tasks alike). The timer becomes the request's `Server-Timing` header.
+
+`render()` produces the Prometheus text exposition format for /metrics. It
+covers request latency and stage histograms, request counts, in-flight
+requests, chart bytes produced, and the hit rates of registered caches.
+"""
+
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Histogram buckets in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    """Render a Prometheus label set."""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """A named metric with a fixed set of label names."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, '') for name in self.labels)
+
+    def render(self) -> List[str]:
+        """Prometheus text lines for this metric."""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labels, key)} {value:.10g}')
+        return lines
+
+
+class Counter(Metric):
+    """A monotonically increasing count."""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value that goes up and down."""
+
+    kind = 'gauge'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Counts of observations per bucket, plus their sum and count."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, with a final +Inf slot, then sum
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound:g}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {total:.10g}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {cumulative}')
+        return lines
+
+
+# =============================================================================
+# REGISTRY
+# =============================================================================
+
+REQUEST_SECONDS = Histogram('mer_request_duration_seconds', 'Request latency until the response is handed off.',
+                            ('server', 'route'))
+STAGE_SECONDS = Histogram('mer_stage_duration_seconds', 'Time spent in each request stage.', ('stage',))
+REQUESTS = Counter('mer_requests_total', 'Requests handled.', ('server', 'route', 'status'))
+IN_FLIGHT = Gauge('mer_requests_in_flight', 'Requests currently being handled.', ('server',))
+CHART_BYTES = Counter('mer_chart_bytes_total', 'Bytes of chart images rendered.', ('format',))
+CHARTS_RENDERED = Counter('mer_charts_rendered_total', 'Chart images rendered.', ('format',))
+
+METRICS = [REQUEST_SECONDS, STAGE_SECONDS, REQUESTS, IN_FLIGHT, CHART_BYTES, CHARTS_RENDERED]
+
+# name -> stats() callable of a cache (chart cache, result cache, session store)
+_caches = {}
+
+
+def register_cache(name: str, stats: Callable[[], Dict]):
+    """Report a cache's counters (from its stats() dict) in /metrics."""
+    _caches[name] = stats
+
+
+def _cache_lines() -> List[str]:
+    """Cache hit/miss/eviction counters, hit ratio and size for each registered cache."""
+    series = {
+        'mer_cache_hits_total': ('counter', 'Cache hits.', []),
+        'mer_cache_misses_total': ('counter', 'Cache misses.', []),
+        'mer_cache_evictions_total': ('counter', 'Entries evicted to stay within limits.', []),
+        'mer_cache_hit_ratio': ('gauge', 'Hits divided by lookups.', []),
+        'mer_cache_entries': ('gauge', 'Entries currently cached.', [])
+    }
+    for name, stats_function in sorted(_caches.items()):
+        try:
+            stats = stats_function()
+        except Exception:
+            continue
+        hits = stats.get('hits', 0) + stats.get('disk_hits', 0)
+        misses = stats.get('misses', 0)
+        label = f'{{cache="{name}"}}'
+        series['mer_cache_hits_total'][2].append(f'mer_cache_hits_total{label} {hits}')
+        series['mer_cache_misses_total'][2].append(f'mer_cache_misses_total{label} {misses}')
+        series['mer_cache_evictions_total'][2].append(f'mer_cache_evictions_total{label} {stats.get("evictions", 0)}')
+        ratio = hits / (hits + misses) if hits + misses else 0.0
+        series['mer_cache_hit_ratio'][2].append(f'mer_cache_hit_ratio{label} {ratio:.6g}')
+        entries = stats.get('entries', stats.get('sessions', 0))
+        series['mer_cache_entries'][2].append(f'mer_cache_entries{label} {entries}')
+
+    lines = []
+    for metric, (kind, help_text, samples) in series.items():
+        if samples:
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}'] + samples
+    return lines
+
+
+def render() -> bytes:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    lines += _cache_lines()
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+# =============================================================================
+# REQUEST TIMING
+# =============================================================================
+
+class RequestTimer:
+    """Stage durations of one request."""
+
+    __slots__ = ('server', 'started', 'stages', 'route', 'status')
+
+    def __init__(self, server: str):
+        self.server = server
+        self.started = time.perf_counter()
+        self.stages = []
+        self.route = 'unmatched'
+        self.status = 200
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: each stage plus the total so far, in milliseconds."""
+        entries = [f'{name};dur={seconds * 1000:.3f}' for name, seconds in self.stages]
+        entries.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.3f}')
+        return ', '.join(entries)
+
+
+_current_timer = contextvars.ContextVar('mer_request_timer', default=None)
+
+
+class stage:
+    """Context manager timing one stage of the current request."""
+
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(elapsed, stage=self.name)
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.stages.append((self.name, elapsed))
+        return False
+
+
+def current_timer() -> Optional[RequestTimer]:
+    """The timer of the request being handled, if any."""
+    return _current_timer.get()
+
+
+def start_request(server: str) -> Tuple[RequestTimer, contextvars.Token]:
+    """Start timing a request; pass the result to finish_request when it is done."""
+    timer = RequestTimer(server)
+    IN_FLIGHT.inc(server=server)
+    return timer, _current_timer.set(timer)
+
+
+def finish_request(timer: RequestTimer, token: contextvars.Token):
+    """Record a finished request's latency and status."""
+    _current_timer.reset(token)
+    IN_FLIGHT.dec(server=timer.server)
+    REQUEST_SECONDS.observe(time.perf_counter() - timer.started, server=timer.server, route=timer.route)
+    REQUESTS.inc(server=timer.server, route=timer.route, status=timer.status)
+
+
+class track:
+    """Context manager timing a whole request: `with track('simple') as timer: ...`."""
+
+    __slots__ = ('server', 'timer', 'token')
+
+    def __init__(self, server: str):
+        self.server = server
+
+    def __enter__(self) -> RequestTimer:
+        self.timer, self.token = start_request(self.server)
+        return self.timer
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.timer.status = 500
+        finish_request(self.timer, self.token)
+        return False
+
+
+def record_chart(image_format: str, size: int):
+    """Count a rendered chart image."""
+    CHARTS_RENDERED.inc(format=image_format)
+    CHART_BYTES.inc(size, format=image_format)
+
+
+# =============================================================================
+# LOGGING
+# =============================================================================
+
+def configure_logging(level: Optional[str] = None):
+    """Send the servers' log records to stderr as key=value lines.
+
+    The level comes from `level` or MER_LOG_LEVEL (default INFO); per-response
+    records are DEBUG, so they cost nothing unless asked for.
+    """
+    level = (level or os.environ.get('MER_LOG_LEVEL', 'INFO')).upper()
+    logging.basicConfig(level=level, format='ts=%(asctime)s level=%(levelname)s logger=%(name)s %(message)s')
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Calculator - Monte Carlo Simulation
+Contribution margin under uncertain revenue, MER and variable cost.
+
+Each input is either a fixed number or a distribution:
+
+    {"distribution": "normal", "mean": 7.5, "std": 0.75}
+    {"distribution": "lognormal", "mean": 820000, "std": 80000}
+    {"distribution": "triangular", "low": 0.60, "mode": 0.65, "high": 0.72}
+    {"distribution": "empirical", "samples": [7.1, 7.8, 6.9, ...]}
+
+Samples are drawn and evaluated in fixed-size chunks, so memory is bounded
+by the chunk size whatever the sample count. Every chunk gets its own
+generator spawned from one SeedSequence, which makes a run reproducible from
+its seed and gives identical results inline or across a process pool.
+
+Mean, standard deviation, min/max and goal probabilities are exact; the
+percentiles and histogram come from a fixed-bin histogram whose range is set
+by the first chunk, with draws outside it tracked in overflow bins.
+"""
+
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Upper bound on samples per simulation so a single request cannot run for minutes
+MAX_SIMULATION_SAMPLES = 50_000_000
+
+# Samples drawn and evaluated at a time; bounds memory to a few arrays of this length
+SIMULATION_CHUNK_SIZE = 250_000
+
+# Upper bound on the values of an empirical distribution
+MAX_EMPIRICAL_VALUES = 1_000_000
+
+# Resolution of the internal histogram used for percentiles
+HISTOGRAM_BINS = 4096
+
+# Bins in the histogram returned to clients
+DISPLAY_BINS = 50
+
+PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+
+DISTRIBUTIONS = ('constant', 'normal', 'lognormal', 'triangular', 'empirical')
+
+SIMULATION_INPUTS = ('target_revenue', 'target_mer', 'variable_cost')
+
+# Draws are clipped to each input's valid range
+INPUT_BOUNDS = {
+    'target_revenue': (0.0, np.inf),
+    'target_mer': (0.01, np.inf),
+    'variable_cost': (0.0, 1.0)
+}
+
+INPUT_LABELS = {
+    'target_revenue': 'Target Revenue',
+    'target_mer': 'Target MER',
+    'variable_cost': 'Variable Cost'
+}
+
+
+# =============================================================================
+# PARAMETERS
+# =============================================================================
+
+def distribution_spec(value) -> Dict:
+    """Normalize a number or distribution dict into a distribution spec."""
+    if not isinstance(value, dict):
+        return {'distribution': 'constant', 'value': float(value)}
+
+    spec = {'distribution': str(value.get('distribution', 'constant')).lower()}
+    for name, item in value.items():
+        if name == 'distribution':
+            continue
+        if name == 'samples':
+            spec[name] = np.asarray(item, dtype=np.float64).ravel()
+        else:
+            spec[name] = float(item)
+    return spec
+
+
+def simulation_params(data: Dict, defaults: Dict) -> Dict:
+    """Read simulation parameters from a request payload, falling back to defaults."""
+    seed = data.get('seed')
+    return {
+        'target_revenue': distribution_spec(data.get('target_revenue', defaults['target_revenue'])),
+        'target_mer': distribution_spec(data.get('target_mer', defaults['target_mer'])),
+        'variable_cost': distribution_spec(data.get('variable_cost', defaults['variable_cost'])),
+        'contribution_margin_goal': float(data.get('contribution_margin_goal', defaults['contribution_margin_goal'])),
+        'samples': int(data.get('samples', 100_000)),
+        'seed': int(seed) if seed is not None else None
+    }
+
+
+def _validate_spec(name: str, spec: Dict) -> List[str]:
+    """Validate one input distribution and return list of errors."""
+    label = INPUT_LABELS[name]
+    kind = spec.get('distribution')
+    low, high = INPUT_BOUNDS[name]
+
+    if kind not in DISTRIBUTIONS:
+        return [f"{label}: unknown distribution '{kind}' (choose from {', '.join(DISTRIBUTIONS)})"]
+
+    required = {
+        'constant': ('value',),
+        'normal': ('mean', 'std'),
+        'lognormal': ('mean', 'std'),
+        'triangular': ('low', 'mode', 'high'),
+        'empirical': ('samples',)
+    }[kind]
+    missing = [field for field in required if field not in spec]
+    if missing:
+        return [f"{label}: {kind} distribution needs {', '.join(required)}"]
+    if not all(np.isfinite(spec[field]) for field in required if field != 'samples'):
+        return [f'{label}: distribution parameters must be finite numbers']
+
+    errors = []
+    if kind == 'constant':
+        value = spec['value']
+        if name == 'variable_cost' and not 0 <= value < 1:
+            errors.append('Variable Cost must be between 0 and 1 (e.g., 0.65 for 65%)')
+        elif name != 'variable_cost' and value <= 0:
+            errors.append(f'{label} must be greater than 0')
+    elif kind == 'normal':
+        if spec['std'] < 0:
+            errors.append(f'{label}: standard deviation cannot be negative')
+    elif kind == 'lognormal':
+        if spec['mean'] <= 0:
+            errors.append(f'{label}: lognormal mean must be greater than 0')
+        if spec['std'] < 0:
+            errors.append(f'{label}: standard deviation cannot be negative')
+    elif kind == 'triangular':
+        if not spec['low'] <= spec['mode'] <= spec['high'] or spec['low'] == spec['high']:
+            errors.append(f'{label}: triangular distribution needs low <= mode <= high and low < high')
+        elif spec['high'] <= low or spec['low'] >= high:
+            errors.append(f'{label}: triangular range lies outside {low:g} to {high:g}')
+    elif kind == 'empirical':
+        samples = spec['samples']
+        if not 0 < samples.size <= MAX_EMPIRICAL_VALUES:
+            errors.append(f'{label}: empirical distribution needs 1 to {MAX_EMPIRICAL_VALUES:,} samples')
+        elif not np.isfinite(samples).all():
+            errors.append(f'{label}: empirical samples must be finite numbers')
+
+    return errors
+
+
+def validate_simulation_inputs(params: Dict) -> List[str]:
+    """Validate simulation parameters and return list of errors."""
+    errors = []
+
+    for name in SIMULATION_INPUTS:
+        errors.extend(_validate_spec(name, params[name]))
+
+    if not params.get('contribution_margin_goal') or params['contribution_margin_goal'] <= 0:
+        errors.append('Contribution Margin Goal must be greater than 0')
+
+    samples = params.get('samples') or 0
+    if not 1 <= samples <= MAX_SIMULATION_SAMPLES:
+        errors.append(f'Samples must be between 1 and {MAX_SIMULATION_SAMPLES:,}')
+
+    seed = params.get('seed')
+    if seed is not None and seed < 0:
+        errors.append('Seed cannot be negative')
+
+    return errors
+
+
+def describe_spec(spec: Dict) -> Dict:
+    """JSON-ready description of a distribution spec (empirical samples are summarized)."""
+    if spec['distribution'] != 'empirical':
+        return dict(spec)
+    samples = spec['samples']
+    return {
+        'distribution': 'empirical',
+        'count': int(samples.size),
+        'mean': float(samples.mean()),
+        'min': float(samples.min()),
+        'max': float(samples.max())
+    }
+
+
+# =============================================================================
+# SAMPLING
+# =============================================================================
+
+def sample_input(rng: np.random.Generator, spec: Dict, size: int):
+    """Draw `size` values from a distribution spec (a constant is returned as a scalar)."""
+    kind = spec['distribution']
+    if kind == 'constant':
+        return spec['value']
+    if kind == 'normal':
+        return rng.normal(spec['mean'], spec['std'], size)
+    if kind == 'lognormal':
+        # Parameterized by the mean and standard deviation of the values themselves
+        sigma2 = np.log1p((spec['std'] / spec['mean']) ** 2)
+        return rng.lognormal(np.log(spec['mean']) - sigma2 / 2, np.sqrt(sigma2), size)
+    if kind == 'triangular':
+        return rng.triangular(spec['low'], spec['mode'], spec['high'], size)
+    if kind == 'empirical':
+        return rng.choice(spec['samples'], size)
+    raise ValueError(f'Unknown distribution: {kind}')
+
+
+def _clip_input(name: str, values) -> Tuple[object, int]:
+    """Clip draws to the input's valid range; returns (values, number clipped)."""
+    low, high = INPUT_BOUNDS[name]
+    if np.ndim(values) == 0:
+        return values, 0
+    outside = (values < low) | (values > high)
+    clipped = int(np.count_nonzero(outside))
+    if clipped:
+        values = np.clip(values, low, high)
+    return values, clipped
+
+
+def simulate_chunk(specs: Dict[str, Dict], seed: np.random.SeedSequence, size: int) -> Tuple[np.ndarray, Dict[str, int]]:
+    """Draw one chunk of inputs and return (contribution margins, clipped draws per input)."""
+    rng = np.random.default_rng(seed)
+    draws = {}
+    clipped = {}
+    for name in SIMULATION_INPUTS:
+        draws[name], clipped[name] = _clip_input(name, sample_input(rng, specs[name], size))
+
+    revenue = draws['target_revenue']
+    cm = revenue * (1 - draws['variable_cost']) - revenue / draws['target_mer']
+    return np.broadcast_to(np.asarray(cm, dtype=np.float64), (size,)), clipped
+
+
+# =============================================================================
+# STREAMING STATISTICS
+# =============================================================================
+
+class SimulationStats:
+    """Mergeable running statistics for contribution margin samples."""
+
+    def __init__(self, goal: float, edges: Tuple[float, float]):
+        """Start empty statistics with a fixed histogram range."""
+        self.goal = goal
+        self.edges = edges
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self.meets_goal = 0
+        self.losses = 0
+        self.underflow = 0
+        self.overflow = 0
+        self.counts = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+        self.clipped = {name: 0 for name in SIMULATION_INPUTS}
+
+    def add(self, cm: np.ndarray, clipped: Optional[Dict[str, int]] = None):
+        """Fold a chunk of contribution margins into the statistics."""
+        if not cm.size:
+            return
+        chunk = SimulationStats(self.goal, self.edges)
+        chunk.count = cm.size
+        chunk.mean = float(cm.mean())
+        chunk.m2 = float(np.square(cm - chunk.mean).sum())
+        chunk.minimum = float(cm.min())
+        chunk.maximum = float(cm.max())
+        chunk.meets_goal = int(np.count_nonzero(cm >= self.goal))
+        chunk.losses = int(np.count_nonzero(cm < 0))
+
+        low, high = self.edges
+        position = (cm - low) * (HISTOGRAM_BINS / (high - low))
+        under = position < 0
+        over = position >= HISTOGRAM_BINS
+        chunk.underflow = int(np.count_nonzero(under))
+        chunk.overflow = int(np.count_nonzero(over))
+        inside = position[~(under | over)].astype(np.intp)
+        chunk.counts = np.bincount(inside, minlength=HISTOGRAM_BINS)
+        if clipped:
+            chunk.clipped.update(clipped)
+        self.merge(chunk)
+
+    def merge(self, other: 'SimulationStats'):
+        """Combine statistics from another chunk (parallel variance algorithm)."""
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self.meets_goal += other.meets_goal
+        self.losses += other.losses
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        self.counts += other.counts
+        for name, count in other.clipped.items():
+            self.clipped[name] += count
+
+    def _bins(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Histogram edges and counts, with the overflow bins stretched to the exact min/max."""
+        low, high = self.edges
+        inner = np.linspace(low, high, HISTOGRAM_BINS + 1)
+        edges = np.concatenate(([min(self.minimum, low)], inner, [max(self.maximum, high)]))
+        counts = np.concatenate(([self.underflow], self.counts, [self.overflow]))
+        return edges, counts
+
+    def percentiles(self, levels=PERCENTILES) -> Dict[str, float]:
+        """Estimate percentiles by interpolating the cumulative histogram."""
+        edges, counts = self._bins()
+        cumulative = np.concatenate(([0], np.cumsum(counts)))
+        ranks = np.asarray(levels, dtype=np.float64) / 100 * self.count
+        values = np.clip(np.interp(ranks, cumulative, edges), self.minimum, self.maximum)
+        return {f'p{level}': float(value) for level, value in zip(levels, values)}
+
+    def histogram(self, bins: int = DISPLAY_BINS) -> Dict[str, List[float]]:
+        """Coarse histogram over the observed range, for charts and reports."""
+        if self.maximum <= self.minimum:
+            return {'edges': [self.minimum, self.maximum], 'counts': [self.count]}
+        edges, counts = self._bins()
+        cumulative = np.concatenate(([0], np.cumsum(counts)))
+        display_edges = np.linspace(self.minimum, self.maximum, bins + 1)
+        # Cumulative counts at the display edges, interpolated within the fine bins
+        at_edges = np.rint(np.interp(display_edges, edges, cumulative)).astype(np.int64)
+        at_edges[-1] = self.count
+        return {'edges': display_edges.tolist(), 'counts': np.diff(at_edges).tolist()}
+
+    def summary(self) -> Dict:
+        """JSON-ready summary of the simulated contribution margin distribution."""
+        std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+        return {
+            'samples': self.count,
+            'mean': self.mean,
+            'std': float(std),
+            'min': self.minimum,
+            'max': self.maximum,
+            'probability_meets_goal': self.meets_goal / self.count,
+            'probability_loss': self.losses / self.count,
+            'percentiles': self.percentiles(),
+            'histogram': self.histogram(),
+            'clipped': dict(self.clipped)
+        }
+
+
+def histogram_range(cm: np.ndarray) -> Tuple[float, float]:
+    """Histogram range from a pilot chunk, padded so later chunks rarely fall outside it."""
+    low = float(cm.min())
+    high = float(cm.max())
+    pad = (high - low) * 0.5 or max(abs(low) * 0.01, 1.0)
+    return low - pad, high + pad
+
+
+def _chunk_stats(specs: Dict[str, Dict], goal: float, edges: Tuple[float, float],
+                 seed: np.random.SeedSequence, size: int) -> SimulationStats:
+    """Simulate one chunk and return its statistics (runs in worker processes)."""
+    stats = SimulationStats(goal, edges)
+    cm, clipped = simulate_chunk(specs, seed, size)
+    stats.add(cm, clipped)
+    return stats
+
+
+# =============================================================================
+# SIMULATION
+# =============================================================================
+
+def simulate(params: Dict, chunk_size: int = SIMULATION_CHUNK_SIZE, workers: int = 1) -> Dict:
+    """Run a Monte Carlo simulation and summarize the contribution margin distribution.
+
+    With workers > 1, chunks after the first are spread over a process pool;
+    results are identical to an inline run with the same seed.
+    """
+    seed = params.get('seed')
+    if seed is None:
+        seed = secrets.randbits(32)
+    specs = {name: params[name] for name in SIMULATION_INPUTS}
+    goal = params['contribution_margin_goal']
+    samples = params['samples']
+
+    sizes = [min(chunk_size, samples - start) for start in range(0, samples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    # The first chunk fixes the histogram range shared by every chunk
+    cm, clipped = simulate_chunk(specs, seeds[0], sizes[0])
+    edges = histogram_range(cm)
+    stats = SimulationStats(goal, edges)
+    stats.add(cm, clipped)
+    del cm
+
+    job = partial(_chunk_stats, specs, goal, edges)
+    if workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes) - 1)) as executor:
+            for chunk in executor.map(job, seeds[1:], sizes[1:]):
+                stats.merge(chunk)
+    else:
+        for chunk_seed, size in zip(seeds[1:], sizes[1:]):
+            stats.merge(job(chunk_seed, size))
+
+    result = stats.summary()
+    result['seed'] = seed
+    result['contribution_margin_goal'] = goal
+    result['inputs'] = {name: describe_spec(specs[name]) for name in SIMULATION_INPUTS}
+    return result
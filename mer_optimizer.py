@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Calculator - Budget Allocation Optimizer
+Split one marketing budget across a portfolio of brands / channels so the
+total contribution margin is as high as possible.
+
+Each entity is the single-entity calculator model (target revenue, target
+MER, variable cost) with an optional diminishing-returns curve. The target
+point is the calibration: at the spend it implies (revenue ÷ MER) the MER is
+the target MER, and revenue scales with spend as
+
+    Revenue(spend) = Target Revenue × (spend ÷ reference spend) ^ elasticity
+
+An elasticity of 1 keeps MER constant (the calculator's linear model);
+below 1 each extra euro of spend returns less revenue than the one before.
+
+Contribution margin per entity is concave in spend, so the optimum is where
+every funded entity earns the same marginal CM per euro (the shadow price
+of the budget). The solver bisects on that price with all entities
+evaluated as arrays, so a 10k-entity portfolio solves in milliseconds.
+Per-entity goals become minimum spends: the least spend whose CM reaches
+the goal.
+"""
+
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Upper bound on entities per optimization request
+MAX_ENTITIES = 100_000
+
+# Bisection steps for the budget price and for goal spends (float64 converges well within this)
+BISECTION_STEPS = 100
+
+# Entity fields, with the defaults used for missing values
+ENTITY_DEFAULTS = {
+    'target_revenue': 820000,
+    'target_mer': 7.50,
+    'variable_cost': 0.65,
+    'elasticity': 1.0,                  # 1 = constant MER, < 1 = diminishing returns
+    'min_spend': 0.0,
+    'max_spend': np.inf,
+    'contribution_margin_goal': 0.0     # 0 = no goal for this entity
+}
+
+# Row-wise validation rules
+_ENTITY_RULES = (
+    ('target_revenue', lambda v: v > 0, 'Target Revenue must be greater than 0'),
+    ('target_mer', lambda v: v > 0, 'Target MER must be greater than 0'),
+    ('variable_cost', lambda v: (v >= 0) & (v < 1), 'Variable Cost must be between 0 and 1 (e.g., 0.65 for 65%)'),
+    ('elasticity', lambda v: (v > 0) & (v <= 1), 'Elasticity must be greater than 0 and at most 1'),
+    ('min_spend', lambda v: v >= 0, 'Minimum spend cannot be negative'),
+    ('max_spend', lambda v: v >= 0, 'Maximum spend cannot be negative'),
+    ('contribution_margin_goal', lambda v: v >= 0, 'Contribution Margin Goal cannot be negative'),
+)
+
+# Invalid entities listed in an error response
+MAX_REPORTED_ERRORS = 20
+
+
+def _to_float(value) -> float:
+    """Convert an entity value to float, mapping unparseable values to NaN."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def entity_columns(entities) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """Convert entities (a list of dicts, or a dict of columns) into names and one float array per field."""
+    if isinstance(entities, dict):
+        count = max((len(values) for values in entities.values() if isinstance(values, list)), default=0)
+        names = entities.get('name') or [f'Entity {index + 1}' for index in range(count)]
+        columns = {}
+        for field, default in ENTITY_DEFAULTS.items():
+            values = entities.get(field, default)
+            if isinstance(values, list):
+                columns[field] = np.fromiter((_to_float(v) for v in values), dtype=np.float64, count=len(values))
+            else:
+                columns[field] = np.full(count, _to_float(values))
+        return [str(name) for name in names], columns
+
+    count = len(entities)
+    names = [str(entity.get('name', f'Entity {index + 1}')) for index, entity in enumerate(entities)]
+    columns = {
+        field: np.fromiter((_to_float(entity.get(field, default)) for entity in entities),
+                           dtype=np.float64, count=count)
+        for field, default in ENTITY_DEFAULTS.items()
+    }
+    return names, columns
+
+
+def optimizer_params(data: Dict) -> Dict:
+    """Read optimizer parameters (budget and entities) from a request payload."""
+    names, columns = entity_columns(data.get('entities') or [])
+    return {
+        'budget': _to_float(data.get('budget', 0)),
+        'names': names,
+        'columns': columns
+    }
+
+
+def validate_optimizer_inputs(params: Dict) -> List[str]:
+    """Validate optimizer parameters and return list of errors."""
+    errors = []
+    columns = params['columns']
+    count = len(columns['target_revenue'])
+
+    if not params['budget'] > 0 or not np.isfinite(params['budget']):
+        errors.append('Budget must be greater than 0')
+
+    if count == 0:
+        errors.append('At least one entity is required')
+        return errors
+    if count > MAX_ENTITIES:
+        errors.append(f'Portfolios are limited to {MAX_ENTITIES:,} entities')
+        return errors
+    if len(params['names']) != count or any(len(values) != count for values in columns.values()):
+        errors.append('Every entity column must have the same length')
+        return errors
+
+    failures = [(~check(columns[field]), message) for field, check, message in _ENTITY_RULES]
+    failures.append((columns['min_spend'] > columns['max_spend'], 'Minimum spend cannot exceed maximum spend'))
+    invalid = np.zeros(count, dtype=bool)
+    for failed, _ in failures:
+        invalid |= failed
+    for index in np.flatnonzero(invalid)[:MAX_REPORTED_ERRORS].tolist():
+        messages = '; '.join(message for failed, message in failures if failed[index])
+        errors.append(f"Entity {index + 1} ({params['names'][index]}): {messages}")
+    if np.count_nonzero(invalid) > MAX_REPORTED_ERRORS:
+        errors.append(f'... and {np.count_nonzero(invalid) - MAX_REPORTED_ERRORS:,} more invalid entities')
+
+    if not errors and columns['min_spend'].sum() > params['budget']:
+        errors.append('Minimum spends add up to more than the budget')
+
+    return errors
+
+
+# =============================================================================
+# RESPONSE CURVES
+# =============================================================================
+
+class Portfolio:
+    """Vectorized response curves for every entity in a portfolio."""
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        """Derive each entity's reference spend and marginal-return constant."""
+        self.revenue0 = columns['target_revenue']
+        self.mer0 = columns['target_mer']
+        self.variable_cost = columns['variable_cost']
+        self.elasticity = columns['elasticity']
+        self.reference_spend = self.revenue0 / self.mer0
+        self.linear = self.elasticity == 1
+
+        # CM'(spend) = k × (spend ÷ reference spend) ^ (elasticity - 1) - 1
+        self.k = (1 - self.variable_cost) * self.elasticity * self.mer0
+
+    def revenue(self, spend: np.ndarray) -> np.ndarray:
+        """Revenue earned by each entity at a spend."""
+        return self.revenue0 * (spend / self.reference_spend) ** self.elasticity
+
+    def contribution_margin(self, spend: np.ndarray) -> np.ndarray:
+        """Contribution margin of each entity at a spend."""
+        return self.revenue(spend) * (1 - self.variable_cost) - spend
+
+    def marginal(self, spend: np.ndarray) -> np.ndarray:
+        """Extra contribution margin per extra euro of spend."""
+        with np.errstate(divide='ignore'):
+            return self.k * (spend / self.reference_spend) ** (self.elasticity - 1) - 1
+
+    def spend_at_price(self, price: float, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+        """Spend at which each entity's marginal CM equals `price`, within [low, high]."""
+        with np.errstate(divide='ignore', over='ignore'):
+            exponent = 1 / np.where(self.linear, 1.0, 1 - self.elasticity)
+            curved = self.reference_spend * (self.k / (1 + price)) ** exponent
+        spend = np.where(self.linear, np.where(self.k - 1 > price, high, low), curved)
+        return np.clip(spend, low, high)
+
+    def goal_spend(self, goal: np.ndarray, high: np.ndarray) -> np.ndarray:
+        """Least spend (up to `high`) at which each entity reaches its goal; NaN if it cannot."""
+        peak = self.spend_at_price(0.0, np.zeros_like(high), high)
+        reachable = (goal <= 0) | (self.contribution_margin(peak) >= goal)
+
+        # CM rises from 0 up to the peak spend, so bisect on [0, peak]
+        low = np.zeros_like(high)
+        upper = peak.copy()
+        for _ in range(BISECTION_STEPS):
+            middle = (low + upper) / 2
+            below = self.contribution_margin(middle) < goal
+            low = np.where(below, middle, low)
+            upper = np.where(below, upper, middle)
+        return np.where(goal <= 0, 0.0, np.where(reachable, upper, np.nan))
+
+
+# =============================================================================
+# SOLVER
+# =============================================================================
+
+def _allocate(portfolio: Portfolio, budget: float, low: np.ndarray, high: np.ndarray) -> Tuple[np.ndarray, float, int]:
+    """Allocate the budget by bisecting on its shadow price; returns (spend, price, iterations)."""
+    spend = portfolio.spend_at_price(0.0, low, high)
+    if spend.sum() <= budget:
+        # Every entity is at its most profitable spend; more budget would lower CM
+        return spend, 0.0, 0
+
+    # Find a price high enough that the allocation fits the budget, then bisect
+    price_low, price_high = 0.0, 1.0
+    iterations = 0
+    while portfolio.spend_at_price(price_high, low, high).sum() > budget and iterations < BISECTION_STEPS:
+        price_low, price_high = price_high, price_high * 2
+        iterations += 1
+    for _ in range(BISECTION_STEPS):
+        iterations += 1
+        price = (price_low + price_high) / 2
+        if portfolio.spend_at_price(price, low, high).sum() > budget:
+            price_low = price
+        else:
+            price_high = price
+
+    # Entities at the price share the remaining budget (ties between constant-MER entities)
+    spend = portfolio.spend_at_price(price_high, low, high)
+    headroom = portfolio.spend_at_price(price_low, low, high) - spend
+    remaining = budget - spend.sum()
+    if remaining > 0 and headroom.sum() > 0:
+        spend += headroom * min(remaining / headroom.sum(), 1.0)
+    return spend, price_high, iterations
+
+
+def optimize(params: Dict) -> Dict:
+    """Allocate a budget across a portfolio to maximize total contribution margin.
+
+    Goals are honored as minimum spends when the budget can fund all of them;
+    otherwise the budget is allocated without them and the status says so.
+    """
+    started = time.perf_counter()
+    budget = params['budget']
+    columns = params['columns']
+    portfolio = Portfolio(columns)
+
+    high = np.minimum(columns['max_spend'], budget)
+    goal = columns['contribution_margin_goal']
+    goal_spend = portfolio.goal_spend(goal, high)
+    reachable = ~np.isnan(goal_spend)
+    low = np.maximum(columns['min_spend'], np.where(reachable, goal_spend, 0.0))
+    setup_done = time.perf_counter()
+
+    status = 'optimal'
+    if low.sum() > budget:
+        status = 'goals_relaxed'
+        low = columns['min_spend']
+    spend, price, iterations = _allocate(portfolio, budget, low, high)
+    solved = time.perf_counter()
+
+    revenue = portfolio.revenue(spend)
+    cm = portfolio.contribution_margin(spend)
+    has_goal = goal > 0
+    meets_goal = cm >= goal * (1 - 1e-9)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mer = np.where(spend > 0, revenue / spend, np.nan)
+
+    return {
+        'status': status,
+        'budget': budget,
+        'allocated': float(spend.sum()),
+        'unspent': float(budget - spend.sum()),
+        'total_contribution_margin': float(cm.sum()),
+        'total_revenue': float(revenue.sum()),
+        'shadow_price': price,
+        'goals': {
+            'count': int(np.count_nonzero(has_goal)),
+            'met': int(np.count_nonzero(has_goal & meets_goal)),
+            'unreachable': int(np.count_nonzero(has_goal & ~reachable))
+        },
+        'entities': {
+            'name': params['names'],
+            'spend': spend,
+            'revenue': revenue,
+            'mer': mer,
+            'contribution_margin': cm,
+            'marginal_contribution_margin': portfolio.marginal(spend),
+            'goal_spend': np.where(has_goal, goal_spend, np.nan),
+            'meets_goal': np.where(has_goal, meets_goal, True)
+        },
+        'timing': {
+            'entities': len(spend),
+            'iterations': iterations,
+            'setup_ms': (setup_done - started) * 1000,
+            'solve_ms': (solved - setup_done) * 1000,
+            'total_ms': (time.perf_counter() - started) * 1000
+        }
+    }
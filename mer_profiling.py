@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Calculator - Request Profiling
+Opt-in cProfile / tracemalloc profiles of individual production requests.
+
+Profiling is off unless MER_PROFILE_TOKEN is set. A request is then profiled
+when it carries an `X-MER-Profile: cpu|memory` header (or a `profile=cpu|memory`
+query parameter) together with the token in `X-MER-Profile-Token` (or
+`profile_token`). With MER_PROFILE_SAMPLE_RATE > 0, that fraction of all
+requests is also CPU-profiled without asking.
+
+- cpu: cProfile of the handling thread, saved as a pstats file
+- memory: tracemalloc snapshot of the allocations the request left alive,
+  plus the peak traced memory while it ran
+
+Profiles are kept in a bounded on-disk ring (MER_PROFILE_DIR, newest
+MER_PROFILE_KEEP kept). The response carries the profile id in
+`X-MER-Profile-Id`, and the admin routes list and download them.
+
+Only one request is profiled at a time (both profilers are process-wide);
+a profile requested while another runs is skipped and the request is served
+normally.
+"""
+
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import secrets
+import threading
+import time
+import tracemalloc
+import urllib.parse
+from typing import Dict, List, Optional, Tuple
+
+import mer_serializer
+
+PROFILE_MODES = ('cpu', 'memory')
+
+PROFILE_HEADER = 'X-MER-Profile'
+TOKEN_HEADER = 'X-MER-Profile-Token'
+ID_HEADER = 'X-MER-Profile-Id'
+PROFILE_PARAM = 'profile'
+TOKEN_PARAM = 'profile_token'
+ADMIN_PATH = '/admin/profiles'
+
+# Default stack depth recorded per allocation in memory profiles; tracing cost grows with it
+# (rendering a chart runs about 3x slower with 1 frame, 8x with 5 and 25x with 25)
+TRACEMALLOC_FRAMES = 5
+
+# <created ms>-<mode>-<random>, e.g. 1760000000000-cpu-3f9a1c2b
+_PROFILE_ID = re.compile(r'^\d{13}-(cpu|memory)-[0-9a-f]{8}$')
+
+_EXTENSIONS = {'cpu': '.prof', 'memory': '.snapshot'}
+
+
+def valid_profile_id(profile_id: str) -> bool:
+    """Whether a value has the shape of a profile id issued by this module."""
+    return _PROFILE_ID.match(profile_id) is not None
+
+
+def split_profile_params(target: str) -> Tuple[str, Dict[str, str]]:
+    """Remove the profiling query parameters from a request target.
+
+    Returns the target without them (so routing is unaffected) and the
+    removed parameters.
+    """
+    path, separator, query = target.partition('?')
+    if not separator:
+        return target, {}
+    pairs = urllib.parse.parse_qsl(query, keep_blank_values=True)
+    params = {name: value for name, value in pairs if name in (PROFILE_PARAM, TOKEN_PARAM)}
+    if not params:
+        return target, {}
+    rest = [(name, value) for name, value in pairs if name not in params]
+    return (path + '?' + urllib.parse.urlencode(rest) if rest else path), params
+
+
+class ProfileRun:
+    """One request being profiled; `stop()` saves it and returns its id."""
+
+    def __init__(self, profiler: 'Profiler', mode: str, route: str):
+        self.profiler = profiler
+        self.mode = mode
+        self.route = route
+        self.profile_id = f'{int(time.time() * 1000)}-{mode}-{secrets.token_hex(4)}'
+        self.started = time.perf_counter()
+        self._profile = None
+        if mode == 'cpu':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            tracemalloc.start(profiler.frames)
+
+    def stop(self, status: Optional[int] = None) -> str:
+        """Stop profiling, save the profile to the ring and release the profiler."""
+        try:
+            duration = time.perf_counter() - self.started
+            metadata = {'id': self.profile_id, 'mode': self.mode, 'route': self.route, 'status': status,
+                        'created': time.time(), 'duration_ms': round(duration * 1000, 3)}
+            path = self.profiler.path(self.profile_id)
+            if self.mode == 'cpu':
+                self._profile.disable()
+                self._profile.dump_stats(path)
+            else:
+                snapshot = tracemalloc.take_snapshot()
+                metadata['current_bytes'], metadata['peak_bytes'] = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                snapshot.dump(path)
+            metadata['bytes'] = os.path.getsize(path)
+            self.profiler.save_metadata(metadata)
+        finally:
+            self.profiler.release()
+        return self.profile_id
+
+
+class Profiler:
+    """Token-gated request profiler with a bounded on-disk ring of profiles."""
+
+    def __init__(self, directory: str = 'mer_profiles', keep: int = 20,
+                 token: Optional[str] = None, sample_rate: float = 0.0,
+                 frames: int = TRACEMALLOC_FRAMES):
+        """Initialize the profiler; without a token it never profiles."""
+        self.directory = directory
+        self.keep = keep
+        self.token = token
+        self.sample_rate = sample_rate
+        self.frames = frames
+        self.skipped = 0
+        self._busy = threading.Lock()
+        self._ring_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether profiling is configured."""
+        return bool(self.token)
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """Whether a request's token matches the configured one."""
+        return self.enabled and bool(token) and hmac.compare_digest(token.encode(), self.token.encode())
+
+    def requested_mode(self, mode: Optional[str], token: Optional[str]) -> Optional[str]:
+        """The profile mode for a request (explicit and authorized, or sampled), or None."""
+        if not self.enabled:
+            return None
+        if mode:
+            mode = mode.strip().lower()
+            return mode if mode in PROFILE_MODES and self.authorized(token) else None
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return 'cpu'
+        return None
+
+    def start(self, mode: str, route: str) -> Optional[ProfileRun]:
+        """Start profiling the current request, or return None if another profile is running."""
+        if not self._busy.acquire(blocking=False):
+            self.skipped += 1
+            return None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            return ProfileRun(self, mode, route)
+        except Exception:
+            self._busy.release()
+            raise
+
+    def release(self):
+        """Let the next request be profiled. Called by ProfileRun.stop()."""
+        self._busy.release()
+
+    def path(self, profile_id: str) -> str:
+        """Path of a profile's data file."""
+        mode = profile_id.split('-')[1]
+        return os.path.join(self.directory, profile_id + _EXTENSIONS[mode])
+
+    def save_metadata(self, metadata: Dict):
+        """Write a profile's metadata next to it and trim the ring to the newest `keep`."""
+        with open(os.path.join(self.directory, metadata['id'] + '.json'), 'w') as f:
+            json.dump(metadata, f)
+        with self._ring_lock:
+            for old in self._ids()[self.keep:]:
+                self.delete(old)
+
+    def delete(self, profile_id: str):
+        """Remove a profile and its metadata."""
+        for path in (self.path(profile_id), os.path.join(self.directory, profile_id + '.json')):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _ids(self) -> List[str]:
+        """Ids of the stored profiles, newest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        ids = {name.rsplit('.', 1)[0] for name in names if name.endswith('.json')}
+        return sorted((profile_id for profile_id in ids if valid_profile_id(profile_id)), reverse=True)
+
+    def list(self) -> List[Dict]:
+        """Metadata of the stored profiles, newest first."""
+        profiles = []
+        for profile_id in self._ids():
+            try:
+                with open(os.path.join(self.directory, profile_id + '.json')) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def load(self, profile_id: str) -> Optional[Tuple[str, bytes]]:
+        """(filename, raw bytes) of a stored profile, or None if unknown."""
+        if not valid_profile_id(profile_id):
+            return None
+        path = self.path(profile_id)
+        try:
+            with open(path, 'rb') as f:
+                return os.path.basename(path), f.read()
+        except FileNotFoundError:
+            return None
+
+    def report(self, profile_id: str, limit: int = 40) -> Optional[str]:
+        """Readable summary of a stored profile, or None if unknown.
+
+        CPU profiles list the functions with the most cumulative time; memory
+        profiles list the source lines holding the most allocated memory.
+        """
+        if not valid_profile_id(profile_id) or not os.path.exists(self.path(profile_id)):
+            return None
+        path = self.path(profile_id)
+        if profile_id.split('-')[1] == 'cpu':
+            out = io.StringIO()
+            pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(limit)
+            return out.getvalue()
+
+        snapshot = tracemalloc.Snapshot.load(path)
+        statistics = snapshot.statistics('lineno')
+        lines = [f'{len(statistics)} allocation sites, {sum(s.size for s in statistics):,} bytes alive', '']
+        lines += [str(statistic) for statistic in statistics[:limit]]
+        return '\n'.join(lines) + '\n'
+
+    def respond(self, path: str, token: Optional[str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Serve an admin route as (status, headers, body).
+
+        GET /admin/profiles lists the profiles, /admin/profiles/<id> downloads
+        one and /admin/profiles/<id>/report summarizes it as text.
+        """
+        if not self.enabled:
+            return 404, {'Content-Type': 'text/plain'}, b'Not Found'
+        if not self.authorized(token):
+            return 403, {'Content-Type': 'text/plain'}, b'Forbidden'
+        headers = {'Cache-Control': 'no-store'}
+        if path == ADMIN_PATH:
+            body = mer_serializer.dumps(dict(self.stats(), profiles=self.list()))
+            return 200, dict(headers, **{'Content-Type': 'application/json; charset=utf-8'}), body
+
+        profile_id, _, view = path[len(ADMIN_PATH) + 1:].partition('/')
+        if view == 'report':
+            report = self.report(profile_id)
+            if report is not None:
+                return 200, dict(headers, **{'Content-Type': 'text/plain; charset=utf-8'}), report.encode('utf-8')
+        elif not view:
+            stored = self.load(profile_id)
+            if stored is not None:
+                filename, data = stored
+                return 200, dict(headers, **{
+                    'Content-Type': 'application/octet-stream',
+                    'Content-Disposition': f'attachment; filename={filename}'
+                }), data
+        return 404, {'Content-Type': 'text/plain'}, b'Not Found'
+
+    def stats(self) -> Dict:
+        """Return the profiling settings and stored profile count."""
+        return {
+            'enabled': self.enabled,
+            'directory': self.directory,
+            'keep': self.keep,
+            'sample_rate': self.sample_rate,
+            'frames': self.frames,
+            'profiles': len(self._ids()),
+            'skipped': self.skipped
+        }
+
+
+def create_profiler() -> Profiler:
+    """Create the profiler configured by environment variables.
+
+    MER_PROFILE_TOKEN (enables profiling), MER_PROFILE_DIR, MER_PROFILE_KEEP
+    (profiles kept), MER_PROFILE_SAMPLE_RATE (fraction of requests
+    CPU-profiled automatically) and MER_PROFILE_FRAMES (allocation stack
+    depth of memory profiles).
+    """
+    return Profiler(
+        directory=os.environ.get('MER_PROFILE_DIR', 'mer_profiles'),
+        keep=int(os.environ.get('MER_PROFILE_KEEP', 20)),
+        token=os.environ.get('MER_PROFILE_TOKEN') or None,
+        sample_rate=float(os.environ.get('MER_PROFILE_SAMPLE_RATE', 0)),
+        frames=int(os.environ.get('MER_PROFILE_FRAMES', TRACEMALLOC_FRAMES))
+    )
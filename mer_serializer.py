@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Calculator - JSON Serialization
+One JSON layer for every entry point.
+
+orjson is used when it is installed: it is several times faster than the
+standard json module and encodes NumPy arrays straight from their buffers.
+Without it, the standard json module is used with a NumPy-aware fallback,
+so both backends produce the same documents (NaN is written as null).
+Large arrays can also be encoded incrementally with iter_dumps.
+"""
+
+import json
+import math
+from typing import Iterator
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+# Elements per encoded piece when streaming large arrays
+ARRAY_CHUNK_SIZE = 65_536
+
+# Responses holding at least this many array elements are worth streaming
+STREAM_THRESHOLD = 100_000
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _array_to_list(values: np.ndarray) -> list:
+    """Convert an array to a list, writing non-finite floats as None (JSON null)."""
+    if values.dtype.kind == 'f' and not np.isfinite(values).all():
+        values = np.where(np.isfinite(values), values, None)
+    return values.tolist()
+
+
+def _default(obj):
+    """Encode NumPy types the encoders do not handle natively."""
+    if isinstance(obj, np.ndarray):
+        return _array_to_list(obj)
+    if isinstance(obj, np.generic):
+        value = obj.item()
+        if isinstance(value, float) and not np.isfinite(value):
+            return None
+        return value
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def _finite(obj):
+    """Copy containers with non-finite floats replaced by None.
+
+    Python floats (and np.float64, a float subclass) are encoded by the json
+    module itself without reaching _default, which would write NaN/Infinity.
+    """
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(item) for item in obj]
+    return obj
+
+
+def _json_dumps(obj) -> bytes:
+    """Encode with the standard json module."""
+    return json.dumps(_finite(obj), default=_default, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(obj) -> bytes:
+    """Encode an object (which may contain NumPy arrays and scalars) as UTF-8 JSON."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits or non-contiguous arrays
+            pass
+    return _json_dumps(obj)
+
+
+def loads(data):
+    """Decode JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _iter_sequence(values, chunk_size: int) -> Iterator[bytes]:
+    """Encode a 1-D array or list as a JSON list, chunk by chunk."""
+    yield b'['
+    for start in range(0, len(values), chunk_size):
+        if start:
+            yield b','
+        chunk = values[start:start + chunk_size]
+        if isinstance(chunk, np.ndarray):
+            chunk = np.ascontiguousarray(chunk)
+        yield dumps(chunk)[1:-1]
+    yield b']'
+
+
+def iter_dumps(obj, chunk_size: int = ARRAY_CHUNK_SIZE) -> Iterator[bytes]:
+    """Encode an object as JSON in pieces, so large arrays never exist as one encoded buffer."""
+    if isinstance(obj, dict):
+        yield b'{'
+        for position, (key, value) in enumerate(obj.items()):
+            yield (b',' if position else b'') + dumps(str(key)) + b':'
+            yield from iter_dumps(value, chunk_size)
+        yield b'}'
+    elif (isinstance(obj, list) or isinstance(obj, np.ndarray) and obj.ndim == 1) and len(obj) > chunk_size:
+        yield from _iter_sequence(obj, chunk_size)
+    elif isinstance(obj, list) and any(isinstance(item, (dict, np.ndarray)) for item in obj):
+        yield b'['
+        for position, item in enumerate(obj):
+            if position:
+                yield b','
+            yield from iter_dumps(item, chunk_size)
+        yield b']'
+    else:
+        yield dumps(obj)
+
+
+def _array_elements(obj) -> int:
+    """Count the elements held in arrays and lists inside a response, without visiting scalars."""
+    if isinstance(obj, dict):
+        return sum(_array_elements(value) for value in obj.values())
+    if isinstance(obj, np.ndarray):
+        return obj.size
+    if isinstance(obj, list):
+        if obj and isinstance(obj[0], (dict, list, np.ndarray)):
+            return sum(_array_elements(item) for item in obj)
+        return len(obj)
+    return 0
+
+
+def should_stream(obj) -> bool:
+    """Whether a response holds enough array elements to be worth streaming."""
+    return _array_elements(obj) >= STREAM_THRESHOLD
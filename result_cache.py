@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Calculator - Scenario Result Cache
+Memoized responses for scenario calculations.
+
+A /calculate response is a pure function of a handful of floats, so it is
+cached under the canonicalized input tuple. Keys use the exact inputs by
+default. With MER_RESULT_CACHE_DIGITS set, inputs are first quantized to that
+many significant digits and the apps calculate with the quantized values, so
+near-duplicate inputs (e.g. from UI sliders) share one cached, consistent
+result. Quantizing changes the euro amounts used (and can flip meets_goal for
+inputs right at the goal), so it is opt-in.
+
+Entries expire after a TTL and the least recently used are evicted by count.
+By default each process keeps its own cache; with MER_RESULT_CACHE_ADDRESS
+set, every worker process uses one cache served over a local socket
+(`python result_cache.py --address 127.0.0.1:50055`), falling back to a
+local cache whenever the server is unreachable.
+
+The shared cache speaks the multiprocessing manager protocol, which unpickles
+what it receives, so anyone holding its authkey can run code in the server
+and its clients. There is no default key: MER_RESULT_CACHE_AUTHKEY must be
+set to a secret shared by the server and the apps.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import AuthenticationError
+from multiprocessing.managers import BaseManager
+from typing import Callable, Dict, Hashable, Optional, Tuple, Union
+
+import mer_serializer
+
+# Seconds to use the local cache before reconnecting to an unreachable shared cache
+RECONNECT_SECONDS = 5.0
+
+
+def quantize(value: float, digits: int) -> float:
+    """Round a value to `digits` significant digits."""
+    return float(f'{value:.{digits}g}')
+
+
+class ResultCache:
+    """Thread-safe LRU cache of encoded results with a TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        """Initialize the cache with an entry limit and a time-to-live in seconds."""
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        # key -> (expiry time, encoded result), least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Return the cached result for a key, or None on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: bytes):
+        """Store a result, evicting least recently used entries over the limit."""
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters and current cache usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'ttl': self.ttl
+            }
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable):
+        """Remove an entry if present. Caller holds the lock."""
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous[1])
+
+
+# =============================================================================
+# SHARED BACKEND
+# =============================================================================
+
+class CacheManager(BaseManager):
+    """Serves one ResultCache to every worker process over a local socket."""
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """Parse 'host:port' into a TCP address; anything else is a Unix socket path."""
+    host, separator, port = address.rpartition(':')
+    if separator and port.isdigit():
+        return host or '127.0.0.1', int(port)
+    return address
+
+
+def authkey_from_env() -> bytes:
+    """The shared cache secret from MER_RESULT_CACHE_AUTHKEY; raises ValueError if unset."""
+    authkey = os.environ.get('MER_RESULT_CACHE_AUTHKEY', '')
+    if not authkey:
+        raise ValueError('MER_RESULT_CACHE_AUTHKEY must be set to use a shared result cache')
+    return authkey.encode()
+
+
+def connect_shared(address: str, authkey: bytes):
+    """Connect to a shared cache server and return a proxy with the ResultCache methods."""
+    CacheManager.register('get_cache')
+    manager = CacheManager(address=parse_address(address), authkey=authkey)
+    manager.connect()
+    return manager.get_cache()
+
+
+def serve_shared(address: str, max_entries: int, ttl: float, authkey: bytes):
+    """Run a shared cache server until interrupted."""
+    cache = ResultCache(max_entries, ttl)
+    CacheManager.register('get_cache', callable=lambda: cache)
+    manager = CacheManager(address=parse_address(address), authkey=authkey)
+    print(f"🗄️  Shared result cache on {address} ({max_entries:,} entries, {ttl:g}s TTL)")
+    manager.get_server().serve_forever()
+
+
+# =============================================================================
+# SCENARIO CACHE
+# =============================================================================
+
+class ScenarioCache:
+    """Quantizes scenario inputs and memoizes the results computed from them."""
+
+    def __init__(self, local: ResultCache, digits: Optional[int] = None,
+                 shared_address: Optional[str] = None, authkey: Optional[bytes] = None):
+        """Use the shared cache at `shared_address` (which needs `authkey`) when given, else the local cache.
+
+        With `digits`, inputs are quantized to that many significant digits;
+        without, they are used exactly.
+        """
+        if shared_address and not authkey:
+            raise ValueError('A shared result cache needs an authkey')
+        self.local = local
+        self.digits = digits
+        self.shared_address = shared_address
+        self.authkey = authkey
+        self.backend_errors = 0
+        self._shared = None
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def quantize(self, values: Dict[str, float]) -> Dict[str, float]:
+        """Quantize each value to the cache precision (unchanged when quantization is off)."""
+        if self.digits is None:
+            return dict(values)
+        return {name: quantize(value, self.digits) for name, value in values.items()}
+
+    def key(self, namespace: str, values: Dict[str, float]) -> Tuple:
+        """Canonical cache key: namespace plus the quantized values in field-name order."""
+        values = self.quantize(values)
+        return (namespace,) + tuple((name, float(values[name])) for name in sorted(values))
+
+    def _backend(self):
+        """The shared cache proxy (connected on first use), or the local cache."""
+        if not self.shared_address:
+            return self.local
+        with self._lock:
+            if self._shared is None:
+                if time.monotonic() < self._retry_at:
+                    return self.local
+                try:
+                    self._shared = connect_shared(self.shared_address, self.authkey)
+                except (OSError, EOFError, AuthenticationError):
+                    # A rejected authkey is a misconfiguration; it shows up in backend_errors
+                    self.backend_errors += 1
+                    self._retry_at = time.monotonic() + RECONNECT_SECONDS
+                    return self.local
+            return self._shared
+
+    def _call(self, method: str, *args):
+        """Call a cache method, falling back to the local cache if the shared one fails."""
+        backend = self._backend()
+        try:
+            return getattr(backend, method)(*args)
+        except (OSError, EOFError):
+            if backend is self.local:
+                raise
+            with self._lock:
+                self._shared = None
+                self.backend_errors += 1
+                self._retry_at = time.monotonic() + RECONNECT_SECONDS
+            return getattr(self.local, method)(*args)
+
+    def get_or_compute(self, namespace: str, values: Dict[str, float], compute: Callable[[], Dict]) -> Dict:
+        """Return the cached result for these inputs, computing and caching it on a miss."""
+        key = self.key(namespace, values)
+        cached = self._call('get', key)
+        if cached is not None:
+            return mer_serializer.loads(cached)
+        result = compute()
+        self._call('put', key, mer_serializer.dumps(result))
+        return result
+
+    def stats(self) -> Dict:
+        """Return the backend's counters plus the quantization and backend settings."""
+        return dict(self._call('stats'), digits=self.digits,
+                    shared=bool(self.shared_address) and self._shared is not None,
+                    backend_errors=self.backend_errors)
+
+
+def create_cache() -> ScenarioCache:
+    """Create the scenario cache configured by environment variables.
+
+    MER_RESULT_CACHE_ENTRIES, MER_RESULT_CACHE_TTL (seconds),
+    MER_RESULT_CACHE_DIGITS (significant digits; exact inputs when unset), MER_RESULT_CACHE_ADDRESS
+    (host:port or socket path of a shared cache server) and, required with
+    an address, MER_RESULT_CACHE_AUTHKEY (the server's secret).
+    """
+    shared_address = os.environ.get('MER_RESULT_CACHE_ADDRESS') or None
+    digits = os.environ.get('MER_RESULT_CACHE_DIGITS')
+    return ScenarioCache(
+        ResultCache(int(os.environ.get('MER_RESULT_CACHE_ENTRIES', 1024)),
+                    float(os.environ.get('MER_RESULT_CACHE_TTL', 300))),
+        digits=int(digits) if digits else None,
+        shared_address=shared_address,
+        authkey=authkey_from_env() if shared_address else None
+    )
+
+
+def main(argv=None):
+    """Run the shared result cache server."""
+    parser = argparse.ArgumentParser(description='Shared scenario result cache for the MER calculator web apps.')
+    parser.add_argument('--address', default='127.0.0.1:50055', help='host:port or Unix socket path')
+    parser.add_argument('--entries', type=int, default=int(os.environ.get('MER_RESULT_CACHE_ENTRIES', 1024)),
+                        help='Maximum cached results')
+    parser.add_argument('--ttl', type=float, default=float(os.environ.get('MER_RESULT_CACHE_TTL', 300)),
+                        help='Seconds a result stays cached')
+    args = parser.parse_args(argv)
+    try:
+        authkey = authkey_from_env()
+    except ValueError as e:
+        print(f"❌ {e}")
+        print("💡 Use a long random secret, e.g. python -c \"import secrets; print(secrets.token_urlsafe(32))\"")
+        sys.exit(1)
+    try:
+        serve_shared(args.address, args.entries, args.ttl, authkey)
+    except KeyboardInterrupt:
+        print("\n🛑 Shared result cache stopped")
+
+
+if __name__ == '__main__':
+    main()
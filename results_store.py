@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Calculator - Results Store
+Append-only history of calculator runs in a local SQLite database.
+
+Every run is appended with its inputs, result and metadata; nothing is
+overwritten. Runs are indexed by time and by their parameter tuple, so
+"last N runs", time-range and parameter-range queries stay fast as the
+history grows. The revenue / contribution margin series of a run is stored
+once per distinct parameter set (content-addressed), so identical runs
+share it and can be answered from the store instead of being recomputed.
+
+The database runs in WAL mode: readers never block the writer, and each
+append (or batch of appends) is one atomic transaction.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import chart_cache
+
+# Inputs that identify a run; runs with equal values share one stored series
+PARAMETER_FIELDS = ('target_revenue', 'target_mer', 'variable_cost',
+                    'contribution_margin_goal', 'revenue_increment')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    params_key TEXT PRIMARY KEY,
+    points INTEGER NOT NULL,
+    revenue BLOB NOT NULL,
+    contribution_margin BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created_ts REAL NOT NULL,
+    created_at TEXT NOT NULL,
+    params_key TEXT NOT NULL,
+    target_revenue REAL NOT NULL,
+    target_mer REAL NOT NULL,
+    variable_cost REAL NOT NULL,
+    contribution_margin_goal REAL NOT NULL,
+    revenue_increment REAL NOT NULL,
+    contribution_margin REAL NOT NULL,
+    meets_goal INTEGER NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created_ts);
+CREATE INDEX IF NOT EXISTS runs_params ON runs (target_revenue, target_mer, variable_cost,
+                                                contribution_margin_goal, revenue_increment);
+CREATE INDEX IF NOT EXISTS runs_params_key ON runs (params_key, created_ts);
+"""
+
+_RUN_COLUMNS = ('id', 'created_ts', 'created_at', 'params_key') + PARAMETER_FIELDS + \
+               ('contribution_margin', 'meets_goal', 'metadata')
+
+
+def params_key(params: Dict) -> str:
+    """Content address of a run's parameter tuple."""
+    return chart_cache.make_key(**{field: params[field] for field in PARAMETER_FIELDS})
+
+
+def _row_to_run(row: Tuple) -> Dict:
+    """Convert a runs table row to a run dict."""
+    run = dict(zip(_RUN_COLUMNS, row))
+    run['meets_goal'] = bool(run['meets_goal'])
+    run['metadata'] = json.loads(run['metadata'])
+    return run
+
+
+class ResultsStore:
+    """Append-only SQLite store of calculator runs (WAL mode, indexed by time and parameters)."""
+
+    def __init__(self, path: str = 'mer_calculator_results.db'):
+        """Open (or create) the store."""
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
+
+    # -------------------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------------------
+
+    def append(self, params: Dict, contribution_margin: float, meets_goal: bool,
+               revenue_values=None, cm_values=None, metadata: Optional[Dict] = None) -> int:
+        """Append one run and return its id."""
+        return self.append_many([{
+            'params': params,
+            'contribution_margin': contribution_margin,
+            'meets_goal': meets_goal,
+            'revenue_values': revenue_values,
+            'cm_values': cm_values,
+            'metadata': metadata
+        }])[0]
+
+    def append_many(self, runs: Iterable[Dict]) -> List[int]:
+        """Append a batch of runs in one atomic transaction and return their ids.
+
+        Each run is a dict with params, contribution_margin, meets_goal and
+        optional revenue_values / cm_values / metadata. A series is stored only
+        the first time its parameter tuple is seen.
+        """
+        ids = []
+        now = time.time()
+        created_at = datetime.fromtimestamp(now).isoformat()
+        with self._lock, self._connection:
+            for run in runs:
+                params = run['params']
+                key = params_key(params)
+                if run.get('revenue_values') is not None:
+                    revenue = np.asarray(run['revenue_values'], dtype='<f8')
+                    cm = np.asarray(run['cm_values'], dtype='<f8')
+                    self._connection.execute(
+                        'INSERT OR IGNORE INTO series (params_key, points, revenue, contribution_margin) '
+                        'VALUES (?, ?, ?, ?)',
+                        (key, len(revenue), revenue.tobytes(), cm.tobytes())
+                    )
+                cursor = self._connection.execute(
+                    f"INSERT INTO runs (created_ts, created_at, params_key, {', '.join(PARAMETER_FIELDS)}, "
+                    f"contribution_margin, meets_goal, metadata) VALUES ({', '.join('?' * (len(PARAMETER_FIELDS) + 6))})",
+                    (run.get('created_ts', now), run.get('created_at', created_at), key,
+                     *(float(params[field]) for field in PARAMETER_FIELDS),
+                     float(run['contribution_margin']), int(bool(run['meets_goal'])),
+                     json.dumps(run.get('metadata') or {}))
+                )
+                ids.append(cursor.lastrowid)
+        return ids
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def _select(self, where: str = '', args: Tuple = (), order: str = 'created_ts DESC, id DESC',
+                limit: Optional[int] = None) -> List[Dict]:
+        """Run a SELECT over the runs table."""
+        sql = f"SELECT {', '.join(_RUN_COLUMNS)} FROM runs"
+        if where:
+            sql += f' WHERE {where}'
+        sql += f' ORDER BY {order}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            args = args + (int(limit),)
+        with self._lock:
+            rows = self._connection.execute(sql, args).fetchall()
+        return [_row_to_run(row) for row in rows]
+
+    def last_runs(self, count: int = 10) -> List[Dict]:
+        """The most recent runs, newest first."""
+        return self._select(limit=count)
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None,
+              limit: Optional[int] = None, **ranges: Tuple[float, float]) -> List[Dict]:
+        """Runs in a time range (epoch seconds) and parameter ranges, newest first.
+
+        Parameter ranges are keyword arguments such as target_mer=(5.0, 8.0).
+        """
+        conditions = []
+        args = []
+        if since is not None:
+            conditions.append('created_ts >= ?')
+            args.append(since)
+        if until is not None:
+            conditions.append('created_ts < ?')
+            args.append(until)
+        for field, (low, high) in ranges.items():
+            if field not in PARAMETER_FIELDS + ('contribution_margin',):
+                raise ValueError(f'Unknown run field: {field}')
+            conditions.append(f'{field} BETWEEN ? AND ?')
+            args.extend((low, high))
+        return self._select(' AND '.join(conditions), tuple(args), limit=limit)
+
+    def find_identical(self, params: Dict) -> Optional[Dict]:
+        """The latest run with exactly these parameters (and its series), or None."""
+        runs = self._select('params_key = ?', (params_key(params),), limit=1)
+        if not runs:
+            return None
+        run = runs[0]
+        series = self.series(run['params_key'])
+        if series is not None:
+            run['revenue_values'], run['cm_values'] = series
+        return run
+
+    def series(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """The stored (revenue, contribution margin) series for a parameter key."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT revenue, contribution_margin FROM series WHERE params_key = ?', (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype='<f8'), np.frombuffer(row[1], dtype='<f8')
+
+    def count(self) -> int:
+        """Number of stored runs."""
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM runs').fetchone()[0]
+
+    def stats(self) -> Dict:
+        """Run and distinct-series counts."""
+        with self._lock:
+            runs, distinct = self._connection.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT params_key) FROM runs'
+            ).fetchone()
+            series = self._connection.execute('SELECT COUNT(*) FROM series').fetchone()[0]
+        return {'runs': runs, 'distinct_parameters': distinct, 'stored_series': series}
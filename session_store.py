@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Calculator - Session Store
+Server-side sessions: the cookie carries only a random session id and the
+session data (the last config and inputs a visitor calculated with) stays on
+the server.
+
+Two backends share one interface:
+- MemorySessionStore: thread-safe LRU with a sliding TTL, bounded by count
+- SQLiteSessionStore: local SQLite file, shared by worker processes and
+  surviving restarts, bounded by count and purged of expired sessions
+
+Both evict the least recently used sessions once the count limit is reached
+and report their size, hits, misses, evictions and expirations.
+"""
+
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from http.cookies import CookieError, SimpleCookie
+from typing import Dict, Optional, Tuple
+
+import mer_serializer
+
+SESSION_COOKIE = 'mer_session'
+
+# 128-bit ids from secrets.token_urlsafe(16); anything else in the cookie is ignored
+_SESSION_ID = re.compile(r'^[A-Za-z0-9_-]{22}$')
+
+# SQLite backend: writes between purges of expired / surplus sessions
+PURGE_INTERVAL = 256
+
+
+def valid_session_id(session_id: Optional[str]) -> bool:
+    """Whether a value has the shape of a session id issued by this module."""
+    return bool(session_id) and _SESSION_ID.match(session_id) is not None
+
+
+def parse_cookie(cookie_header: Optional[str], name: str = SESSION_COOKIE) -> Optional[str]:
+    """The session id in a Cookie header, or None if absent or malformed."""
+    if not cookie_header:
+        return None
+    try:
+        cookie = SimpleCookie(cookie_header)
+    except CookieError:
+        return None
+    morsel = cookie.get(name)
+    if morsel is None or not valid_session_id(morsel.value):
+        return None
+    return morsel.value
+
+
+class SessionStore(ABC):
+    """Interface shared by the session backends; subclasses implement storage."""
+
+    backend = 'base'
+
+    def __init__(self, max_sessions: int = 10_000, ttl: float = 24 * 3600):
+        """Initialize the store with a session-count limit and idle timeout in seconds."""
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Return a session's data (renewing its TTL), or None if unknown or expired."""
+
+    @abstractmethod
+    def set(self, session_id: str, data: Dict):
+        """Store a session's data."""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Remove a session."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of live sessions."""
+
+    def new_id(self) -> str:
+        """A new random session id."""
+        return secrets.token_urlsafe(16)
+
+    def open(self, cookie_header: Optional[str]) -> Tuple[str, Dict, bool]:
+        """Resolve a request's Cookie header to (session id, data, is new)."""
+        session_id = parse_cookie(cookie_header)
+        data = self.get(session_id) if session_id else None
+        if data is None:
+            return self.new_id(), {}, True
+        return session_id, data, False
+
+    def save(self, session_id: str, data: Dict, new: bool) -> Dict[str, str]:
+        """Persist a session after a request and return the response headers it needs.
+
+        Empty sessions are dropped (clearing the cookie); a cookie is only sent
+        when the session is new or has data to keep alive.
+        """
+        if not data:
+            if new:
+                return {}
+            self.delete(session_id)
+            return {'Set-Cookie': self.cookie_header('', 0)}
+        self.set(session_id, data)
+        return {'Set-Cookie': self.cookie_header(session_id, self.ttl)}
+
+    def cookie_header(self, session_id: str, max_age: float) -> str:
+        """Set-Cookie value carrying a session id."""
+        return f'{SESSION_COOKIE}={session_id}; Max-Age={int(max_age)}; Path=/; HttpOnly; SameSite=Lax'
+
+    def stats(self) -> Dict:
+        """Return session count, limits and hit/miss/eviction counters."""
+        with self._lock:
+            counters = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+        return {
+            'backend': self.backend,
+            'sessions': len(self),
+            'max_sessions': self.max_sessions,
+            'ttl': self.ttl,
+            **counters
+        }
+
+
+class MemorySessionStore(SessionStore):
+    """Thread-safe in-memory LRU of sessions with a sliding TTL."""
+
+    backend = 'memory'
+
+    def __init__(self, max_sessions: int = 10_000, ttl: float = 24 * 3600):
+        """Initialize an empty store."""
+        super().__init__(max_sessions, ttl)
+        # session id -> (expiry time, encoded data), least recently used first
+        self._sessions = OrderedDict()
+        self._bytes = 0
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Return a session's data (renewing its TTL), or None if unknown or expired."""
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._sessions[session_id] = (now + self.ttl, entry[1])
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+        return mer_serializer.loads(entry[1])
+
+    def set(self, session_id: str, data: Dict):
+        """Store a session's data, evicting the least recently used sessions over the limit."""
+        encoded = mer_serializer.dumps(data)
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            previous = self._sessions.pop(session_id, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+            self._sessions[session_id] = (now + self.ttl, encoded)
+            self._bytes += len(encoded)
+            while len(self._sessions) > self.max_sessions:
+                _, (_, evicted) = self._sessions.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def delete(self, session_id: str):
+        """Remove a session."""
+        with self._lock:
+            previous = self._sessions.pop(session_id, None)
+            if previous is not None:
+                self._bytes -= len(previous[1])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self) -> Dict:
+        """Return session count, limits, counters and memory held by session data."""
+        stats = super().stats()
+        with self._lock:
+            stats['bytes'] = self._bytes
+        return stats
+
+    def _purge_expired(self, now: float):
+        """Drop expired sessions. Caller holds the lock.
+
+        Every access renews the TTL and moves the session to the end, so the
+        oldest expiry is always at the front.
+        """
+        while self._sessions:
+            session_id, (expires, data) = next(iter(self._sessions.items()))
+            if expires > now:
+                break
+            del self._sessions[session_id]
+            self._bytes -= len(data)
+            self.expirations += 1
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a local SQLite database, shared between processes."""
+
+    backend = 'sqlite'
+
+    def __init__(self, path: str = 'mer_sessions.db', max_sessions: int = 10_000, ttl: float = 24 * 3600):
+        """Open (or create) the session database."""
+        super().__init__(max_sessions, ttl)
+        self.path = path
+        self._writes = 0
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS sessions '
+                '(session_id TEXT PRIMARY KEY, expires REAL NOT NULL, data BLOB NOT NULL)'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)')
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Return a session's data (renewing its TTL), or None if unknown or expired."""
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                'SELECT data FROM sessions WHERE session_id = ? AND expires > ?', (session_id, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._connection.execute('UPDATE sessions SET expires = ? WHERE session_id = ?',
+                                     (now + self.ttl, session_id))
+            self.hits += 1
+        return mer_serializer.loads(row[0])
+
+    def set(self, session_id: str, data: Dict):
+        """Store a session's data, periodically purging expired and surplus sessions."""
+        encoded = mer_serializer.dumps(data)
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO sessions (session_id, expires, data) VALUES (?, ?, ?)',
+                                     (session_id, now + self.ttl, encoded))
+            self._writes += 1
+            if self._writes % PURGE_INTERVAL == 0:
+                self._purge(now)
+
+    def delete(self, session_id: str):
+        """Remove a session."""
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+    def purge(self):
+        """Drop expired sessions and evict the least recently used ones over the limit."""
+        with self._lock, self._connection:
+            self._purge(time.time())
+
+    def _purge(self, now: float):
+        """Purge inside the caller's transaction. Caller holds the lock."""
+        self.expirations += self._connection.execute('DELETE FROM sessions WHERE expires <= ?', (now,)).rowcount
+        surplus = self._connection.execute('SELECT COUNT(*) FROM sessions').fetchone()[0] - self.max_sessions
+        if surplus > 0:
+            # Expiry is renewed on every access, so the earliest expiries are the least recently used
+            self.evictions += self._connection.execute(
+                'DELETE FROM sessions WHERE session_id IN '
+                '(SELECT session_id FROM sessions ORDER BY expires LIMIT ?)', (surplus,)
+            ).rowcount
+
+
+def create_store(backend: Optional[str] = None) -> SessionStore:
+    """Create the session store configured by environment variables.
+
+    MER_SESSION_BACKEND (memory or sqlite), MER_SESSION_ENTRIES,
+    MER_SESSION_TTL (seconds) and MER_SESSION_DB (SQLite path).
+    """
+    backend = backend or os.environ.get('MER_SESSION_BACKEND', 'memory')
+    max_sessions = int(os.environ.get('MER_SESSION_ENTRIES', 10_000))
+    ttl = float(os.environ.get('MER_SESSION_TTL', 24 * 3600))
+    if backend == 'memory':
+        return MemorySessionStore(max_sessions, ttl)
+    if backend == 'sqlite':
+        return SQLiteSessionStore(os.environ.get('MER_SESSION_DB', 'mer_sessions.db'), max_sessions, ttl)
+    raise ValueError(f'Unknown session backend: {backend}')
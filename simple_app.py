@@ -5,257 +5,739 @@ A professional web application for calculating Marketing Efficiency Ratio (MER)
 and Contribution Margin with basic visualization.
 """
 
+import functools
+import logging
 import math
 import json
 import io
+import os
 import base64
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional, Union
+
+import numpy as np
+
+import mer_analytics
+import mer_config
+import mer_engine
+import mer_metrics
+import mer_montecarlo
+import mer_optimizer
+import mer_profiling
+import mer_serializer
+import result_cache
+import session_store
+import static_assets
 
 # Simple Flask-like web server using only built-in modules
+import argparse
 import http.server
+import signal
 import socketserver
+import threading
 import urllib.parse
 import urllib.request
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, ThreadingHTTPServer, BaseHTTPRequestHandler
 
 class MERCalculator:
     """MER (Marketing Efficiency Ratio) Contribution Margin Calculator"""
     
     def __init__(self):
         """Initialize the calculator with default configuration."""
-        self.default_config = {
-            'variable_cost': 0.65,              # 65% variable cost
-            'revenue_increment': 20000,         # €20,000 revenue increment
-            'contribution_margin_goal': 176000  # €176,000 contribution margin goal
-        }
+        self.default_config = mer_config.DEFAULT_CONFIG.copy()
+        self.default_inputs = mer_config.DEFAULT_INPUTS.copy()
         
-        self.default_inputs = {
-            'target_revenue': 820000,           # €820,000 - Target revenue
-            'target_mer': 7.50                  # 750% MER (7.50 as decimal)
-        }
+        # Processes for large Monte Carlo simulations (1 runs them inline)
+        self.simulation_workers = int(os.environ.get('MER_SIMULATION_WORKERS', 1))
+        
+        # Memoized /api/calculate results, keyed on the inputs (quantized when MER_RESULT_CACHE_DIGITS is set)
+        self.result_cache = result_cache.create_cache()
     
     def calculate_contribution_margin(self, revenue: float, mer: float, variable_cost: float) -> float:
         """Calculate contribution margin for given revenue and MER."""
-        gross_profit = revenue * (1 - variable_cost)
-        marketing_spend = revenue / mer
-        return gross_profit - marketing_spend
+        return float(mer_engine.contribution_margin(revenue, mer, variable_cost))
+    
+    def calculate_contribution_margin_array(self, revenue, mer, variable_cost) -> np.ndarray:
+        """Calculate contribution margins for arrays of revenue, MER and variable cost."""
+        return mer_engine.contribution_margin(revenue, mer, variable_cost)
     
     def generate_revenue_range_data(self, target_mer: float, target_revenue: float, 
                                    variable_cost: float, revenue_increment: float,
                                    points_before: int = 10, points_after: int = 10) -> Tuple[List[float], List[float]]:
         """Generate data points for revenue range analysis."""
-        start_revenue = target_revenue - (points_before * revenue_increment)
-        end_revenue = target_revenue + (points_after * revenue_increment)
-        
-        revenue_values = []
-        cm_values = []
-        
-        current_revenue = start_revenue
-        while current_revenue <= end_revenue:
-            revenue_values.append(current_revenue)
-            cm_values.append(self.calculate_contribution_margin(current_revenue, target_mer, variable_cost))
-            current_revenue += revenue_increment
-        
-        return revenue_values, cm_values
+        revenue_values, cm_values = mer_engine.revenue_range_data(
+            target_mer, target_revenue, variable_cost, revenue_increment,
+            points_before, points_after
+        )
+        return revenue_values.tolist(), cm_values.tolist()
     
     def create_simple_chart_data(self, revenue_values: List[float], cm_values: List[float], 
-                                target_revenue: float, target_cm: float, cm_goal: float) -> Dict:
+                                target_revenue: float, target_cm: float, cm_goal: float,
+                                target_mer: float, variable_cost: float) -> Dict:
         """Create chart data for simple visualization."""
+        # CM is linear in revenue, so the extrema come from the range endpoints without a scan
+        extrema = mer_analytics.range_extrema(revenue_values[0], revenue_values[-1],
+                                              target_mer, variable_cost)
         return {
             'revenue_values': revenue_values,
             'cm_values': cm_values,
             'target_revenue': target_revenue,
             'target_cm': target_cm,
             'cm_goal': cm_goal,
-            'min_revenue': min(revenue_values),
-            'max_revenue': max(revenue_values),
-            'min_cm': min(cm_values),
-            'max_cm': max(cm_values)
+            'min_revenue': float(extrema['min_revenue']),
+            'max_revenue': float(extrema['max_revenue']),
+            'min_cm': float(extrema['min_cm']),
+            'max_cm': float(extrema['max_cm'])
+        }
+    
+    def generate_grid(self, variable_cost: float, contribution_margin_goal: float,
+                      revenue_start_number: float, revenue_increment: float,
+                      revenue_points: int = 50, mer_start: Optional[float] = None,
+                      mer_increment: float = 0.50, mer_points: int = 20,
+                      dtype: str = 'float32') -> Dict:
+        """Generate the revenue × MER contribution margin grid with its goal-met mask."""
+        return mer_engine.build_grid(
+            variable_cost, contribution_margin_goal,
+            revenue_start_number, revenue_increment, revenue_points,
+            mer_start if mer_start is not None else mer_increment, mer_increment, mer_points,
+            dtype=np.dtype(dtype)
+        )
+    
+    def generate_frontier(self, variable_cost: float, goals: List[float],
+                          revenue_start_number: float, revenue_increment: float,
+                          revenue_points: int = 50) -> Dict:
+        """Generate the lowest-MER / highest-spend curve for each goal over a revenue axis."""
+        return mer_engine.build_frontier(
+            variable_cost, goals, revenue_start_number, revenue_increment, revenue_points
+        )
+    
+    def run_sensitivity(self, params: Dict) -> Dict:
+        """Run the tornado, one-way and two-way sensitivity analysis in one batched computation."""
+        return mer_engine.build_sensitivity(params)
+    
+    def optimize_budget(self, params: Dict) -> Dict:
+        """Allocate a marketing budget across a portfolio of entities to maximize total CM."""
+        return mer_optimizer.optimize(params)
+    
+    def run_simulation(self, params: Dict) -> Dict:
+        """Run a Monte Carlo simulation of contribution margin under uncertain inputs."""
+        return mer_montecarlo.simulate(params, workers=self.simulation_workers)
+    
+    def calculate_scenario(self, config: Dict, user_inputs: Dict) -> Dict:
+        """Build the /api/calculate response for validated inputs."""
+        # Contribution margin, goal check, break-even figures and formula components in one pass
+        with mer_metrics.stage('cm'):
+            analysis = mer_analytics.scenario_summary(
+                user_inputs['target_revenue'], 
+                user_inputs['target_mer'],
+                config['variable_cost'],
+                config['contribution_margin_goal']
+            )
+        contribution_margin = analysis['contribution_margin']
+        
+        with mer_metrics.stage('range'):
+            revenue_values, cm_values = self.generate_revenue_range_data(
+                user_inputs['target_mer'], 
+                user_inputs['target_revenue'],
+                config['variable_cost'],
+                config['revenue_increment']
+            )
+        
+        with mer_metrics.stage('chart_data'):
+            chart_data = self.create_simple_chart_data(
+                revenue_values, cm_values, user_inputs['target_revenue'], 
+                contribution_margin, config['contribution_margin_goal'],
+                user_inputs['target_mer'], config['variable_cost']
+            )
+        
+        return {
+            'success': True,
+            **analysis,
+            'chart_data': chart_data,
+            'chart_explanation': {
+                'blue_line': 'Shows how your contribution margin changes as revenue increases',
+                'orange_line': f'Your target contribution margin goal (€{config["contribution_margin_goal"]:,.0f})',
+                'red_star': f'Your specific revenue/CM combination (€{user_inputs["target_revenue"]:,.0f} → €{contribution_margin:,.0f})'
+            }
         }
     
     def validate_inputs(self, config: Dict, user_inputs: Dict) -> List[str]:
         """Validate all inputs and return list of errors."""
-        errors = []
+        return mer_config.validate_profile(config, user_inputs, mer_config.CALCULATION_FIELDS)
+
+# Initialize calculator
+calculator = MERCalculator()
+
+# Server-side sessions (the cookie only carries the session id)
+sessions = session_store.create_store()
+
+# Opt-in per-request cProfile / tracemalloc profiles (off unless MER_PROFILE_TOKEN is set)
+profiler = mer_profiling.create_profiler()
+
+mer_metrics.register_cache('result', calculator.result_cache.stats)
+mer_metrics.register_cache('session', sessions.stats)
+
+logger = logging.getLogger('mer.simple_app')
+
+
+# =============================================================================
+# ROUTE LOGIC (shared by the threaded server and async_app.py)
+# =============================================================================
+
+def defaults_result(session: Optional[Dict] = None) -> Dict:
+    """Build the /api/defaults response (the session's last inputs when it has any)."""
+    session = session or {}
+    return {
+        'config': session.get('config', calculator.default_config),
+        'user_inputs': session.get('user_inputs', calculator.default_inputs)
+    }
+
+
+def reset_result() -> Dict:
+    """Build the /api/reset response."""
+    return {'success': True, 'message': 'Configuration reset to defaults'}
+
+
+def calculate_result(post_data: bytes, session: Optional[Dict] = None) -> Dict:
+    """Run a single calculation and build the /api/calculate response.
+    
+    Valid inputs are remembered in `session` when one is given.
+    """
+    try:
+        with mer_metrics.stage('parse'):
+            data = mer_serializer.loads(post_data)
+            
+            config = {
+                'variable_cost': float(data.get('variable_cost', 0.65)),
+                'revenue_increment': float(data.get('revenue_increment', 20000)),
+                'contribution_margin_goal': float(data.get('contribution_margin_goal', 176000))
+            }
+            
+            user_inputs = {
+                'target_revenue': float(data.get('target_revenue', 820000)),
+                'target_mer': float(data.get('target_mer', 7.50))
+            }
+        
+        with mer_metrics.stage('validate'):
+            errors = calculator.validate_inputs(config, user_inputs)
+        if errors:
+            return {'success': False, 'errors': errors}
+        
+        # The session keeps the values as entered; only the calculation uses the quantized copies
+        if session is not None:
+            session['config'] = config
+            session['user_inputs'] = user_inputs
         
-        if not config.get('variable_cost') or config['variable_cost'] < 0 or config['variable_cost'] >= 1:
-            errors.append('Variable Cost must be between 0 and 1 (e.g., 0.65 for 65%)')
+        # Quantized (when configured) so near-duplicate inputs, e.g. from sliders, share one cached result
+        quantized_config = calculator.result_cache.quantize(config)
+        quantized_inputs = calculator.result_cache.quantize(user_inputs)
+        with mer_metrics.stage('result_cache'):
+            return calculator.result_cache.get_or_compute(
+                'calculate', dict(quantized_config, **quantized_inputs),
+                lambda: calculator.calculate_scenario(quantized_config, quantized_inputs)
+            )
+        
+    except Exception as e:
+        return {'success': False, 'errors': [f'Calculation error: {str(e)}']}
+
+
+def batch_result(post_data: bytes) -> Dict:
+    """Evaluate a JSON batch of scenarios and build the /api/calculate/batch response."""
+    try:
+        data = mer_serializer.loads(post_data)
         
-        if not config.get('revenue_increment') or config['revenue_increment'] <= 0:
-            errors.append('Revenue Increment must be greater than 0')
+        if isinstance(data, list):
+            scenarios, include_chart = data, False
+        else:
+            scenarios = data.get('scenarios', [])
+            include_chart = bool(data.get('include_chart', False))
         
-        if not config.get('contribution_margin_goal') or config['contribution_margin_goal'] <= 0:
-            errors.append('Contribution Margin Goal must be greater than 0')
+        result = mer_engine.batch_result(scenarios)
         
-        if not user_inputs.get('target_revenue') or user_inputs['target_revenue'] <= 0:
-            errors.append('Target Revenue must be greater than 0')
+        # Optional chart data for the first valid scenario
+        if include_chart and result['valid_count']:
+            index = int(np.flatnonzero(~np.isnan(result['contribution_margin']))[0])
+            scenario = mer_engine.scenario_columns([scenarios[index]])
+            target_mer = float(scenario['target_mer'][0])
+            target_revenue = float(scenario['target_revenue'][0])
+            revenue_values, cm_values = calculator.generate_revenue_range_data(
+                target_mer, target_revenue,
+                float(scenario['variable_cost'][0]),
+                float(scenario['revenue_increment'][0])
+            )
+            result['chart_index'] = index
+            result['chart_data'] = calculator.create_simple_chart_data(
+                revenue_values, cm_values, target_revenue,
+                float(result['contribution_margin'][index]),
+                float(scenario['contribution_margin_goal'][0]),
+                target_mer, float(scenario['variable_cost'][0])
+            )
         
-        if not user_inputs.get('target_mer') or user_inputs['target_mer'] <= 0:
-            errors.append('Target MER must be greater than 0')
+        return result
         
-        return errors
+    except Exception as e:
+        return {'success': False, 'errors': [f'Batch calculation error: {str(e)}']}
 
-# Initialize calculator
-calculator = MERCalculator()
 
-# Global session storage (simplified)
-sessions = {}
+def grid_result(post_data: bytes) -> Union[Dict, bytes]:
+    """Build the /api/grid response: a JSON-ready dict, or .npz bytes when requested."""
+    try:
+        data = mer_serializer.loads(post_data)
+        
+        params = mer_engine.grid_params(data, calculator.default_config)
+        errors = mer_engine.validate_grid_inputs(params)
+        if errors:
+            return {'success': False, 'errors': errors}
+        
+        grid_data = calculator.generate_grid(**params)
+        
+        if data.get('format') == 'npz':
+            return mer_engine.grid_to_npz(grid_data)
+        
+        result = {'success': True}
+        result.update(mer_engine.encode_grid(grid_data))
+        return result
+        
+    except Exception as e:
+        return {'success': False, 'errors': [f'Grid calculation error: {str(e)}']}
+
+
+def frontier_result(post_data: bytes) -> Dict:
+    """Solve the goal frontier and build the /api/frontier response."""
+    try:
+        data = mer_serializer.loads(post_data) if post_data else {}
+        
+        params = mer_engine.frontier_params(data, calculator.default_config)
+        errors = mer_engine.validate_frontier_inputs(params)
+        if errors:
+            return {'success': False, 'errors': errors}
+        
+        result = {'success': True}
+        result.update(mer_engine.encode_frontier(calculator.generate_frontier(**params)))
+        return result
+        
+    except Exception as e:
+        return {'success': False, 'errors': [f'Frontier calculation error: {str(e)}']}
+
+
+def sensitivity_result(post_data: bytes) -> Dict:
+    """Run the sensitivity analysis and build the /api/sensitivity response."""
+    try:
+        data = mer_serializer.loads(post_data) if post_data else {}
+        
+        defaults = dict(calculator.default_config, **calculator.default_inputs)
+        params = mer_engine.sensitivity_params(data, defaults)
+        errors = mer_engine.validate_sensitivity_inputs(params)
+        if errors:
+            return {'success': False, 'errors': errors}
+        
+        result = {'success': True}
+        result.update(calculator.run_sensitivity(params))
+        return result
+        
+    except Exception as e:
+        return {'success': False, 'errors': [f'Sensitivity analysis error: {str(e)}']}
+
+
+def optimize_result(post_data: bytes) -> Dict:
+    """Allocate a budget across a portfolio and build the /api/optimize response."""
+    try:
+        data = mer_serializer.loads(post_data) if post_data else {}
+        
+        params = mer_optimizer.optimizer_params(data)
+        errors = mer_optimizer.validate_optimizer_inputs(params)
+        if errors:
+            return {'success': False, 'errors': errors}
+        
+        result = {'success': True}
+        result.update(calculator.optimize_budget(params))
+        return result
+        
+    except Exception as e:
+        return {'success': False, 'errors': [f'Optimization error: {str(e)}']}
+
+
+def simulate_result(post_data: bytes) -> Dict:
+    """Run a Monte Carlo simulation and build the /api/simulate response."""
+    try:
+        data = mer_serializer.loads(post_data) if post_data else {}
+        
+        defaults = dict(calculator.default_config, **calculator.default_inputs)
+        params = mer_montecarlo.simulation_params(data, defaults)
+        errors = mer_montecarlo.validate_simulation_inputs(params)
+        if errors:
+            return {'success': False, 'errors': errors}
+        
+        result = {'success': True}
+        result.update(calculator.run_simulation(params))
+        return result
+        
+    except Exception as e:
+        return {'success': False, 'errors': [f'Simulation error: {str(e)}']}
+
+
+def range_stream_result(post_data: bytes) -> Union[Dict, Tuple[str, Iterator[bytes]]]:
+    """Build the /api/calculate/stream response: an error dict, or (content type, encoded chunks)."""
+    try:
+        data = mer_serializer.loads(post_data) if post_data else {}
+        
+        params = mer_engine.stream_params(data, calculator.default_config)
+        errors = mer_engine.validate_stream_inputs(params)
+        stream_format = data.get('format', 'ndjson')
+        if stream_format not in mer_engine.STREAM_FORMATS:
+            errors.append(f"Unknown stream format '{stream_format}' (choose from {', '.join(mer_engine.STREAM_FORMATS)})")
+        if errors:
+            return {'success': False, 'errors': errors}
+        
+        return (mer_engine.STREAM_FORMATS[stream_format],
+                mer_engine.iter_range_stream(params, stream_format))
+        
+    except Exception as e:
+        return {'success': False, 'errors': [f'Stream calculation error: {str(e)}']}
+
+
+def timed_request(method):
+    """Record a do_* handler's latency, status and stages in the request metrics.
+    
+    Also profiles the request when asked to (see mer_profiling).
+    """
+    @functools.wraps(method)
+    def wrapper(self):
+        # Profiling parameters are stripped so they do not affect routing
+        self.path, params = mer_profiling.split_profile_params(self.path)
+        self.profile_token = (self.headers.get(mer_profiling.TOKEN_HEADER)
+                              or params.get(mer_profiling.TOKEN_PARAM))
+        with mer_metrics.track('simple') as timer:
+            mode = profiler.requested_mode(
+                self.headers.get(mer_profiling.PROFILE_HEADER) or params.get(mer_profiling.PROFILE_PARAM),
+                self.profile_token
+            )
+            self.profile_run = profiler.start(mode, self.path) if mode else None
+            try:
+                method(self)
+            finally:
+                if self.profile_run is not None:
+                    self.profile_run.stop(timer.status)
+                    self.profile_run = None
+            if self.path.startswith(mer_profiling.ADMIN_PATH + '/'):
+                timer.route = mer_profiling.ADMIN_PATH + '/<id>'
+            elif timer.status != 404:
+                timer.route = self.path
+    return wrapper
+
 
 class MERRequestHandler(BaseHTTPRequestHandler):
     """HTTP request handler for the MER calculator."""
     
+    # HTTP/1.1 keeps connections alive between requests; every response sets Content-Length
+    protocol_version = 'HTTP/1.1'
+    
+    # Seconds an idle keep-alive connection may hold a worker (set from --keepalive-timeout)
+    timeout = 15
+    
+    # Headers and body are written separately; without TCP_NODELAY keep-alive requests stall on delayed ACKs
+    disable_nagle_algorithm = True
+    
+    # Set per request by timed_request
+    profile_run = None
+    profile_token = None
+    
+    @timed_request
     def do_GET(self):
         """Handle GET requests."""
         if self.path == '/' or self.path == '/index.html':
             self.serve_index()
         elif self.path == '/api/defaults':
             self.serve_defaults()
+        elif self.path == '/api/sessions':
+            self.send_json_response(sessions.stats())
+        elif self.path == '/api/result_cache':
+            self.send_json_response(calculator.result_cache.stats())
+        elif self.path == '/metrics':
+            self.send_metrics()
+        elif self.path == mer_profiling.ADMIN_PATH or self.path.startswith(mer_profiling.ADMIN_PATH + '/'):
+            self.send_profile_admin()
         else:
             self.send_error(404)
     
+    @timed_request
     def do_HEAD(self):
         """Handle HEAD requests (same as GET but without body)."""
         if self.path == '/' or self.path == '/index.html':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
+            self.send_asset(INDEX_ASSET, include_body=False)
         elif self.path == '/api/defaults':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
+            self.send_asset(DEFAULTS_ASSET, include_body=False)
         else:
             self.send_error(404)
     
+    @timed_request
     def do_POST(self):
         """Handle POST requests."""
         if self.path == '/api/calculate':
             self.handle_calculate()
         elif self.path == '/api/reset':
             self.handle_reset()
+        elif self.path == '/api/calculate/batch':
+            self.handle_calculate_batch()
+        elif self.path == '/api/grid':
+            self.handle_grid()
+        elif self.path == '/api/calculate/stream':
+            self.handle_range_stream()
+        elif self.path == '/api/frontier':
+            self.handle_frontier()
+        elif self.path == '/api/simulate':
+            self.handle_simulate()
+        elif self.path == '/api/sensitivity':
+            self.handle_sensitivity()
+        elif self.path == '/api/optimize':
+            self.handle_optimize()
         else:
+            # The unread request body would corrupt the next request on a keep-alive connection
+            self.close_connection = True
             self.send_error(404)
     
     def serve_index(self):
         """Serve the main HTML page."""
-        try:
-            html_content = self.get_html_template()
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html; charset=utf-8')
-            self.send_header('Content-length', len(html_content.encode('utf-8')))
-            self.send_header('Cache-Control', 'no-cache')
-            self.end_headers()
-            self.wfile.write(html_content.encode('utf-8'))
-            print(f"✅ Served main page to {self.client_address[0]}")
-        except Exception as e:
-            print(f"❌ Error serving index: {e}")
-            self.send_error(500)
+        self.send_asset(INDEX_ASSET)
+        logger.debug('served index client=%s', self.client_address[0])
     
     def serve_defaults(self):
-        """Serve default configuration values."""
-        response = {
-            'config': calculator.default_config,
-            'user_inputs': calculator.default_inputs
-        }
-        
-        self.send_json_response(response)
+        """Serve the session's last inputs, or the default configuration values."""
+        session_id = session_store.parse_cookie(self.headers.get('Cookie'))
+        session = sessions.get(session_id) if session_id else None
+        if session:
+            self.send_json_response(defaults_result(session))
+        else:
+            self.send_asset(DEFAULTS_ASSET)
     
     def handle_calculate(self):
         """Handle calculation requests."""
-        try:
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode('utf-8'))
-            
-            config = {
-                'variable_cost': float(data.get('variable_cost', 0.65)),
-                'revenue_increment': float(data.get('revenue_increment', 20000)),
-                'contribution_margin_goal': float(data.get('contribution_margin_goal', 176000))
-            }
-            
-            user_inputs = {
-                'target_revenue': float(data.get('target_revenue', 820000)),
-                'target_mer': float(data.get('target_mer', 7.50))
-            }
-            
-            errors = calculator.validate_inputs(config, user_inputs)
-            if errors:
-                self.send_json_response({'success': False, 'errors': errors})
-                return
-            
-            contribution_margin = calculator.calculate_contribution_margin(
-                user_inputs['target_revenue'], 
-                user_inputs['target_mer'],
-                config['variable_cost']
-            )
-            
-            meets_goal = contribution_margin >= config['contribution_margin_goal']
-            
-            revenue_values, cm_values = calculator.generate_revenue_range_data(
-                user_inputs['target_mer'], 
-                user_inputs['target_revenue'],
-                config['variable_cost'],
-                config['revenue_increment']
-            )
-            
-            chart_data = calculator.create_simple_chart_data(
-                revenue_values, cm_values, user_inputs['target_revenue'], 
-                contribution_margin, config['contribution_margin_goal']
-            )
-            
-            coefficient = (1 - config['variable_cost']) - (1 / user_inputs['target_mer'])
-            min_revenue = config['contribution_margin_goal'] / coefficient if coefficient > 0 else 0
-            
-            gross_profit = user_inputs['target_revenue'] * (1 - config['variable_cost'])
-            marketing_spend = user_inputs['target_revenue'] / user_inputs['target_mer']
-            
-            result = {
-                'success': True,
-                'contribution_margin': contribution_margin,
-                'meets_goal': meets_goal,
-                'difference': contribution_margin - config['contribution_margin_goal'],
-                'min_revenue': min_revenue,
-                'revenue_difference': user_inputs['target_revenue'] - min_revenue,
-                'gross_profit': gross_profit,
-                'marketing_spend': marketing_spend,
-                'chart_data': chart_data,
-                'chart_explanation': {
-                    'blue_line': 'Shows how your contribution margin changes as revenue increases',
-                    'orange_line': f'Your target contribution margin goal (€{config["contribution_margin_goal"]:,.0f})',
-                    'red_star': f'Your specific revenue/CM combination (€{user_inputs["target_revenue"]:,.0f} → €{contribution_margin:,.0f})'
-                }
-            }
-            
+        session_id, session, new = sessions.open(self.headers.get('Cookie'))
+        result = calculate_result(self.read_body(), session)
+        self.send_json_response(result, sessions.save(session_id, session, new))
+    
+    def handle_calculate_batch(self):
+        """Handle batch scenario calculation requests."""
+        # NDJSON in, NDJSON out: scenarios are evaluated chunk by chunk as they stream
+        if self.headers.get('Content-Type', '').startswith('application/x-ndjson'):
+            content_length = int(self.headers.get('Content-Length', 0))
+            self.send_ndjson_stream(mer_engine.iter_ndjson_results(self.iter_body_lines(content_length)))
+            return
+        
+        self.send_json_response(batch_result(self.read_body()))
+    
+    def handle_grid(self):
+        """Handle revenue × MER grid requests."""
+        result = grid_result(self.read_body())
+        if isinstance(result, bytes):
+            self.send_binary_response(result, 'mer_grid.npz')
+        else:
             self.send_json_response(result)
-            
-        except Exception as e:
-            self.send_json_response({'success': False, 'errors': [f'Calculation error: {str(e)}']})
+    
+    def handle_frontier(self):
+        """Handle goal frontier requests."""
+        self.send_json_response(frontier_result(self.read_body()))
+    
+    def handle_simulate(self):
+        """Handle Monte Carlo simulation requests."""
+        self.send_json_response(simulate_result(self.read_body()))
+    
+    def handle_sensitivity(self):
+        """Handle sensitivity analysis requests."""
+        self.send_json_response(sensitivity_result(self.read_body()))
+    
+    def handle_optimize(self):
+        """Handle budget allocation requests."""
+        self.send_json_response(optimize_result(self.read_body()))
+    
+    def handle_range_stream(self):
+        """Handle streamed revenue range requests (NDJSON or CSV)."""
+        result = range_stream_result(self.read_body())
+        if isinstance(result, dict):
+            self.send_json_response(result)
+        else:
+            content_type, chunks = result
+            self.send_chunked_response(content_type, chunks)
+            logger.debug('streamed revenue range client=%s', self.client_address[0])
     
     def handle_reset(self):
         """Handle reset requests."""
-        response = {'success': True, 'message': 'Configuration reset to defaults'}
-        self.send_json_response(response)
+        self.read_body()
+        session_id, session, new = sessions.open(self.headers.get('Cookie'))
+        session.clear()
+        self.send_json_response(reset_result(), sessions.save(session_id, session, new))
     
-    def send_json_response(self, data):
-        """Send a JSON response."""
+    def read_body(self) -> bytes:
+        """Read the request body declared by Content-Length."""
+        content_length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(content_length)
+    
+    def send_json_response(self, data, headers: Optional[Dict[str, str]] = None):
+        """Send a JSON response, streaming it in chunks when it holds large arrays."""
+        if mer_serializer.should_stream(data):
+            self.send_json_stream(data, headers)
+            return
+        
         try:
-            json_data = json.dumps(data).encode('utf-8')
+            with mer_metrics.stage('json'):
+                json_data = mer_serializer.dumps(data)
             
             self.send_response(200)
             self.send_header('Content-type', 'application/json; charset=utf-8')
             self.send_header('Content-length', len(json_data))
-            self.send_header('Cache-Control', 'no-cache')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+            self.send_json_headers(headers)
             self.end_headers()
             self.wfile.write(json_data)
-            print(f"✅ Sent JSON response to {self.client_address[0]}")
+            logger.debug('sent json client=%s bytes=%d', self.client_address[0], len(json_data))
         except Exception as e:
-            print(f"❌ Error sending JSON response: {e}")
+            logger.error('json response failed client=%s error=%r', self.client_address[0], e)
             self.send_error(500)
     
-    def get_html_template(self):
+    def send_json_headers(self, headers: Optional[Dict[str, str]] = None):
+        """Send the caching and CORS headers shared by JSON responses, plus any extra headers."""
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_timing_header()
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+    
+    def send_timing_header(self):
+        """Send the Server-Timing header for the stages timed so far, and the profile id if profiled."""
+        timer = mer_metrics.current_timer()
+        if timer is not None:
+            self.send_header('Server-Timing', timer.server_timing())
+        if self.profile_run is not None:
+            self.send_header(mer_profiling.ID_HEADER, self.profile_run.profile_id)
+    
+    def send_json_stream(self, data, headers: Optional[Dict[str, str]] = None):
+        """Send a large JSON response with chunked transfer encoding, encoding arrays piece by piece."""
+        self.send_chunked_response('application/json; charset=utf-8', mer_serializer.iter_dumps(data), headers=headers)
+        logger.debug('streamed json client=%s', self.client_address[0])
+    
+    def send_chunked_response(self, content_type: str, pieces, flush_bytes: int = 64 * 1024,
+                              headers: Optional[Dict[str, str]] = None):
+        """Send generated pieces with chunked transfer encoding, coalescing small pieces.
+        
+        HTTP/1.0 has no chunked encoding, so HTTP/1.0 clients (and servers
+        speaking HTTP/1.0) get the body delimited by closing the connection.
+        """
+        chunked = self.request_version == 'HTTP/1.1' and self.protocol_version == 'HTTP/1.1'
+        self.send_response(200)
+        self.send_header('Content-type', content_type)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.send_json_headers(headers)
+        self.end_headers()
+        
+        buffered, size = [], 0
+        for piece in pieces:
+            buffered.append(piece)
+            size += len(piece)
+            if size >= flush_bytes:
+                self.write_piece(b''.join(buffered), chunked)
+                buffered, size = [], 0
+        if size:
+            self.write_piece(b''.join(buffered), chunked)
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+    
+    def write_piece(self, data: bytes, chunked: bool):
+        """Write part of a streamed body, framed as a chunk when chunked."""
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data) if chunked else data)
+    
+    def send_asset(self, asset: static_assets.StaticAsset, include_body: bool = True):
+        """Send a pre-encoded asset, honouring Accept-Encoding and If-None-Match."""
+        status, headers, body = asset.respond(self.headers.get('Accept-Encoding'),
+                                              self.headers.get('If-None-Match'))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', len(body))
+        self.send_timing_header()
+        self.end_headers()
+        if include_body and status != 304:
+            self.wfile.write(body)
+    
+    def iter_body_lines(self, content_length: int):
+        """Yield request body lines without reading the whole body into memory."""
+        remaining = content_length
+        while remaining > 0:
+            line = self.rfile.readline(min(remaining, 65536))
+            if not line:
+                break
+            remaining -= len(line)
+            yield line
+    
+    def send_ndjson_stream(self, chunks):
+        """Stream NDJSON chunks to the client as they are produced."""
+        self.send_response(200)
+        self.send_header('Content-type', 'application/x-ndjson; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for chunk in chunks:
+            self.wfile.write(chunk)
+        self.close_connection = True
+        logger.debug('streamed ndjson client=%s', self.client_address[0])
+    
+    def send_binary_response(self, payload: bytes, filename: str):
+        """Send a binary file download response."""
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'application/octet-stream')
+            self.send_header('Content-length', len(payload))
+            self.send_header('Content-Disposition', f'attachment; filename={filename}')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_timing_header()
+            self.end_headers()
+            self.wfile.write(payload)
+            logger.debug('sent file client=%s file=%s bytes=%d', self.client_address[0], filename, len(payload))
+        except Exception as e:
+            logger.error('binary response failed client=%s error=%r', self.client_address[0], e)
+            self.send_error(500)
+    
+    def send_profile_admin(self):
+        """Send the profile list, a stored profile or its report (token required)."""
+        status, headers, body = profiler.respond(self.path, self.profile_token)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', len(body))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_metrics(self):
+        """Send the Prometheus metrics."""
+        body = mer_metrics.render()
+        self.send_response(200)
+        self.send_header('Content-type', mer_metrics.CONTENT_TYPE)
+        self.send_header('Content-length', len(body))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_request(self, code='-', size='-'):
+        """Record the response status for the metrics and log the request at DEBUG."""
+        timer = mer_metrics.current_timer()
+        if timer is not None and isinstance(code, int):
+            timer.status = code
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('request client=%s line="%s" status=%s', self.client_address[0], self.requestline, str(code))
+    
+    def log_message(self, format, *args):
+        """Route the handler's own messages (errors, timeouts) through logging."""
+        logger.warning('client=%s %s', self.address_string(), format % args)
+    
+    @staticmethod
+    def get_html_template():
         """Return the HTML template."""
         return '''<!DOCTYPE html>
 <html lang="en">
@@ -722,26 +1204,151 @@ class MERRequestHandler(BaseHTTPRequestHandler):
 </body>
 </html>'''
 
-def main():
+# Pre-encoded responses for the routes whose bodies never change while the server runs
+INDEX_ASSET = static_assets.StaticAsset(
+    MERRequestHandler.get_html_template().encode('utf-8'), 'text/html; charset=utf-8'
+)
+DEFAULTS_ASSET = static_assets.StaticAsset(
+    mer_serializer.dumps(defaults_result()), 'application/json; charset=utf-8',
+    extra_headers={'Access-Control-Allow-Origin': '*'}
+)
+
+
+class SingleMERRequestHandler(MERRequestHandler):
+    """Request handler for single mode: HTTP/1.0, one request per connection.
+    
+    With one request served at a time, an idle keep-alive connection would
+    block every other client until it timed out.
+    """
+    
+    protocol_version = 'HTTP/1.0'
+
+
+class ThreadedMERServer(ThreadingHTTPServer):
+    """Thread-per-connection server that joins in-flight request threads on close."""
+    
+    daemon_threads = False
+    block_on_close = True
+    
+    def __init__(self, server_address, handler_class, backlog: int = 128):
+        self.request_queue_size = backlog
+        super().__init__(server_address, handler_class)
+
+
+class PooledMERServer(HTTPServer):
+    """Server that handles connections on a bounded worker pool and drains it on close."""
+    
+    def __init__(self, server_address, handler_class, threads: int = 16, backlog: int = 128):
+        self.request_queue_size = backlog
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='mer-worker')
+        # Stop accepting when every worker is busy, leaving new connections in the listen backlog
+        self.slots = threading.BoundedSemaphore(threads)
+        self.closing = threading.Event()
+    
+    def process_request(self, request, client_address):
+        """Hand the connection to an idle worker, or drop it if the server shuts down while waiting."""
+        while not self.slots.acquire(timeout=0.5):
+            if self.closing.is_set():
+                self.shutdown_request(request)
+                return
+        try:
+            self.executor.submit(self.process_request_worker, request, client_address)
+        except RuntimeError:
+            self.slots.release()
+            self.shutdown_request(request)
+    
+    def process_request_worker(self, request, client_address):
+        """Handle one connection on a pool worker (mirrors ThreadingMixIn)."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+    
+    def shutdown(self):
+        """Stop serve_forever, even while it waits for a worker to free up."""
+        self.closing.set()
+        super().shutdown()
+    
+    def server_close(self):
+        """Close the listening socket, then wait for in-flight requests to finish."""
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+# Default --keepalive-timeout per mode (single mode closes every connection after one request)
+KEEPALIVE_TIMEOUTS = {'pool': 2.0, 'threaded': 15.0}
+
+
+def create_server(host: str = '0.0.0.0', port: int = 8000, mode: str = 'pool',
+                  threads: int = 16, backlog: int = 128):
+    """Create the HTTP server for the requested concurrency mode."""
+    if mode == 'pool':
+        return PooledMERServer((host, port), MERRequestHandler, threads=threads, backlog=backlog)
+    if mode == 'threaded':
+        return ThreadedMERServer((host, port), MERRequestHandler, backlog=backlog)
+    return HTTPServer((host, port), SingleMERRequestHandler)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command-line options for the server."""
+    parser = argparse.ArgumentParser(description='MER Contribution Margin Calculator web server')
+    parser.add_argument('--host', default='0.0.0.0', help='Bind address (default: 0.0.0.0)')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on (default: 8000)')
+    parser.add_argument('--mode', choices=['pool', 'threaded', 'single'], default='pool',
+                        help='pool: bounded worker pool, threaded: thread per connection, '
+                             'single: one request at a time (default: pool)')
+    parser.add_argument('--threads', type=int, default=16, help='Worker threads in pool mode (default: 16)')
+    parser.add_argument('--backlog', type=int, default=128, help='Listen backlog size (default: 128)')
+    parser.add_argument('--log-level', default=None,
+                        help='Logging level: DEBUG logs every response (default: MER_LOG_LEVEL or INFO)')
+    parser.add_argument('--keepalive-timeout', type=float, default=None,
+                        help='Seconds an idle keep-alive connection stays open '
+                             '(default: 2 in pool mode, 15 in threaded mode)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Run the MER Calculator web server."""
-    port = 8000
+    args = parse_args(argv)
+    mer_metrics.configure_logging(args.log_level)
+    # Idle connections hold a pool worker, so the pool closes them sooner
+    if args.keepalive_timeout is None:
+        args.keepalive_timeout = KEEPALIVE_TIMEOUTS.get(args.mode, MERRequestHandler.timeout)
+    MERRequestHandler.timeout = args.keepalive_timeout
     
     try:
-        server = HTTPServer(('0.0.0.0', port), MERRequestHandler)
-        print(f"🧮 MER Calculator Server Starting...")
-        print(f"🌐 Server running at: http://localhost:{port}")
-        print(f"📱 Access from any device on your network")
-        print(f"🔗 Open your browser and navigate to the URL above")
-        print(f"⭐ Features: Professional UI, Interactive Charts, Real-time Calculations")
-        print(f"🛑 Press Ctrl+C to stop the server")
-        print("="*60)
-        
-        server.serve_forever()
-    except KeyboardInterrupt:
-        print("\n\n👋 Server stopped. Thank you for using MER Calculator!")
+        server = create_server(args.host, args.port, args.mode, args.threads, args.backlog)
     except Exception as e:
         print(f"❌ Error starting server: {e}")
-        print("💡 Try changing the port if 8000 is already in use")
+        print("💡 Try changing the port with --port if it is already in use")
+        return
+    
+    # SIGTERM stops accepting new connections; serve_forever returns and in-flight requests drain
+    def request_shutdown(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, request_shutdown)
+    
+    print(f"🧮 MER Calculator Server Starting...")
+    print(f"🌐 Server running at: http://localhost:{args.port}")
+    print(f"⚙️  Mode: {args.mode}" + (f" ({args.threads} workers)" if args.mode == 'pool' else ""))
+    print(f"📱 Access from any device on your network")
+    print(f"🔗 Open your browser and navigate to the URL above")
+    print(f"⭐ Features: Professional UI, Interactive Charts, Real-time Calculations")
+    print(f"🛑 Press Ctrl+C to stop the server")
+    print("="*60)
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("\n⏳ Draining in-flight requests...")
+        server.server_close()
+        print("\n👋 Server stopped. Thank you for using MER Calculator!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+🧮 MER Calculator - Static Assets
+Pre-encoded responses for pages and payloads that never change while the
+server runs.
+
+A StaticAsset encodes its body once, precomputes gzip (and brotli, when the
+brotli package is installed) variants and a strong ETag, so serving it costs
+an Accept-Encoding lookup and a socket write.
+"""
+
+import gzip
+import hashlib
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed; the encoding overhead outweighs the saving
+MIN_COMPRESS_BYTES = 256
+
+# Server preference when the client accepts several encodings equally
+ENCODING_PREFERENCE = ('br', 'gzip', 'identity')
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q-value}."""
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+class StaticAsset:
+    """An immutable response body with precomputed compressed variants and an ETag."""
+
+    def __init__(self, body: bytes, content_type: str, cache_control: str = 'no-cache',
+                 extra_headers: Optional[Dict[str, str]] = None):
+        """Encode the body variants and ETag once."""
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.extra_headers = dict(extra_headers or {})
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+        self.variants = {'identity': body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            self.variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(body, quality=11)
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Tuple[str, bytes]:
+        """Pick the best variant for an Accept-Encoding header; returns (encoding, body)."""
+        accepted = parse_accept_encoding(accept_encoding)
+
+        best, best_q = 'identity', 0.0
+        for coding in ENCODING_PREFERENCE:
+            if coding not in self.variants:
+                continue
+            if coding in accepted:
+                q = accepted[coding]
+            elif '*' in accepted:
+                q = accepted['*']
+            else:
+                # Identity stays acceptable unless explicitly refused, but loses to any listed coding
+                q = 0.001 if coding == 'identity' else 0.0
+            if q > best_q:
+                best, best_q = coding, q
+        return best, self.variants[best]
+
+    def not_modified(self, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header already holds this asset's ETag."""
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or self.etag in tags or f'W/{self.etag}' in tags
+
+    def headers(self, encoding: str) -> Dict[str, str]:
+        """Return the response headers for a variant (Content-Length excluded)."""
+        headers = {
+            'Content-Type': self.content_type,
+            'Cache-Control': self.cache_control,
+            'ETag': self.etag,
+            'Vary': 'Accept-Encoding'
+        }
+        headers.update(self.extra_headers)
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return headers
+
+    def respond(self, accept_encoding: Optional[str],
+                if_none_match: Optional[str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Return (status, headers, body) for a conditional GET of this asset."""
+        if self.not_modified(if_none_match):
+            return 304, {'ETag': self.etag, 'Cache-Control': self.cache_control,
+                         'Vary': 'Accept-Encoding'}, b''
+        encoding, body = self.negotiate(accept_encoding)
+        return 200, self.headers(encoding), body
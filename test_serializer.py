@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Checks that both JSON backends write non-finite floats as null
+"""
+
+import json
+import math
+
+import numpy as np
+import pytest
+
+import mer_serializer
+
+NON_FINITE = {
+    'nan': float('nan'),
+    'inf': float('inf'),
+    'np_nan': np.float64('nan'),
+    'np_inf': np.float64('-inf'),
+    'np32_nan': np.float32('nan'),
+    'list': [1.5, float('nan'), np.float64('inf')],
+    'array': np.array([1.5, np.nan, np.inf, -np.inf]),
+    'nested': {'values': (float('-inf'), 2)}
+}
+
+EXPECTED = {
+    'nan': None,
+    'inf': None,
+    'np_nan': None,
+    'np_inf': None,
+    'np32_nan': None,
+    'list': [1.5, None, None],
+    'array': [1.5, None, None, None],
+    'nested': {'values': [None, 2]}
+}
+
+
+def backends():
+    """The encoders available here: the json fallback always, orjson when installed."""
+    encoders = [('json', mer_serializer._json_dumps)]
+    if mer_serializer.orjson is not None:
+        encoders.append(('orjson', mer_serializer.dumps))
+    return encoders
+
+
+@pytest.mark.parametrize('name,encode', backends())
+def test_non_finite_floats_are_null(name, encode):
+    """Every backend writes standard JSON with NaN and infinities as null."""
+    encoded = encode(NON_FINITE)
+    # parse_constant rejects NaN/Infinity literals, like a browser's JSON.parse
+    decoded = json.loads(encoded, parse_constant=lambda constant: pytest.fail(f'{name} wrote {constant}'))
+    assert decoded == EXPECTED
+
+
+def test_backends_agree():
+    """Both backends produce the same document."""
+    documents = {name: json.loads(encode(NON_FINITE)) for name, encode in backends()}
+    assert all(document == EXPECTED for document in documents.values())
+
+
+def test_finite_values_unchanged():
+    """Finite floats round-trip exactly through the json fallback."""
+    values = [0.1, -2.5e300, math.pi, np.float64(7.5)]
+    assert json.loads(mer_serializer._json_dumps(values)) == [float(value) for value in values]